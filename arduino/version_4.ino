@@ -0,0 +1,186 @@
+#include <math.h>
+
+/************ PIN DEFINITIONS ************/
+#define PH_PIN     A0
+#define TURB_PIN   A1
+#define TDS_PIN    A2
+#define RELAY_PIN  7   
+
+/************ SYSTEM CONFIGURATION ************/
+const float ALPHA = 0.15;            
+const int CALIB_SAMPLES = 40;        
+const float SIGMA_THRESHOLD = 3.0;   
+const int CONFIDENCE_LIMIT = 3;      
+const unsigned long WARMUP_MS = 5000; 
+
+/************ STATE MACHINE ************/
+enum SystemState { WARMUP, CALIBRATING, OPERATIONAL, FAULT };
+SystemState currentState = WARMUP;
+
+/************ GLOBAL VARIABLES ************/
+float f_ph = 7.0, f_tds = 0, f_turb = 0; 
+float baseTDS = 0, stdTDS = 0;           
+float tdsSum = 0, tdsSqSum = 0;          
+int sampleCount = 0;
+int confidenceCounter = 0;               
+bool isHarvesting = false;               
+
+/************ TELEMETRY PROTOCOL ************/
+// Server sends "B" to request compact binary frames, "J" to go back to JSON.
+bool binaryTelemetry = false;
+uint16_t frameSeq = 0;
+const unsigned long SAMPLE_MS_JSON = 1000;
+const unsigned long SAMPLE_MS_BINARY = 200;   // 18-byte frames fit 5 Hz easily at 9600 baud
+
+void setup() {
+  Serial.begin(9600);
+  pinMode(RELAY_PIN, OUTPUT);
+  digitalWrite(RELAY_PIN, HIGH); // Default to DRAIN
+}
+
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) — matches binascii.crc_hqx on the server
+uint16_t crc16(const uint8_t *data, uint8_t len) {
+  uint16_t crc = 0xFFFF;
+  while (len--) {
+    crc ^= (uint16_t)(*data++) << 8;
+    for (uint8_t i = 0; i < 8; i++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+    }
+  }
+  return crc;
+}
+
+void putU16(uint8_t *p, uint16_t v) {
+  p[0] = v & 0xFF;
+  p[1] = v >> 8;
+}
+
+// 18-byte frame, layout documented in backend/app/sources/binary_protocol.py
+void sendBinaryFrame(bool nudge_pass) {
+  uint8_t f[18];
+  f[0] = 0xA5; f[1] = 0x5A;
+  f[2] = 1;                                          // version
+  putU16(f + 3, frameSeq++);
+  putU16(f + 5, (uint16_t)(f_ph * 100 + 0.5));
+  putU16(f + 7, (uint16_t)(f_tds + 0.5));
+  putU16(f + 9, (uint16_t)(f_turb + 0.5));
+  putU16(f + 11, (uint16_t)(baseTDS + 0.5));
+  f[13] = (isHarvesting ? 1 : 0) | ((nudge_pass ? 1 : 0) << 1) | (((uint8_t)currentState & 3) << 2);
+  f[14] = (sampleCount * 100) / CALIB_SAMPLES;
+  f[15] = confidenceCounter;
+  putU16(f + 16, crc16(f + 2, 14));
+  Serial.write(f, sizeof(f));
+}
+
+void readCommands() {
+  while (Serial.available()) {
+    char c = Serial.read();
+    if (c == 'B') binaryTelemetry = true;
+    else if (c == 'J') binaryTelemetry = false;
+  }
+}
+
+void loop() {
+  readCommands();
+
+  // 1. DATA ACQUISITION
+  int adc_ph   = analogRead(PH_PIN);
+  int adc_turb = analogRead(TURB_PIN);
+  int adc_tds  = analogRead(TDS_PIN);
+
+  float v_ph   = adc_ph   * (5.0 / 1023.0);
+  float v_turb = adc_turb * (5.0 / 1023.0);
+  float v_tds  = adc_tds  * (5.0 / 1023.0);
+
+  // 2. FORMULAS
+  float raw_ph = 3.5 * v_ph;
+  float raw_turb = -1120.4 * pow(v_turb, 2) + 5742.3 * v_turb - 4352.9;
+  if (raw_turb < 0) raw_turb = 0;
+  float raw_tds = (133.42 * pow(v_tds, 3) - 255.86 * pow(v_tds, 2) + 857.39 * v_tds) * 0.5;
+
+  // 3. SMOOTHING (EWMA)
+  f_ph   = (ALPHA * raw_ph)   + ((1.0 - ALPHA) * f_ph);
+  f_tds  = (ALPHA * raw_tds)  + ((1.0 - ALPHA) * f_tds);
+  f_turb = (ALPHA * raw_turb) + ((1.0 - ALPHA) * f_turb);
+
+  // 4. HYBRID DECISION LOGIC
+  // LAYER 1: STATIC FALLBACK (Always Active)
+  bool ph_static_ok   = (f_ph >= 6.5 && f_ph <= 8.5);
+  bool tds_static_ok  = (f_tds <= 1000); 
+  bool turb_static_ok = (f_turb > 1700); 
+  bool isStaticClean  = ph_static_ok && tds_static_ok && turb_static_ok;
+
+  // LAYER 2: ADAPTIVE NUDGE (Active only after Calibration)
+  bool nudge_pass = true; // Default to TRUE (Fallback mode)
+
+  switch (currentState) {
+    case WARMUP:
+      if (millis() > WARMUP_MS) currentState = CALIBRATING;
+      break;
+
+    case CALIBRATING:
+      tdsSum += f_tds;
+      tdsSqSum += (f_tds * f_tds);
+      sampleCount++;
+      if (sampleCount >= CALIB_SAMPLES) {
+        float mean = tdsSum / CALIB_SAMPLES;
+        float variance = (tdsSqSum / CALIB_SAMPLES) - (mean * mean);
+        baseTDS = mean;
+        stdTDS = sqrt(max(0.0, variance)); 
+        currentState = OPERATIONAL;
+      }
+      break;
+
+    case OPERATIONAL:
+      // If stdTDS is very low (insignificant), we ignore the nudge to avoid false positives
+      if (stdTDS > 2.0) { 
+        float z_score = abs(f_tds - baseTDS) / stdTDS;
+        nudge_pass = (z_score < SIGMA_THRESHOLD);
+      }
+      break;
+  }
+
+  // 5. COMBINED DECISION
+  // We use the static clean check. If we are Operational, we also check the nudge.
+  bool finalDecision = isStaticClean && nudge_pass;
+
+  // Confidence Engine
+  if (!finalDecision) {
+    confidenceCounter++;
+    if (confidenceCounter >= CONFIDENCE_LIMIT) {
+      confidenceCounter = CONFIDENCE_LIMIT;
+      isHarvesting = false; 
+    }
+  } else {
+    confidenceCounter--;
+    if (confidenceCounter <= 0) {
+      confidenceCounter = 0;
+      isHarvesting = true;
+    }
+  }
+
+  // 6. ACTUATION
+  if (isHarvesting) {
+    digitalWrite(RELAY_PIN, LOW); // ON
+  } else {
+    digitalWrite(RELAY_PIN, HIGH); // OFF
+  }
+
+  // 7. TELEMETRY
+  if (binaryTelemetry) {
+    sendBinaryFrame(nudge_pass);
+    delay(SAMPLE_MS_BINARY);
+    return;
+  }
+  Serial.print("{\"ph\":"); Serial.print(f_ph, 2);
+  Serial.print(",\"tds\":"); Serial.print(f_tds, 0);
+  Serial.print(",\"turb\":"); Serial.print(f_turb, 0);
+  Serial.print(",\"valve\":"); Serial.print(isHarvesting ? 1 : 0);
+  Serial.print(",\"state\":"); Serial.print((int)currentState);
+  Serial.print(",\"progress\":"); Serial.print((sampleCount * 100) / CALIB_SAMPLES);
+  Serial.print(",\"base_tds\":"); Serial.print(baseTDS, 0);
+  Serial.print(",\"nudge\":"); Serial.print(nudge_pass ? 1 : 0);
+  Serial.println("}");
+
+  delay(SAMPLE_MS_JSON);
+}
\ No newline at end of file
@@ -12,10 +12,11 @@ import numpy as np
 from dataclasses import dataclass, field
 from typing import Optional
 
-from app.schemas import SensorReading, CalibrationBaseline
+from app.schemas import CalibrationBaseline
+from app.records import Reading
 
 
-@dataclass
+@dataclass(slots=True)
 class AnomalyVerdict:
     """Result of running all four tiers."""
     # Overall
@@ -69,7 +70,7 @@ class QuadGuardEngine:
         if device_id not in self._buffers:
             self._buffers[device_id] = []
 
-    def _push(self, device_id: str, reading: SensorReading):
+    def _push(self, device_id: str, reading: Reading):
         self._ensure_buffer(device_id)
         buf = self._buffers[device_id]
         buf.append({"ph": reading.ph, "tds": reading.tds, "turbidity": reading.turbidity})
@@ -78,7 +79,7 @@ class QuadGuardEngine:
 
     def evaluate(
         self,
-        reading: SensorReading,
+        reading: Reading,
         baseline: Optional[CalibrationBaseline] = None,
     ) -> AnomalyVerdict:
         """Run all 4 tiers and return a combined verdict."""
@@ -118,7 +119,7 @@ class QuadGuardEngine:
         return verdict
 
     # ── T1: Electronic Boundary Check ───────────────────
-    def _tier1(self, r: SensorReading, v: AnomalyVerdict):
+    def _tier1(self, r: Reading, v: AnomalyVerdict):
         """Detect catastrophic hardware failure."""
         issues = []
         if r.ph < 1.0 or r.ph > 13.0:
@@ -142,12 +143,11 @@ class QuadGuardEngine:
         issues = []
         for key in ["ph", "tds", "turbidity"]:
             values = [s[key] for s in buf]
-            std = float(np.std(values))
 
-            if std == 0.0:
+            # σ = 0 exactly ⇔ every sample identical (np.std can round to ~1e-16)
+            if max(values) == min(values):
                 issues.append(f"{key} STUCK (σ=0.000000 — digital freeze)")
-            elif std < 0.001:
-                pass  # STABLE — normal, water is still or tap off
+            # tiny but non-zero σ is STABLE — normal, water is still or tap off
 
         if issues:
             v.t2_fault = True
@@ -156,7 +156,7 @@ class QuadGuardEngine:
     # ── T3: Local Z-Score ───────────────────────────────
     def _tier3(
         self,
-        r: SensorReading,
+        r: Reading,
         baseline: Optional[CalibrationBaseline],
         v: AnomalyVerdict,
     ):
@@ -191,7 +191,7 @@ class QuadGuardEngine:
             v.t3_detail = f"UNUSUAL WATER SIGNATURE (>{Z_SIGMA_THRESHOLD}σ): " + "; ".join(issues)
 
     # ── T4: Cross-Sensor Correlation ────────────────────
-    def _tier4(self, r: SensorReading, v: AnomalyVerdict):
+    def _tier4(self, r: Reading, v: AnomalyVerdict):
         """Detect physics-impossible cross-sensor conflicts."""
         issues = []
 
@@ -206,6 +206,86 @@ class QuadGuardEngine:
             v.t4_fault = True
             v.t4_detail = "CALIBRATION FAULT: " + "; ".join(issues) + " — Clean probes."
 
+    def evaluate_batch(
+        self,
+        device_ids: list[str],
+        starts: np.ndarray,
+        values: np.ndarray,
+        mean: np.ndarray,
+        std: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized evaluate() over readings grouped by device (bulk ingest).
+        values is (n, 3) pH/TDS/turbidity sorted by device then time;
+        device i owns rows starts[i]:starts[i+1]. mean/std are per-row
+        baselines (NaN = none). Returns (critical, warning) masks and
+        leaves each device's sliding buffer as if evaluated one by one.
+        """
+        ph, tds, turb = values[:, 0], values[:, 1], values[:, 2]
+        t1 = (ph < 1.0) | (ph > 13.0) | (tds > 4500) | (turb < 0)
+        t4 = (turb > 50) & (tds < 30)
+        with np.errstate(invalid="ignore"):
+            t3 = (np.abs(values - mean) / (std + EPSILON) > Z_SIGMA_THRESHOLD).any(axis=1)
+
+        # T2 (σ = 0 over the buffer) ⇔ the run of identical values ending at a
+        # reading covers the whole buffer. Runs continue from each device's
+        # existing buffer, summarised as (length, last value, trailing run).
+        n = len(values)
+        ends = np.append(starts[1:], n)
+        hist_len = np.zeros(len(device_ids), dtype=np.int64)
+        hist_last = np.full((len(device_ids), 3), np.nan)
+        hist_run = np.zeros((len(device_ids), 3), dtype=np.int64)
+        keys = ("ph", "tds", "turbidity")
+        for i, device_id in enumerate(device_ids):
+            buf = self._buffers.get(device_id)
+            if not buf:
+                continue
+            hist_len[i] = len(buf)
+            for k, key in enumerate(keys):
+                last = buf[-1][key]
+                run = 1
+                while run < len(buf) and buf[-1 - run][key] == last:
+                    run += 1
+                hist_last[i, k] = last
+                hist_run[i, k] = run
+
+        counts = ends - starts
+        position = np.arange(n) - np.repeat(starts, counts)
+        buffer_len = np.minimum(np.repeat(hist_len, counts) + position + 1, BUFFER_SIZE)
+        idx = np.arange(n)
+        stuck = np.zeros(n, bool)
+        for k in range(3):
+            col = values[:, k]
+            run_start = position == 0
+            run_start[1:] |= col[1:] != col[:-1]
+            run_len = idx - np.maximum.accumulate(np.where(run_start, idx, 0)) + 1
+            continues = (run_len == position + 1) & (col == np.repeat(hist_last[:, k], counts))
+            run_len += np.where(continues, np.repeat(hist_run[:, k], counts), 0)
+            stuck |= run_len >= buffer_len
+        t2 = stuck & (buffer_len >= 10)
+
+        # Slide every device's buffer forward by its new readings
+        for device_id, s, e in zip(device_ids, starts.tolist(), ends.tolist()):
+            new = [{"ph": p, "tds": t, "turbidity": u} for p, t, u in values[max(s, e - BUFFER_SIZE):e].tolist()]
+            keep = BUFFER_SIZE - len(new)
+            old = self._buffers.get(device_id, [])
+            self._buffers[device_id] = (old[-keep:] if keep else []) + new
+
+        critical = t1 | t3 | t4
+        return critical, t2 & ~critical
+
     def reset(self, device_id: str):
         """Clear buffers for a device."""
         self._buffers.pop(device_id, None)
+
+    def device_ids(self) -> list[str]:
+        return list(self._buffers)
+
+    def export_device(self, device_id: str) -> list[dict]:
+        """The device's sliding window — to hand it to another pipeline shard."""
+        return self._buffers.get(device_id, [])
+
+    def import_device(self, device_id: str, window: list[dict]):
+        self._buffers.pop(device_id, None)
+        if window:
+            self._buffers[device_id] = window
@@ -2,16 +2,19 @@
 HarvesSink – AI Inference Engine.
 Model 1: Soft-sensor regressor (BOD/COD prediction) using trained XGBoost V2.
 Model 2: Sensor health anomaly detector (Z-score based).
+
+pandas and joblib (and the model's own library, e.g. xgboost, pulled in by
+unpickling) are imported on first use, not with this module — the formula
+fallback serves without them while the model loads in the background.
 """
 
 import os
 import numpy as np
-import pandas as pd
 from typing import Optional
 
-import joblib
-
-from app.schemas import SensorReading, InferenceResult
+from app.ai import registry, surrogate as grid_surrogate
+from app.config import settings
+from app.records import Reading, Inference
 
 
 # V2 XGBoost model trained on Bangalore STP data (9 locations)
@@ -33,6 +36,88 @@ DEFAULT_TEMP_MAX = 32.0
 DEFAULT_TEMP_MIN = 22.0
 
 
+def serving_features(ph: np.ndarray, turbidity: np.ndarray) -> np.ndarray:
+    """
+    Sensor columns → V2 feature matrix: climate defaults, pH, turbidity as
+    the TSS proxy, no STP location. Shared by batch inference and training
+    (latency is measured on stored readings mapped this way).
+    """
+    X = np.zeros((len(ph), len(V2_FEATURE_COLS)))
+    X[:, 0] = DEFAULT_TEMP_AVG
+    X[:, 1] = DEFAULT_TEMP_MAX
+    X[:, 2] = DEFAULT_TEMP_MIN
+    X[:, 3] = ph
+    X[:, 4] = turbidity        # turbidity ≈ TSS proxy
+    return X
+
+
+def predict_matrix(model, ph: np.ndarray, tds: np.ndarray, turbidity: np.ndarray,
+                   surrogate=None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    BOD/COD of a given model (None = formula fallback) for columns of readings.
+    With a surrogate, only rows it can't answer from its grid reach the model.
+    """
+    if model is None:
+        bod = np.maximum(0.0, 0.8 * turbidity + 0.02 * tds + 1.5 * np.abs(ph - 7.0))
+        return np.round(bod, 2), np.round(bod * 2.2, 2)
+    if surrogate is not None:
+        bod, cod, hit = surrogate.lookup_batch(ph, turbidity)
+        miss = ~hit
+        if miss.any():
+            bod[miss], cod[miss] = predict_matrix(model, ph[miss], tds[miss], turbidity[miss])
+        return bod, cod
+    import pandas as pd
+    prediction = model.predict(pd.DataFrame(serving_features(ph, turbidity), columns=V2_FEATURE_COLS))
+    cod = np.maximum(0.0, prediction[:, 0])
+    bod = np.maximum(0.0, prediction[:, 1])
+    return np.round(bod, 2), np.round(cod, 2)
+
+
+def load_surrogate(path: str):
+    """The lookup grid stored for this artifact, if enabled and built for exactly this model."""
+    if not settings.inference_surrogate:
+        return None
+    surrogate = grid_surrogate.load_for(path)
+    if surrogate is not None:
+        print(f"🧮 Lookup-grid surrogate for {os.path.basename(path)}: {surrogate.coverage():.1%} of cells served without the model")
+    return surrogate
+
+
+def prepare_model(path: str):
+    """
+    Load an artifact (and its surrogate, if built) and warm it up through
+    both inference paths, so the first live reading after a swap doesn't pay
+    for lazy initialisation. Rejects models whose output isn't finite
+    [COD, BOD, Ammonia]. Returns (model, surrogate or None).
+    """
+    import joblib
+    import pandas as pd
+
+    model = joblib.load(path)
+    ph = np.array([6.5, 7.0, 7.5, 8.0])
+    turbidity = np.array([1.0, 5.0, 20.0, 80.0])
+    prediction = model.predict(pd.DataFrame(serving_features(ph, turbidity), columns=V2_FEATURE_COLS))
+    if prediction.shape != (len(ph), 3) or not np.isfinite(prediction).all():
+        raise ValueError(f"Model output {prediction.shape} is not finite [COD, BOD, Ammonia] per row")
+    surrogate = load_surrogate(path)
+    engine = InferenceEngine()
+    engine.swap(model, "warm-up", surrogate)
+    engine.predict(Reading(ph=7.2, turbidity=3.0))
+    if surrogate is not None:
+        surrogate.hits = surrogate.misses = 0
+    return model, surrogate
+
+
+def active_artifact() -> Optional[tuple[str, str]]:
+    """(path, version) of the model to serve: active registry version, else the bundled V2 model, else None."""
+    path = registry.active_path()
+    if path:
+        return path, registry.active_version()
+    if os.path.exists(MODEL_PATH):
+        return MODEL_PATH, "bundled-v2"
+    return None
+
+
 class InferenceEngine:
     """
     Runs AI inference on each sensor reading.
@@ -40,28 +125,62 @@ class InferenceEngine:
     """
 
     def __init__(self):
-        self._model = None
+        self._serving = (None, None)          # (model, surrogate built from it)
+        self.model_version: Optional[str] = None
 
     def load_model(self):
-        """Load the trained V2 XGBoost soft-sensor model from disk."""
-        if os.path.exists(MODEL_PATH):
-            self._model = joblib.load(MODEL_PATH)
-            print(f"✅ Loaded V2 XGBoost model from {MODEL_PATH}")
-        else:
+        """
+        Load the active registry version (python -m app.ai.training), else the
+        bundled V2 model, blocking. The API loads it in the background instead
+        (ModelManager.load_active).
+        """
+        import joblib
+
+        artifact = active_artifact()
+        if artifact is None:
             print(f"⚠️  No model found at {MODEL_PATH}. Using formula fallback.")
-
-    def predict(self, reading: SensorReading) -> InferenceResult:
+            return
+        path, self.model_version = artifact
+        self._serving = (joblib.load(path), load_surrogate(path))
+        print(f"✅ Loaded model {self.model_version} from {path}")
+
+    def swap(self, model, version: str, surrogate=None) -> Optional[str]:
+        """
+        Replace the serving model and its surrogate (one attribute assignment
+        — every predict call reads them once, so a reading never mixes two
+        models). Returns the previous version.
+        """
+        previous = self.model_version
+        self._serving = (model, surrogate)
+        self.model_version = version
+        return previous
+
+    @property
+    def model(self):
+        return self._serving[0]
+
+    @property
+    def surrogate(self):
+        return self._serving[1]
+
+    def predict(self, reading: Reading) -> Inference:
         """Run soft-sensor prediction (anomaly detection is handled by QuadGuard)."""
         bod, cod = self._predict_bod_cod(reading)
 
-        return InferenceResult(
+        return Inference(
             bod_predicted=round(bod, 2),
             cod_predicted=round(cod, 2),
         )
 
+    def predict_batch(self, ph: np.ndarray, tds: np.ndarray, turbidity: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized BOD/COD for many readings at once (bulk ingest)."""
+        model, surrogate = self._serving
+        return predict_matrix(model, ph, tds, turbidity, surrogate)
+
     # ── Model 1: Soft-Sensor (V2 XGBoost) ───────────────────
-    def _predict_bod_cod(self, reading: SensorReading) -> tuple[float, float]:
-        if self._model is None:
+    def _predict_bod_cod(self, reading: Reading) -> tuple[float, float]:
+        model, surrogate = self._serving
+        if model is None:
             # Deterministic formula fallback
             bod = (
                 0.8 * reading.turbidity
@@ -71,6 +190,12 @@ class InferenceEngine:
             cod = bod * 2.2
             return round(max(0.0, bod), 2), round(max(0.0, cod), 2)
 
+        # Inside the tabulated grid: interpolate instead of walking the ensemble
+        if surrogate is not None:
+            hit = surrogate.lookup(reading.ph, reading.turbidity)
+            if hit is not None:
+                return hit
+
         # Build the 14-feature input matching the V2 model's training columns.
         # Sensor mapping: pH → pH, Turbidity → TSS (turbidity is a proxy for TSS).
         # Temperature & Location use sensible defaults.
@@ -86,9 +211,10 @@ class InferenceEngine:
             if col not in row:
                 row[col] = 0
 
+        import pandas as pd
         X = pd.DataFrame([row], columns=V2_FEATURE_COLS)
         # Model output order: [COD, BOD, Ammonia]
-        prediction = self._model.predict(X)[0]
+        prediction = model.predict(X)[0]
         cod = float(max(0.0, prediction[0]))
         bod = float(max(0.0, prediction[1]))
         return round(bod, 2), round(cod, 2)
@@ -1,10 +1,24 @@
 """
 HarvesSink – LLM Sustainability Nudge (RAG-Lite).
 Optional external feature — not polished, not required for core flow.
+
+NudgeService sits between /api/nudge and the LLM backend:
+  • readings are reduced to an activity class + quantized (pH, TDS, turbidity)
+    bucket, and nudges are cached per bucket for NUDGE_CACHE_TTL_S
+  • concurrent requests for the same bucket share one backend call
+  • each call gets LLM_TIMEOUT_S; timeouts/errors answer with the rule-based
+    nudge (cached for NUDGE_ERROR_TTL_S so an outage isn't retried per hit)
+Backends: "openai" (one pooled AsyncOpenAI client) or "local" — a canned
+stand-in with configurable latency for offline development and benchmarks.
 """
 
-from typing import Optional
-from app.schemas import SensorReading, SustainabilityNudge
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
+
+from app.schemas import SustainabilityNudge
+from app.records import Reading
 from app.config import settings
 
 
@@ -15,50 +29,212 @@ Based on the sensor metrics provided, tell the user:
 3. Any environmental impact insight.
 Keep responses under 60 words. Be friendly and practical."""
 
+ACTIVITY_LABELS = {
+    "dishwashing": "Dishwashing",
+    "vegetable_washing": "Vegetable washing",
+    "general": "General use",
+}
 
-async def generate_nudge(reading: SensorReading) -> Optional[SustainabilityNudge]:
-    """
-    Calls the LLM API to generate a sustainability nudge.
-    Returns None if LLM is disabled or fails.
-    """
-    if not settings.llm_enabled or not settings.openai_api_key:
-        return _fallback_nudge(reading)
 
-    try:
-        from openai import AsyncOpenAI
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
+def classify_activity(reading: Reading) -> str:
+    """Coarse activity class from the sensor signature (same rules as the fallback nudge)."""
+    if reading.tds > 400 and reading.turbidity > 8:
+        return "dishwashing"
+    if reading.turbidity > 5:
+        return "vegetable_washing"
+    return "general"
 
-        user_msg = (
-            f"Current water metrics — pH: {reading.ph}, TDS: {reading.tds} ppm, "
-            f"Turbidity: {reading.turbidity} NTU"
-        )
 
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
+# ── Backends ────────────────────────────────────────────────
+class NudgeBackend(Protocol):
+    name: str
+
+    async def generate(self, reading: Reading, activity: str) -> str: ...
+
+    async def close(self): ...
+
+
+def _user_message(reading: Reading, activity: str) -> str:
+    return (
+        f"Current water metrics — pH: {reading.ph}, TDS: {reading.tds} ppm, "
+        f"Turbidity: {reading.turbidity} NTU. Sensor signature suggests: {ACTIVITY_LABELS[activity]}"
+    )
+
+
+class OpenAIBackend:
+    """One AsyncOpenAI client for the process — its HTTP connection pool is reused across nudges."""
+
+    name = "openai"
+
+    def __init__(self, api_key: str):
+        self._api_key = api_key
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            # NudgeService owns the timeout budget; no SDK retries behind its back
+            self._client = AsyncOpenAI(api_key=self._api_key, max_retries=0)
+        return self._client
+
+    async def generate(self, reading: Reading, activity: str) -> str:
+        response = await self._get_client().chat.completions.create(
+            model=settings.llm_model,
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_msg},
+                {"role": "user", "content": _user_message(reading, activity)},
             ],
             max_tokens=120,
             temperature=0.7,
         )
+        return response.choices[0].message.content or ""
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class LocalBackend:
+    """Offline stand-in: a canned tip per activity after LLM_LOCAL_LATENCY_MS."""
+
+    name = "local"
+
+    TIPS = {
+        "dishwashing": "Scrape plates into compost and soak pans before rinsing — it cuts rinse water by about a third.",
+        "vegetable_washing": "Wash vegetables in a bowl, not under the tap, then water your plants with it.",
+        "general": "This water is clean enough to harvest — keep the diverter open.",
+    }
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    async def generate(self, reading: Reading, activity: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency_ms / 1000)
+        return f"{ACTIVITY_LABELS[activity]} at pH {reading.ph:.1f}, {reading.turbidity:.0f} NTU. {self.TIPS[activity]}"
+
+    async def close(self):
+        pass
+
+
+def make_backend() -> Optional[NudgeBackend]:
+    """Backend from settings, or None → rule-based nudges only."""
+    if not settings.llm_enabled:
+        return None
+    if settings.llm_backend == "local":
+        return LocalBackend(settings.llm_local_latency_ms)
+    if settings.llm_backend == "openai" and settings.openai_api_key:
+        return OpenAIBackend(settings.openai_api_key)
+    return None
+
+
+# ── Service ─────────────────────────────────────────────────
+class NudgeService:
+    """Cached, coalesced, time-boxed nudges for /api/nudge."""
+
+    def __init__(self, backend: Optional[NudgeBackend] = None):
+        self.backend = backend if backend is not None else make_backend()
+        self._cache: OrderedDict[tuple, tuple[float, SustainabilityNudge]] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.calls = 0
+        self.call_s = 0.0
+        self.call_max_s = 0.0
+
+    @staticmethod
+    def key(reading: Reading, activity: str) -> tuple:
+        return (
+            activity,
+            round(reading.ph / settings.nudge_quant_ph),
+            round(reading.tds / settings.nudge_quant_tds),
+            round(reading.turbidity / settings.nudge_quant_turbidity),
+        )
+
+    async def get(self, reading: Reading) -> SustainabilityNudge:
+        if self.backend is None:
+            return _fallback_nudge(reading)
+        activity = classify_activity(reading)
+        key = self.key(reading, activity)
+
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._generate(key, reading, activity))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: a client that disconnects mustn't cancel the call others are waiting on
+        return await asyncio.shield(task)
 
-        text = response.choices[0].message.content or ""
-        return SustainabilityNudge(message=text, activity_guess="", tip=text)
+    async def _generate(self, key: tuple, reading: Reading, activity: str) -> SustainabilityNudge:
+        started = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(self.backend.generate(reading, activity), settings.llm_timeout_s)
+            nudge = SustainabilityNudge(message=text, activity_guess=ACTIVITY_LABELS[activity], tip=text)
+            ttl = settings.nudge_cache_ttl_s
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            nudge, ttl = _fallback_nudge(reading), settings.nudge_error_ttl_s
+        except Exception as e:
+            self.errors += 1
+            print(f"Nudge backend error ({self.backend.name}): {e}")
+            nudge, ttl = _fallback_nudge(reading), settings.nudge_error_ttl_s
+        elapsed = time.perf_counter() - started
+        self.calls += 1
+        self.call_s += elapsed
+        self.call_max_s = max(self.call_max_s, elapsed)
 
-    except Exception:
-        return _fallback_nudge(reading)
+        self._cache[key] = (time.monotonic() + ttl, nudge)
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.nudge_cache_size:
+            self._cache.popitem(last=False)
+        return nudge
 
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
 
-def _fallback_nudge(reading: SensorReading) -> SustainabilityNudge:
+    def stats(self) -> dict:
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "backend": self.backend.name if self.backend else "rules",
+            "cached": len(self._cache),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / requests, 4) if requests else None,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "backend_calls": self.calls,
+            "backend_avg_ms": round(self.call_s / self.calls * 1000, 1) if self.calls else None,
+            "backend_max_ms": round(self.call_max_s * 1000, 1),
+        }
+
+
+def _fallback_nudge(reading: Reading) -> SustainabilityNudge:
     """Simple rule-based fallback when LLM is unavailable."""
-    if reading.tds > 400 and reading.turbidity > 8:
+    activity = classify_activity(reading)
+    if activity == "dishwashing":
         return SustainabilityNudge(
             message="Looks like a heavy cleaning activity.",
             activity_guess="Dishwashing",
             tip="Try soaking dishes first to reduce water usage by ~30%.",
         )
-    if reading.turbidity > 5:
+    if activity == "vegetable_washing":
         return SustainabilityNudge(
             message="Moderate turbidity detected.",
             activity_guess="Vegetable washing",
@@ -0,0 +1,270 @@
+"""
+HarvesSink – Live model management: hot swap and shadow evaluation.
+Registry versions (app/ai/registry.py) are loaded and warmed up in a worker
+thread, then swapped into the running InferenceEngine in one assignment —
+calibration buffers, Quad-Guard state and WebSocket clients are untouched.
+
+A shadow version sees a sampled fraction of live readings. Sampled
+readings are queued with the active model's prediction and scored in
+batches off the event loop; the shadow model never influences valve
+decisions or the kill-switch.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+from app.ai import registry
+from app.ai.inference import InferenceEngine, MODEL_PATH, active_artifact, prepare_model, predict_matrix
+from app.config import settings
+from app.records import Reading, Inference
+
+
+MAX_PENDING = 10_000           # sampled readings waiting for the evaluator
+LATENCY_SAMPLE = 20            # rows per evaluation timed through the one-row path
+
+
+class _Diff:
+    """Running agreement statistics for one output."""
+
+    __slots__ = ("n", "abs_sum", "bias_sum", "max_abs")
+
+    def __init__(self):
+        self.n = 0
+        self.abs_sum = 0.0
+        self.bias_sum = 0.0
+        self.max_abs = 0.0
+
+    def add(self, shadow: np.ndarray, active: np.ndarray):
+        diff = shadow - active
+        self.n += len(diff)
+        self.abs_sum += float(np.abs(diff).sum())
+        self.bias_sum += float(diff.sum())
+        self.max_abs = max(self.max_abs, float(np.abs(diff).max()))
+
+    def to_dict(self) -> dict:
+        n = max(self.n, 1)
+        return {"mae": round(self.abs_sum / n, 3), "bias": round(self.bias_sum / n, 3), "max_abs": round(self.max_abs, 2)}
+
+
+class _Latency:
+    __slots__ = ("batch_s", "batch_rows", "single_s", "single_rows")
+
+    def __init__(self):
+        self.batch_s = self.single_s = 0.0
+        self.batch_rows = self.single_rows = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "batch_row_us": round(self.batch_s / max(self.batch_rows, 1) * 1e6, 2),
+            "single_row_us": round(self.single_s / max(self.single_rows, 1) * 1e6, 1),
+        }
+
+
+class ShadowRun:
+    """One shadow version: sampling queue plus comparison against the active model."""
+
+    def __init__(self, version: str, model, fraction: float):
+        self.version = version
+        self.model = model
+        self.fraction = fraction
+        self.started_at = datetime.utcnow()
+        self._pending: deque[tuple[float, float, float, float, float]] = deque()
+        self.sampled = 0
+        self.dropped = 0
+        self.compared = 0
+        self.kill_flips = 0          # readings where the kill-switch verdict would differ
+        self.bod = _Diff()
+        self.cod = _Diff()
+        self.latency = {"active": _Latency(), "shadow": _Latency()}
+
+    def offer(self, reading: Reading, inference: Inference):
+        if random.random() >= self.fraction:
+            return
+        self.sampled += 1
+        if len(self._pending) >= MAX_PENDING:
+            self.dropped += 1
+            return
+        self._pending.append((reading.ph, reading.tds, reading.turbidity, inference.bod_predicted, inference.cod_predicted))
+
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def evaluate(self, active_model):
+        """Score everything queued (runs in a worker thread)."""
+        rows = [self._pending.popleft() for _ in range(len(self._pending))]
+        if not rows:
+            return
+        ph, tds, turb, active_bod, active_cod = (np.array(col) for col in zip(*rows))
+
+        # Both models on the same rows — the batch path for agreement and
+        # throughput, a few rows through the one-row path the live stream uses
+        single = [Reading(ph=float(p), tds=float(t), turbidity=float(u)) for p, t, u, _, _ in rows[:LATENCY_SAMPLE]]
+        for name, model in (("shadow", self.model), ("active", active_model)):
+            lat = self.latency[name]
+            started = time.perf_counter()
+            out = predict_matrix(model, ph, tds, turb)
+            lat.batch_s += time.perf_counter() - started
+            lat.batch_rows += len(rows)
+            if name == "shadow":
+                bod, cod = out
+            engine = InferenceEngine()
+            engine.swap(model, name)
+            started = time.perf_counter()
+            for reading in single:
+                engine.predict(reading)
+            lat.single_s += time.perf_counter() - started
+            lat.single_rows += len(single)
+
+        self.bod.add(bod, active_bod)
+        self.cod.add(cod, active_cod)
+        kill_shadow = (bod > settings.bod_kill_threshold) | (cod > settings.cod_kill_threshold)
+        kill_active = (active_bod > settings.bod_kill_threshold) | (active_cod > settings.cod_kill_threshold)
+        self.kill_flips += int((kill_shadow != kill_active).sum())
+        self.compared += len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "fraction": self.fraction,
+            "started_at": self.started_at.isoformat(),
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+            "compared": self.compared,
+            "bod": self.bod.to_dict(),
+            "cod": self.cod.to_dict(),
+            "kill_flips": self.kill_flips,
+            "kill_flip_rate": round(self.kill_flips / max(self.compared, 1), 4),
+            "latency": {name: lat.to_dict() for name, lat in self.latency.items()},
+        }
+
+
+class ModelManager:
+    """Background loading, atomic swap and shadow runs for one InferenceEngine."""
+
+    def __init__(self, engine: InferenceEngine, on_swap: Optional[Callable[[str], Awaitable[None]]] = None):
+        self.engine = engine
+        self.on_swap = on_swap          # version → other engines serving it (pipeline shards)
+        self.shadow: Optional[ShadowRun] = None
+        self.loading: Optional[dict] = None        # {"version", "purpose", "started_at"}
+        self.last_swap: Optional[dict] = None
+        self.last_error: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _artifact(version: str) -> str:
+        if registry.get_version(version) is None:
+            raise KeyError(f"Unknown model version '{version}'")
+        return registry.artifact_path(version)
+
+    async def _prepare(self, version: str, purpose: str, path: Optional[str] = None):
+        self.loading = {"version": version, "purpose": purpose, "started_at": datetime.utcnow().isoformat()}
+        try:
+            started = time.perf_counter()
+            model, surrogate = await asyncio.to_thread(prepare_model, path or self._artifact(version))
+            return model, surrogate, (time.perf_counter() - started) * 1000
+        finally:
+            self.loading = None
+
+    async def load_active(self):
+        """
+        Startup load of the active registry version (else the bundled model)
+        off the event loop. Until it is swapped in, readings are served by
+        the formula fallback.
+        """
+        artifact = active_artifact()
+        if artifact is None:
+            print(f"⚠️  No model found at {MODEL_PATH}. Using formula fallback.")
+            return
+        path, version = artifact
+        async with self._lock:
+            try:
+                model, surrogate, load_ms = await self._prepare(version, "startup", path)
+                previous = self.engine.swap(model, version, surrogate)
+                self.last_swap = {
+                    "version": version, "previous": previous, "surrogate": surrogate is not None,
+                    "load_ms": round(load_ms, 1), "at": datetime.utcnow().isoformat(),
+                }
+                print(f"✅ Loaded model {version} from {path} in the background ({load_ms:.0f} ms load + warm-up)")
+            except Exception as e:
+                self.last_error = f"startup {version}: {e}"
+                print(f"Model load failed, serving the formula fallback: {self.last_error}")
+
+    async def activate(self, version: str):
+        """Load + warm up `version` off the event loop, swap it in, and make it the registry's active version."""
+        async with self._lock:
+            try:
+                model, surrogate, load_ms = await self._prepare(version, "activate")
+                previous = self.engine.swap(model, version, surrogate)
+                registry.set_active(version)
+                if self.on_swap:
+                    await self.on_swap(version)
+                self.last_swap = {
+                    "version": version, "previous": previous, "surrogate": surrogate is not None,
+                    "load_ms": round(load_ms, 1), "at": datetime.utcnow().isoformat(),
+                }
+                self.last_error = None
+                if self.shadow and self.shadow.version == version:
+                    self.shadow = None          # promoted — nothing left to compare
+                print(f"🔁 Model {previous} → {version} ({load_ms:.0f} ms load + warm-up)")
+            except Exception as e:
+                self.last_error = f"activate {version}: {e}"
+                print(f"Model swap failed: {self.last_error}")
+
+    async def start_shadow(self, version: str, fraction: float):
+        async with self._lock:
+            try:
+                model, _, _ = await self._prepare(version, "shadow")
+                self.shadow = ShadowRun(version, model, fraction)
+                self.last_error = None
+                print(f"👥 Shadowing model {version} on {fraction:.0%} of live readings")
+            except Exception as e:
+                self.last_error = f"shadow {version}: {e}"
+                print(f"Shadow start failed: {self.last_error}")
+
+    def schedule(self, coro):
+        """Run a load in the background (one at a time) so the admin request returns at once."""
+        if self._task and not self._task.done():
+            coro.close()
+            raise RuntimeError("A model load is already in progress")
+        self._task = asyncio.create_task(coro)
+
+    def stop_shadow(self) -> Optional[dict]:
+        run, self.shadow = self.shadow, None
+        return run.stats() if run else None
+
+    def observe(self, reading: Reading, inference: Inference):
+        """Live stream hook — cheap unless a shadow run is sampling."""
+        if self.shadow is not None:
+            self.shadow.offer(reading, inference)
+
+    async def run(self):
+        """Background loop: score sampled readings against the shadow model."""
+        while True:
+            try:
+                await asyncio.sleep(settings.shadow_eval_interval_s)
+                run = self.shadow
+                if run is not None and run.has_pending():
+                    await asyncio.to_thread(run.evaluate, self.engine.model)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"Shadow evaluation error: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "active": self.engine.model_version,
+            "surrogate": self.engine.surrogate.stats() if self.engine.surrogate else None,
+            "registry_active": registry.active_version(),
+            "loading": self.loading,
+            "last_swap": self.last_swap,
+            "last_error": self.last_error,
+            "shadow": self.shadow.stats() if self.shadow else None,
+        }
@@ -0,0 +1,110 @@
+"""
+HarvesSink – Versioned model registry.
+Every training run writes saved_models/registry/<version>/ with the model
+artifact and its metrics; registry/index.json lists the versions and which
+one is active. The inference engine loads the active version and falls
+back to the bundled V2 model (MODEL_PATH) when the registry is empty.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+
+SAVED_MODELS_DIR = os.path.join(os.path.dirname(__file__), "saved_models")
+REGISTRY_DIR = os.path.join(SAVED_MODELS_DIR, "registry")
+INDEX_PATH = os.path.join(REGISTRY_DIR, "index.json")
+ARTIFACT_NAME = "model.joblib"
+
+
+def _load_index() -> dict:
+    if os.path.exists(INDEX_PATH):
+        try:
+            with open(INDEX_PATH, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            pass
+    return {"active": None, "versions": []}
+
+
+def _save_index(index: dict):
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    tmp = INDEX_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2, default=str)
+    os.replace(tmp, INDEX_PATH)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_versions() -> list[dict]:
+    return _load_index()["versions"]
+
+
+def active_version() -> Optional[str]:
+    return _load_index()["active"]
+
+
+def get_version(version: str) -> Optional[dict]:
+    return next((v for v in list_versions() if v["version"] == version), None)
+
+
+def artifact_path(version: str) -> str:
+    return os.path.join(REGISTRY_DIR, version, ARTIFACT_NAME)
+
+
+def active_path() -> Optional[str]:
+    """Artifact of the active version, if the registry has one."""
+    version = active_version()
+    if version and os.path.exists(artifact_path(version)):
+        return artifact_path(version)
+    return None
+
+
+def register(model, features: list[str], targets: list[str], metrics: dict, params: dict,
+             data: dict, activate: bool = False) -> dict:
+    """
+    Store a trained model as the next version (v1, v2, …) with its metrics.
+    Nothing is overwritten; activate=True also makes it the active version.
+    """
+    index = _load_index()
+    version = f"v{len(index['versions']) + 1}"
+    os.makedirs(os.path.join(REGISTRY_DIR, version), exist_ok=True)
+    import joblib
+
+    path = artifact_path(version)
+    joblib.dump(model, path)
+    entry = {
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "artifact": os.path.relpath(path, SAVED_MODELS_DIR),
+        "sha256": file_sha256(path),
+        "features": features,
+        "targets": targets,
+        "params": params,
+        "metrics": metrics,
+        "data": data,
+    }
+    with open(os.path.join(REGISTRY_DIR, version, "metrics.json"), "w") as f:
+        json.dump(entry, f, indent=2, default=str)
+    index["versions"].append(entry)
+    if activate:
+        index["active"] = version
+    _save_index(index)
+    return entry
+
+
+def set_active(version: str):
+    index = _load_index()
+    if not any(v["version"] == version for v in index["versions"]):
+        raise KeyError(f"Unknown model version '{version}'")
+    index["active"] = version
+    _save_index(index)
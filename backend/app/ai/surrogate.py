@@ -0,0 +1,267 @@
+"""
+HarvesSink – Lookup-grid surrogate for the BOD/COD soft-sensor.
+On the live path the model only ever varies in pH and turbidity (climate
+and location are fixed per profile), so the ensemble is evaluated once
+over a dense pH × turbidity grid and readings are answered by bilinear
+interpolation — a few array reads instead of a full tree walk.
+
+Tree ensembles are step functions, so a grid cell that straddles a big
+split can't be interpolated faithfully. Cells whose corners differ by
+more than SURROGATE_TOLERANCE mg/L are flagged at build time and, like
+inputs outside the grid, are answered by the real model.
+
+Build (stored next to the model artifact and loaded with it):
+  python -m app.ai.surrogate                  # active registry version, else bundled V2
+  python -m app.ai.surrogate --version v3 --profiles all
+"""
+
+import argparse
+import math
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.ai import registry
+from app.config import settings
+
+
+PH_MAX = 14.0
+TURBIDITY_MAX = 1000.0          # NTU; grid spacing is uniform in log1p(turbidity)
+FORMAT_VERSION = 1
+
+
+def surrogate_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".surrogate.npz"
+
+
+def profiles(names: str = "default") -> dict[str, dict]:
+    """
+    Climate/location profiles to tabulate. "default" is what the live
+    engine feeds the model (annual Bangalore climate, no STP location);
+    "all" adds one profile per STP location.
+    """
+    from app.ai.inference import DEFAULT_TEMP_AVG, DEFAULT_TEMP_MAX, DEFAULT_TEMP_MIN, V2_FEATURE_COLS
+    climate = {"Temperature (Avg)": DEFAULT_TEMP_AVG, "Max Temperature": DEFAULT_TEMP_MAX, "Min Temperature": DEFAULT_TEMP_MIN}
+    result = {"default": dict(climate)}
+    if names == "all":
+        for col in V2_FEATURE_COLS[5:]:
+            result[col.removeprefix("STP_Location_")] = {**climate, col: 1.0}
+    return result
+
+
+class GridSurrogate:
+    """
+    Per profile: BOD and COD over an (n_ph × n_turbidity) grid plus a mask
+    of cells that are safe to interpolate.
+    """
+
+    def __init__(self, ph_points: int, turbidity_points: int, tolerance: float,
+                 grids: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]], model_sha256: str = ""):
+        self.ph_points = ph_points
+        self.turbidity_points = turbidity_points
+        self.tolerance = tolerance
+        self.ph_step = PH_MAX / (ph_points - 1)
+        self.t_step = math.log1p(TURBIDITY_MAX) / (turbidity_points - 1)
+        self.grids = grids
+        self.model_sha256 = model_sha256
+        # Hot path: flat memoryviews over the tables index as fast as lists
+        # without a second copy (numpy scalar indexing is ~5× slower)
+        bod, cod, ok = (np.ascontiguousarray(a) for a in grids["default"])
+        self._bod = memoryview(bod).cast("B").cast("f")
+        self._cod = memoryview(cod).cast("B").cast("f")
+        self._ok = memoryview(ok.view(np.uint8)).cast("B")
+        self.hits = 0
+        self.misses = 0
+
+    # ── Build ───────────────────────────────────────────
+    @classmethod
+    def build(cls, model, profile_names: str = "default", ph_points: Optional[int] = None,
+              turbidity_points: Optional[int] = None, tolerance: Optional[float] = None,
+              model_sha256: str = "") -> "GridSurrogate":
+        import pandas as pd
+        from app.ai.inference import V2_FEATURE_COLS
+
+        ph_points = ph_points or settings.surrogate_ph_points
+        turbidity_points = turbidity_points or settings.surrogate_turbidity_points
+        tolerance = settings.surrogate_tolerance if tolerance is None else tolerance
+
+        ph = np.linspace(0.0, PH_MAX, ph_points)
+        turbidity = np.expm1(np.linspace(0.0, math.log1p(TURBIDITY_MAX), turbidity_points))
+        ph_col = np.repeat(ph, turbidity_points)
+        turb_col = np.tile(turbidity, ph_points)
+        grids = {}
+        for name, fixed in profiles(profile_names).items():
+            X = np.zeros((len(ph_col), len(V2_FEATURE_COLS)))
+            for j, col in enumerate(V2_FEATURE_COLS):
+                X[:, j] = fixed.get(col, 0.0)
+            X[:, 3] = ph_col
+            X[:, 4] = turb_col
+            prediction = model.predict(pd.DataFrame(X, columns=V2_FEATURE_COLS))
+            # float32 is what the ensembles output; halves the tables
+            cod = np.maximum(0.0, prediction[:, 0]).astype(np.float32).reshape(ph_points, turbidity_points)
+            bod = np.maximum(0.0, prediction[:, 1]).astype(np.float32).reshape(ph_points, turbidity_points)
+            grids[name] = (bod, cod, _safe_cells(bod, cod, tolerance))
+        return cls(ph_points, turbidity_points, tolerance, grids, model_sha256)
+
+    # ── Lookup ──────────────────────────────────────────
+    def lookup(self, ph: float, turbidity: float) -> Optional[tuple[float, float]]:
+        """(bod, cod) rounded like the engine, or None → ask the real model."""
+        if not (0.0 <= ph <= PH_MAX and 0.0 <= turbidity <= TURBIDITY_MAX):
+            self.misses += 1
+            return None
+        x = ph / self.ph_step
+        y = math.log1p(turbidity) / self.t_step
+        i = min(int(x), self.ph_points - 2)
+        j = min(int(y), self.turbidity_points - 2)
+        cell = i * self.turbidity_points + j
+        if not self._ok[cell]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        wx, wy = x - i, y - j
+        up = cell + self.turbidity_points
+        a, b, c, d = (1 - wx) * (1 - wy), (1 - wx) * wy, wx * (1 - wy), wx * wy
+        bod, cod = self._bod, self._cod
+        return (
+            round(a * bod[cell] + b * bod[cell + 1] + c * bod[up] + d * bod[up + 1], 2),
+            round(a * cod[cell] + b * cod[cell + 1] + c * cod[up] + d * cod[up + 1], 2),
+        )
+
+    def lookup_batch(self, ph: np.ndarray, turbidity: np.ndarray, profile: str = "default"):
+        """Vectorized lookup: (bod, cod, hit mask); rows with hit=False still need the model."""
+        bod_grid, cod_grid, ok = self.grids[profile]
+        inside = (ph >= 0.0) & (ph <= PH_MAX) & (turbidity >= 0.0) & (turbidity <= TURBIDITY_MAX)
+        x = np.where(inside, ph, 0.0) / self.ph_step
+        y = np.log1p(np.where(inside, turbidity, 0.0)) / self.t_step
+        i = np.minimum(x.astype(np.int64), self.ph_points - 2)
+        j = np.minimum(y.astype(np.int64), self.turbidity_points - 2)
+        hit = inside & ok[i, j]
+        wx, wy = x - i, y - j
+
+        def interp(grid):
+            return np.round(
+                (1 - wx) * (1 - wy) * grid[i, j] + (1 - wx) * wy * grid[i, j + 1]
+                + wx * (1 - wy) * grid[i + 1, j] + wx * wy * grid[i + 1, j + 1], 2,
+            )
+        self.hits += int(hit.sum())
+        self.misses += int(len(hit) - hit.sum())
+        return interp(bod_grid), interp(cod_grid), hit
+
+    def coverage(self) -> float:
+        """Share of grid cells served without the model (default profile)."""
+        return float(self.grids["default"][2].mean())
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "grid": [self.ph_points, self.turbidity_points],
+            "profiles": list(self.grids),
+            "tolerance": self.tolerance,
+            "cell_coverage": round(self.coverage(), 4),
+            "hits": self.hits,
+            "fallbacks": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+    # ── Storage ─────────────────────────────────────────
+    def save(self, path: str):
+        arrays = {}
+        for name, (bod, cod, ok) in self.grids.items():
+            arrays[f"{name}__bod"], arrays[f"{name}__cod"], arrays[f"{name}__ok"] = bod, cod, ok
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp, meta=np.array([FORMAT_VERSION, self.ph_points, self.turbidity_points, self.tolerance]),
+            model_sha256=np.array(self.model_sha256), **arrays,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, model_sha256: str) -> Optional["GridSurrogate"]:
+        """The stored surrogate, or None if missing, stale (different model) or from another format."""
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        version, ph_points, turbidity_points, tolerance = data["meta"].tolist()
+        if int(version) != FORMAT_VERSION or str(data["model_sha256"]) != model_sha256:
+            return None
+        names = {key.rsplit("__", 1)[0] for key in data.files if "__" in key}
+        grids = {n: (data[f"{n}__bod"].astype(np.float32), data[f"{n}__cod"].astype(np.float32), data[f"{n}__ok"]) for n in names}
+        return cls(int(ph_points), int(turbidity_points), float(tolerance), grids, model_sha256)
+
+
+def _safe_cells(bod: np.ndarray, cod: np.ndarray, tolerance: float) -> np.ndarray:
+    """Cells whose four corners agree within tolerance for both outputs."""
+    def spread(grid):
+        corners = np.stack((grid[:-1, :-1], grid[:-1, 1:], grid[1:, :-1], grid[1:, 1:]))
+        return corners.max(axis=0) - corners.min(axis=0)
+    ok = np.zeros(bod.shape, dtype=bool)            # last row/column are never a cell origin
+    ok[:-1, :-1] = (spread(bod) <= tolerance) & (spread(cod) <= tolerance)
+    return ok
+
+
+def load_for(model_path: str) -> Optional[GridSurrogate]:
+    return GridSurrogate.load(surrogate_path(model_path), registry.file_sha256(model_path))
+
+
+def build_for(model_path: str, model, profile_names: str = "default") -> GridSurrogate:
+    surrogate = GridSurrogate.build(model, profile_names, model_sha256=registry.file_sha256(model_path))
+    surrogate.save(surrogate_path(model_path))
+    return surrogate
+
+
+# ── Accuracy report ─────────────────────────────────────
+def error_report(surrogate: GridSurrogate, model, samples: int = 20000, seed: int = 0) -> dict:
+    """
+    Served output vs the real model (both rounded like the engine) on random
+    live-range inputs and on the whole grid range; fallback rows are exact.
+    """
+    from app.ai.inference import predict_matrix
+    rng = np.random.default_rng(seed)
+    sets = {
+        "live": (rng.uniform(5.5, 9.5, samples), np.abs(rng.normal(3, 8, samples))),
+        "grid": (rng.uniform(0, PH_MAX, samples), np.expm1(rng.uniform(0, math.log1p(TURBIDITY_MAX), samples))),
+    }
+    report = {}
+    for name, (ph, turbidity) in sets.items():
+        true_bod, true_cod = predict_matrix(model, ph, np.zeros(samples), turbidity)
+        bod, cod, hit = surrogate.lookup_batch(ph, turbidity)
+        bod_err = np.abs(np.where(hit, bod, true_bod) - true_bod)
+        cod_err = np.abs(np.where(hit, cod, true_cod) - true_cod)
+        report[name] = {
+            "hit_rate": round(float(hit.mean()), 4),
+            "bod_max_error": round(float(bod_err.max()), 3),
+            "cod_max_error": round(float(cod_err.max()), 3),
+            "bod_p99_error": round(float(np.percentile(bod_err, 99)), 3),
+            "cod_p99_error": round(float(np.percentile(cod_err, 99)), 3),
+        }
+    surrogate.hits = surrogate.misses = 0
+    return report
+
+
+def main():
+    import joblib
+    from app.ai.inference import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Build the BOD/COD lookup-grid surrogate for a model")
+    parser.add_argument("--version", help="registry version (default: active, else the bundled V2 model)")
+    parser.add_argument("--profiles", choices=("default", "all"), default="default")
+    args = parser.parse_args()
+
+    path = registry.artifact_path(args.version) if args.version else (registry.active_path() or MODEL_PATH)
+    if not os.path.exists(path):
+        raise SystemExit(f"No model at {path}")
+    model = joblib.load(path)
+    print(f"🧮 Tabulating {path} over {settings.surrogate_ph_points} × {settings.surrogate_turbidity_points} (pH × turbidity)...")
+    started = time.perf_counter()
+    surrogate = build_for(path, model, args.profiles)
+    print(f"   {len(surrogate.grids)} profile(s) in {time.perf_counter() - started:.1f}s → {surrogate_path(path)}")
+    print(f"   cells served from the grid: {surrogate.coverage():.1%} (tolerance {surrogate.tolerance} mg/L)")
+    for name, r in error_report(surrogate, model).items():
+        print(f"   {name:<5} hit rate {r['hit_rate']:.1%} · max error BOD {r['bod_max_error']} / COD {r['cod_max_error']} mg/L"
+              f" · p99 BOD {r['bod_p99_error']} / COD {r['cod_p99_error']}")
+
+
+if __name__ == "__main__":
+    main()
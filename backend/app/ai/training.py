@@ -0,0 +1,366 @@
+"""
+HarvesSink – Training pipeline for the BOD/COD soft-sensor.
+Reproduces the V2 model of models/harvessink.ipynb as a command instead of
+a notebook:
+
+  1. Load the Bangalore STP sheet chunk by chunk and reshape it from one
+     column group per plant to one row per plant-day (as the notebook does).
+  2. Cache the feature matrices under saved_models/cache/, keyed by the
+     source files and PREPROCESS_VERSION, so reruns skip step 1.
+  3. Grid-search XGBoost hyperparameters in a process pool, one
+     single-threaded fit per core, scored on a validation split.
+  4. Refit the best, report accuracy on the held-out test split and
+     per-row inference latency on stored readings (the serving
+     distribution), and register it as a new version (app/ai/registry.py).
+
+Stored readings only carry the model's own BOD/COD, so they are used to
+measure serving latency, never as training labels.
+
+Usage:  python -m app.ai.training --stp Bangalore.xlsx [--activate]
+        python -m app.ai.training --synthetic 20000 --grid quick    (no STP data)
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.ai import registry
+from app.ai.inference import InferenceEngine, V2_FEATURE_COLS, serving_features
+from app.ai.surrogate import GridSurrogate, error_report, surrogate_path
+from app.config import settings
+from app.database import _PATHS
+from app.records import Reading
+
+
+PREPROCESS_VERSION = 1          # bump when the feature mapping changes (invalidates the cache)
+CACHE_DIR = os.path.join(registry.SAVED_MODELS_DIR, "cache")
+CHUNK_ROWS = 50_000
+SERVING_SAMPLE = 20_000         # stored readings used for latency
+SINGLE_ROW_SAMPLE = 300         # readings timed through the live (one-row) path
+
+STPS = ["Nagasandra", "Madiwala", "Hebbal", "Yelahanka", "Jakkur", "Rajacanal", "K.R. Puram", "Cubbon Park", "Lalbagh"]
+CLIMATE_COLS = ["Temperature (Avg)", "Max Temperature", "Min Temperature"]
+TARGETS = ["COD", "BOD", "Ammonia"]      # model output order expected by InferenceEngine
+_METRICS = {"pH": "pH", "COD": "COD", "BOD": "BOD", "TSS": "TSS", "Ammonia": "Ammonical_Nitrogen"}
+
+PARAM_GRIDS = {
+    "default": {
+        "n_estimators": [500, 1500],
+        "max_depth": [6, 9],
+        "learning_rate": [0.01, 0.05],
+        "subsample": [0.9],
+        "colsample_bytree": [0.9],
+    },
+    "quick": {
+        "n_estimators": [100, 300],
+        "max_depth": [4, 6],
+        "learning_rate": [0.1],
+    },
+}
+
+
+# ── Loading ─────────────────────────────────────────────
+def _stp_columns(columns) -> dict[str, dict[str, str]]:
+    """Per plant: metric → wide column (regex, the sheet mixes 'Ph'/'pH' and spacing)."""
+    found = {}
+    for stp in STPS:
+        cols = {}
+        for metric, pattern in _METRICS.items():
+            regex = re.compile(rf"{re.escape(stp)}.*STP_.*{pattern}", re.IGNORECASE)
+            match = [c for c in columns if regex.search(str(c))]
+            if match:
+                cols[metric] = match[0]
+        if "pH" in cols and "COD" in cols:
+            found[stp] = cols
+    return found
+
+
+def _tidy(chunk: pd.DataFrame, stp_cols: dict) -> pd.DataFrame:
+    """Wide chunk → one row per plant-day (climate, pH, TSS, targets, STP_Location)."""
+    if "STP_Location" in chunk.columns:        # already long (e.g. an export of this step)
+        return chunk
+    parts = []
+    for stp, cols in stp_cols.items():
+        part = chunk[CLIMATE_COLS].copy()
+        for metric, column in cols.items():
+            part[metric] = chunk[column]
+        part["STP_Location"] = stp
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def iter_stp_chunks(path: str) -> Iterator[pd.DataFrame]:
+    """Long-format STP rows, CHUNK_ROWS sheet rows at a time (CSV streams; Excel is sliced after reading)."""
+    if path.lower().endswith((".xlsx", ".xls")):
+        try:
+            sheet = pd.read_excel(path, sheet_name="Sheet1")
+        except ImportError as e:
+            raise SystemExit(f"Reading Excel needs openpyxl (pip install openpyxl): {e}")
+        chunks = (sheet.iloc[i:i + CHUNK_ROWS] for i in range(0, len(sheet), CHUNK_ROWS))
+    else:
+        chunks = pd.read_csv(path, chunksize=CHUNK_ROWS)
+    stp_cols = None
+    for chunk in chunks:
+        if stp_cols is None:
+            stp_cols = _stp_columns(chunk.columns)
+        yield _tidy(chunk, stp_cols)
+
+
+def iter_synthetic_chunks(rows: int, seed: int = 42) -> Iterator[pd.DataFrame]:
+    """STP-shaped synthetic plant-days, for smoke runs without the dataset."""
+    rng = np.random.default_rng(seed)
+    load = {stp: rng.uniform(0.6, 1.6) for stp in STPS}
+    for start in range(0, rows, CHUNK_ROWS):
+        n = min(CHUNK_ROWS, rows - start)
+        stp = rng.choice(STPS, n)
+        avg = rng.normal(25, 3, n)
+        ph = rng.normal(7.3, 0.35, n)
+        tss = rng.lognormal(3.0, 0.6, n)
+        factor = np.array([load[s] for s in stp])
+        cod = (factor * (60 + 3.2 * tss) + 8 * np.abs(ph - 7) + 0.8 * (avg - 25) + rng.normal(0, 12, n)).clip(5)
+        yield pd.DataFrame({
+            "Temperature (Avg)": avg, "Max Temperature": avg + rng.uniform(3, 7, n),
+            "Min Temperature": avg - rng.uniform(3, 7, n), "pH": ph, "TSS": tss,
+            "COD": cod, "BOD": (cod * rng.uniform(0.35, 0.5, n)).clip(1),
+            "Ammonia": (0.12 * cod + rng.normal(0, 3, n)).clip(0), "STP_Location": stp,
+        })
+
+
+def _features(tidy: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Long rows → (X in V2_FEATURE_COLS order, y in TARGETS order), dropping incomplete rows."""
+    tidy = tidy.dropna(subset=CLIMATE_COLS + ["pH", "TSS"] + TARGETS)
+    X = np.zeros((len(tidy), len(V2_FEATURE_COLS)))
+    X[:, :5] = tidy[CLIMATE_COLS + ["pH", "TSS"]].to_numpy(dtype=np.float64)
+    location = tidy["STP_Location"].to_numpy()
+    for j, col in enumerate(V2_FEATURE_COLS[5:], start=5):
+        X[:, j] = location == col.removeprefix("STP_Location_")
+    return X, tidy[TARGETS].to_numpy(dtype=np.float64)
+
+
+def iter_stored_readings(limit: int = SERVING_SAMPLE) -> Iterator[np.ndarray]:
+    """Stored readings → serving feature matrices, one device at a time, up to `limit` rows."""
+    path = _PATHS["readings"]
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        data = json.load(f)
+    remaining = limit
+    for rows in data.values():
+        rows = rows[:remaining]
+        if not rows:
+            continue
+        ph = np.array([r.get("ph", 7.0) for r in rows], dtype=np.float64)
+        turbidity = np.array([r.get("turbidity", 0.0) for r in rows], dtype=np.float64)
+        yield serving_features(ph, turbidity)
+        remaining -= len(rows)
+        if remaining <= 0:
+            break
+
+
+# ── Feature cache ───────────────────────────────────────
+def _cache_key(parts: list) -> str:
+    return hashlib.sha256(json.dumps([PREPROCESS_VERSION] + parts, default=str).encode()).hexdigest()[:16]
+
+
+def _file_key(path: str) -> list:
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+def build_dataset(stp: Optional[str], synthetic: int, seed: int) -> tuple[str, str, bool]:
+    """
+    Feature matrices + train/val/test split in a cached .npz.
+    Returns (cache path, cache key, whether it was already cached).
+    """
+    key = _cache_key(_file_key(stp) if stp else ["synthetic", synthetic, seed])
+    path = os.path.join(CACHE_DIR, f"features-{key}.npz")
+    if os.path.exists(path):
+        return path, key, True
+
+    chunks = iter_stp_chunks(stp) if stp else iter_synthetic_chunks(synthetic, seed)
+    X_parts, y_parts = [], []
+    for tidy in chunks:
+        X, y = _features(tidy)
+        X_parts.append(X)
+        y_parts.append(y)
+    X, y = np.vstack(X_parts), np.vstack(y_parts)
+    if not len(X):
+        raise SystemExit("No complete STP rows found")
+
+    order = np.random.default_rng(seed).permutation(len(X))
+    n_test = n_val = max(1, len(X) * 15 // 100)
+    split = np.zeros(len(X), dtype=np.int8)          # 0 train, 1 val, 2 test
+    split[order[:n_test]] = 2
+    split[order[n_test:n_test + n_val]] = 1
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, X=X, y=y, split=split)
+    os.replace(tmp, path)
+    return path, key, False
+
+
+# ── Search ──────────────────────────────────────────────
+def _make_model(params: dict, n_jobs: int):
+    import xgboost as xgb
+    from sklearn.multioutput import MultiOutputRegressor
+    return MultiOutputRegressor(xgb.XGBRegressor(objective="reg:squarederror", n_jobs=n_jobs, **params))
+
+
+def _scores(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    from sklearn.metrics import mean_absolute_error, r2_score
+    mae = mean_absolute_error(y_true, y_pred, multioutput="raw_values")
+    r2 = r2_score(y_true, y_pred, multioutput="raw_values")
+    return {t.lower(): {"mae": round(float(m), 3), "r2": round(float(r), 4)} for t, m, r in zip(TARGETS, mae, r2)}
+
+
+def _selection_score(scores: dict) -> float:
+    """Mean R² of COD and BOD — the outputs the valve logic uses."""
+    return (scores["cod"]["r2"] + scores["bod"]["r2"]) / 2
+
+
+def _fit_trial(cache_path: str, params: dict) -> dict:
+    """One grid point (runs in a worker process; data comes from the cache, not the pickle)."""
+    data = np.load(cache_path)
+    X, y, split = data["X"], data["y"], data["split"]
+    started = time.perf_counter()
+    model = _make_model(params, n_jobs=1)
+    model.fit(X[split == 0], y[split == 0])
+    scores = _scores(y[split == 1], model.predict(X[split == 1]))
+    return {
+        "params": params,
+        "val": scores,
+        "score": _selection_score(scores),
+        "fit_s": round(time.perf_counter() - started, 2),
+    }
+
+
+def grid(name: str) -> list[dict]:
+    spec = PARAM_GRIDS[name]
+    return [dict(zip(spec, values)) for values in itertools.product(*spec.values())]
+
+
+def search(cache_path: str, trials: list[dict], workers: int) -> list[dict]:
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_fit_trial, cache_path, params) for params in trials]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"   {len(results):>3}/{len(trials)}  R²={result['score']:.4f}  {result['fit_s']:>6}s  {result['params']}")
+    return sorted(results, key=lambda r: -r["score"])
+
+
+# ── Latency ─────────────────────────────────────────────
+def measure_latency(model, serving: np.ndarray, surrogate=None) -> dict:
+    """
+    µs per row through the engine's live (one DataFrame per reading) and
+    batch paths, plus the live path served from the surrogate when given.
+    """
+    engine = InferenceEngine()
+    single = [Reading(ph=float(r[3]), turbidity=float(r[4])) for r in serving[:SINGLE_ROW_SAMPLE]]
+
+    def live_us() -> float:
+        engine.predict(single[0])                   # warm-up
+        started = time.perf_counter()
+        for reading in single:
+            engine.predict(reading)
+        return (time.perf_counter() - started) / len(single) * 1e6
+
+    engine.swap(model, "candidate")
+    single_us = live_us()
+    started = time.perf_counter()
+    engine.predict_batch(serving[:, 3], np.zeros(len(serving)), serving[:, 4])
+    batch_us = (time.perf_counter() - started) / len(serving) * 1e6
+    latency = {"single_row_us": round(single_us, 1), "batch_row_us": round(batch_us, 3), "rows": len(serving)}
+    if surrogate is not None:
+        engine.swap(model, "candidate", surrogate)
+        latency["surrogate_row_us"] = round(live_us(), 2)
+        surrogate.hits = surrogate.misses = 0
+    return latency
+
+
+# ── Command ─────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Train and register a BOD/COD soft-sensor version")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--stp", help="Bangalore STP sheet (.xlsx wide, or .csv wide/long)")
+    source.add_argument("--synthetic", type=int, help="train on N synthetic STP rows instead")
+    parser.add_argument("--grid", choices=list(PARAM_GRIDS), default="default")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--activate", action="store_true", help="make the new version the one the server loads")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    print("📊 Preparing features...")
+    cache_path, cache_key, cached = build_dataset(args.stp, args.synthetic, args.seed)
+    data = np.load(cache_path)
+    X, y, split = data["X"], data["y"], data["split"]
+    print(f"   {len(X):,} rows ({'cache hit' if cached else 'cached'} → {cache_path})")
+
+    trials = grid(args.grid)
+    print(f"🔎 Searching {len(trials)} parameter sets on {args.workers} worker(s)...")
+    t = time.perf_counter()
+    results = search(cache_path, trials, args.workers)
+    search_s = time.perf_counter() - t
+    best = results[0]
+
+    print(f"🧠 Refitting best: {best['params']}")
+    train = split != 2
+    model = _make_model(best["params"], n_jobs=-1)
+    model.fit(X[train], y[train])
+    test = _scores(y[split == 2], model.predict(X[split == 2]))
+
+    serving_parts = list(iter_stored_readings())
+    serving = np.vstack(serving_parts) if serving_parts else serving_features(
+        np.random.default_rng(args.seed).normal(7.2, 0.3, 2000), np.abs(np.random.default_rng(args.seed).normal(3, 2, 2000)),
+    )
+    print(f"🧮 Tabulating surrogate ({settings.surrogate_ph_points} × {settings.surrogate_turbidity_points})...")
+    surrogate = GridSurrogate.build(model)
+    surrogate_report = {"cell_coverage": round(surrogate.coverage(), 4), **error_report(surrogate, model)}
+    latency = measure_latency(model, serving, surrogate)
+    latency["source"] = "stored readings" if serving_parts else "synthetic readings"
+
+    entry = registry.register(
+        model,
+        features=V2_FEATURE_COLS,
+        targets=TARGETS,
+        metrics={**test, "val_score": round(best["score"], 4), "latency": latency, "surrogate": surrogate_report},
+        params=best["params"],
+        data={
+            "source": os.path.abspath(args.stp) if args.stp else f"synthetic:{args.synthetic}:{args.seed}",
+            "rows": int(len(X)),
+            "split": {"train": int((split == 0).sum()), "val": int((split == 1).sum()), "test": int((split == 2).sum())},
+            "cache_key": cache_key,
+            "search": {"trials": len(trials), "workers": args.workers, "seconds": round(search_s, 1)},
+        },
+        activate=args.activate,
+    )
+    surrogate.model_sha256 = entry["sha256"]
+    surrogate.save(surrogate_path(registry.artifact_path(entry["version"])))
+
+    print(f"\n--- {entry['version']} TEST REPORT ---")
+    for target in TARGETS:
+        m = test[target.lower()]
+        print(f"{target} -> MAE: {m['mae']:.2f} | R²: {m['r2']:.4f}")
+    print(f"Latency: {latency['single_row_us']} µs/row live, {latency['batch_row_us']} µs/row batch,"
+          f" {latency['surrogate_row_us']} µs/row live via surrogate ({latency['source']})")
+    live = surrogate_report["live"]
+    print(f"Surrogate: {live['hit_rate']:.1%} of live-range readings from the grid,"
+          f" max error BOD {live['bod_max_error']} / COD {live['cod_max_error']} mg/L")
+    state = "active" if args.activate else "inactive — rerun with --activate to serve it"
+    print(f"   Registered {entry['version']} ({state}) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
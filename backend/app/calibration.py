@@ -6,7 +6,8 @@ Handles adaptive baseline learning and valve decision-making.
 import numpy as np
 from typing import Optional
 
-from app.schemas import SensorReading, CalibrationBaseline
+from app.schemas import CalibrationBaseline
+from app.records import Reading
 from app.config import settings
 
 
@@ -40,7 +41,7 @@ class CalibrationEngine:
         count = len(buf["ph"])
         return round((count / settings.calibration_sample_count) * 100, 1)
 
-    def feed_sample(self, reading: SensorReading) -> Optional[CalibrationBaseline]:
+    def feed_sample(self, reading: Reading) -> Optional[CalibrationBaseline]:
         """
         Feed a reading during calibration. Returns the baseline once complete.
         """
@@ -72,9 +73,44 @@ class CalibrationEngine:
 
         return None
 
+    def feed_batch(self, device_id: str, ph, tds, turbidity) -> tuple[int, Optional[CalibrationBaseline]]:
+        """
+        Feed a device's readings in order (bulk ingest). Returns how many
+        were consumed and the baseline if calibration completed — the
+        baseline applies from the last consumed reading onwards.
+        """
+        if self.is_calibrated(device_id):
+            return 0, None
+        self._ensure_buffer(device_id)
+        buf = self._buffers[device_id]
+        take = min(len(ph), settings.calibration_sample_count - len(buf["ph"]))
+        if take <= 0:
+            return 0, None
+        buf["ph"].extend(ph[:take])
+        buf["tds"].extend(tds[:take])
+        buf["turbidity"].extend(turbidity[:take])
+        if len(buf["ph"]) < settings.calibration_sample_count:
+            return take, None
+        # Last sample goes through feed_sample so the baseline is built in one place
+        for key in ("ph", "tds", "turbidity"):
+            buf[key].pop()
+        last = Reading(
+            device_id=device_id, ph=ph[take - 1], tds=tds[take - 1], turbidity=turbidity[take - 1],
+        )
+        return take, self.feed_sample(last)
+
     def get_baseline(self, device_id: str) -> Optional[CalibrationBaseline]:
         return self._baselines.get(device_id)
 
+    def status(self, device_id: str) -> dict:
+        """Calibrated flag, progress and baseline of a device (GET /api/calibration/{device_id})."""
+        baseline = self._baselines.get(device_id)
+        return {
+            "calibrated": self.is_calibrated(device_id),
+            "progress": self.get_progress(device_id),
+            "baseline": baseline.model_dump() if baseline else None,
+        }
+
     def load_baseline(self, baseline: CalibrationBaseline):
         """Load a previously persisted baseline."""
         self._baselines[baseline.device_id] = baseline
@@ -84,6 +120,23 @@ class CalibrationEngine:
         self._buffers.pop(device_id, None)
         self._baselines.pop(device_id, None)
 
+    def device_ids(self) -> list[str]:
+        return list(self._buffers.keys() | self._baselines.keys())
+
+    def export_device(self, device_id: str) -> Optional[dict]:
+        """Baseline plus samples collected so far — to hand the device to another pipeline shard."""
+        baseline, samples = self._baselines.get(device_id), self._buffers.get(device_id)
+        if baseline is None and not samples:
+            return None
+        return {"baseline": baseline.model_dump() if baseline else None, "samples": samples}
+
+    def import_device(self, device_id: str, state: dict):
+        self.reset(device_id)
+        if state.get("baseline"):
+            self._baselines[device_id] = CalibrationBaseline(**state["baseline"])
+        if state.get("samples"):
+            self._buffers[device_id] = state["samples"]
+
 
 class ValveController:
     """
@@ -94,7 +147,7 @@ class ValveController:
 
     SIGMA_THRESHOLD = 2.5  # standard deviations from baseline
 
-    def decide(self, reading: SensorReading, baseline: Optional[CalibrationBaseline]) -> str:
+    def decide(self, reading: Reading, baseline: Optional[CalibrationBaseline]) -> str:
         """Returns 'harvest', 'caution', or 'drain'."""
 
         # ── Hard safety caps (always enforced) ───────────────
@@ -123,3 +176,22 @@ class ValveController:
                     return "caution"
 
         return "harvest"
+
+    def decide_batch(self, ph, tds, turbidity, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+        """
+        Vectorized decide() → codes 0 harvest / 1 caution / 2 drain.
+        mean/std are (n, 3) baseline columns (pH, TDS, turbidity) per
+        reading; NaN rows have no baseline.
+        """
+        values = np.column_stack((ph, tds, turbidity))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deviation = np.where(std > 0, np.abs(values - mean) / std, 0.0)
+        max_dev = np.nan_to_num(deviation, nan=0.0).max(axis=1)
+        codes = np.where(max_dev > self.SIGMA_THRESHOLD, 1, 0)
+        codes[max_dev > self.SIGMA_THRESHOLD * 1.5] = 2
+        capped = (
+            (ph < settings.ph_min) | (ph > settings.ph_max)
+            | (tds > settings.tds_max) | (turbidity > settings.turbidity_max)
+        )
+        codes[capped] = 2
+        return codes.astype(np.int8)
@@ -0,0 +1,158 @@
+"""
+HarvesSink – Incremental checkpointer for impact and baselines.
+Impact counters and completed baselines are written on a timer, and only
+for devices that changed since the previous checkpoint — one journal
+append per store (see app/database.py) — so persistence cost follows
+activity instead of fleet size. Readings go through a write-behind
+writer: batches are appended as they come, never on the event loop.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+from app.config import settings
+from app.database import compact, save_impacts, save_baselines, save_readings
+from app.impact import ImpactLedger
+from app.schemas import CalibrationBaseline
+
+
+class Checkpointer:
+    """Flushes dirty devices every checkpoint_interval_s (and on demand)."""
+
+    def __init__(self, impact: ImpactLedger, interval_s: Optional[float] = None,
+                 on_flush: Optional[Callable[[dict, dict], None]] = None,
+                 collect: Optional[Callable[[], Awaitable[None]]] = None):
+        self.impact = impact
+        self.interval_s = settings.checkpoint_interval_s if interval_s is None else interval_s
+        self.on_flush = on_flush          # (impacts, baselines) after each successful write
+        self.collect = collect            # brings the ledger up to date first (pipeline shards)
+        self._baselines: dict[str, dict] = {}     # completed since the last checkpoint
+        self._lock = asyncio.Lock()
+        self.checkpoints = 0
+        self.devices_written = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.last_dirty = {"impact": 0, "baselines": 0}
+
+    def baseline_completed(self, baseline: CalibrationBaseline):
+        self._baselines[baseline.device_id] = baseline.model_dump()
+
+    async def flush(self) -> dict:
+        """
+        Write everything dirty now. Snapshots are taken on the event loop;
+        the file I/O runs in a worker thread. Flushes never overlap.
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            if self.collect:
+                await self.collect()
+            impacts = {d: self.impact.snapshot(d) for d in self.impact.take_dirty()}
+            baselines, self._baselines = self._baselines, {}
+            if impacts or baselines:
+                try:
+                    await asyncio.to_thread(_write, impacts, baselines)
+                except Exception:
+                    # Keep them dirty for the next attempt
+                    self.impact.mark_dirty(impacts)
+                    self._baselines = {**baselines, **self._baselines}
+                    raise
+                if self.on_flush:
+                    self.on_flush(impacts, baselines)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.checkpoints += 1
+            self.devices_written += len(impacts)
+            self.last_ms = round(elapsed_ms, 2)
+            self.max_ms = max(self.max_ms, self.last_ms)
+            self.last_dirty = {"impact": len(impacts), "baselines": len(baselines)}
+            return self.stats()
+
+    @asynccontextmanager
+    async def hold(self):
+        """No checkpoint runs inside this block (a bulk ingest that may still be rolled back)."""
+        async with self._lock:
+            yield
+
+    async def run(self):
+        """Background loop (wall clock — this paces disk I/O, not simulated time)."""
+        while True:
+            try:
+                await asyncio.sleep(self.interval_s)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"Checkpoint error: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "interval_s": self.interval_s,
+            "checkpoints": self.checkpoints,
+            "devices_written": self.devices_written,
+            "last_dirty": self.last_dirty,
+            "last_ms": self.last_ms,
+            "max_ms": self.max_ms,
+        }
+
+
+class ReadingWriter:
+    """
+    Write-behind for the readings store. add() only queues rows; one task
+    appends everything queued since its previous write in a worker thread,
+    so writes never overlap and a slow one (a journal fold) batches up
+    the rows that arrive meanwhile instead of stalling the stream loop.
+    """
+
+    def __init__(self):
+        self._rows: list[dict] = []
+        self._task: Optional[asyncio.Task] = None
+        self.writes = 0
+        self.rows_written = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, rows: list[dict]):
+        self._rows.extend(rows)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        while self._rows:
+            rows, self._rows = self._rows, []
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(save_readings, rows)
+            except Exception as e:
+                print(f"Readings write error ({len(rows)} rows dropped): {e}")
+                continue
+            self.writes += 1
+            self.rows_written += len(rows)
+            self.last_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.max_ms = max(self.max_ms, self.last_ms)
+
+    async def flush(self):
+        """Wait until every row added so far is written."""
+        while self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+
+    async def close(self):
+        """Flush and fold the journal into readings.json (shutdown)."""
+        await self.flush()
+        await asyncio.to_thread(compact, "readings")
+
+    def stats(self) -> dict:
+        return {
+            "writes": self.writes,
+            "rows_written": self.rows_written,
+            "queued": len(self._rows),
+            "last_ms": self.last_ms,
+            "max_ms": self.max_ms,
+        }
+
+
+def _write(impacts: dict[str, dict], baselines: dict[str, dict]):
+    if impacts:
+        save_impacts(impacts)
+    if baselines:
+        save_baselines(baselines)
@@ -0,0 +1,105 @@
+"""
+HarvesSink – Simulation clock.
+One time source for simulated sources, the impact tracker and the stream
+loop, so a day of sink activity doesn't have to take a day:
+
+  • realtime     wall clock, real sleeps (default, and always for hardware)
+  • accelerated  simulated time runs CLOCK_SPEED× faster than the wall clock
+  • fast         virtual time — the data source advances the clock by one
+                 reading interval per tick without sleeping; other loops'
+                 sleeps wake when virtual time reaches them, or after the
+                 same wall time if the source never ticks
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.config import settings
+
+
+CLOCK_MODES = ("realtime", "accelerated", "fast")
+
+
+class SimClock:
+    """now() / sleep() in simulated time."""
+
+    def __init__(self, mode: Optional[str] = None, speed: Optional[float] = None, start: Optional[datetime] = None):
+        self.mode = mode or settings.clock_mode
+        if self.mode not in CLOCK_MODES:
+            raise ValueError(f"Unknown clock mode '{self.mode}'. Available: {list(CLOCK_MODES)}")
+        self.speed = max(1e-6, settings.clock_speed if speed is None else speed)
+        if start is None and settings.clock_start:
+            start = datetime.fromisoformat(settings.clock_start)
+        self.start = start or datetime.utcnow()
+        self._t0 = time.monotonic()
+        self._elapsed = 0.0                             # fast mode: simulated seconds since start
+        self._sleepers: list[tuple[float, int, asyncio.Future]] = []  # fast mode: (wake time, ticket, waiter)
+        self._tickets = itertools.count()
+
+    def elapsed(self) -> float:
+        """Simulated seconds since the clock started."""
+        if self.mode == "fast":
+            return self._elapsed
+        wall = time.monotonic() - self._t0
+        return wall * self.speed if self.mode == "accelerated" else wall
+
+    def now(self) -> datetime:
+        """Current simulated UTC time (naive, like datetime.utcnow())."""
+        if self.mode == "realtime":
+            return datetime.utcnow()
+        return self.start + timedelta(seconds=self.elapsed())
+
+    def follow(self, now: datetime) -> None:
+        """Continue simulated time from `now` — pipeline processes follow the stream owner's clock."""
+        if self.mode != "realtime":
+            self.start, self._t0, self._elapsed = now, time.monotonic(), 0.0
+
+    async def sleep(self, seconds: float) -> None:
+        """Wait `seconds` of simulated time."""
+        if self.mode == "realtime":
+            await asyncio.sleep(seconds)
+        elif self.mode == "accelerated":
+            await asyncio.sleep(seconds / self.speed)
+        elif seconds > 0:
+            # Virtual time only moves when the pacing source ticks; a source
+            # that never ticks (serial, gateway, replay) falls back to wall time
+            entry = (self._elapsed + seconds, next(self._tickets), asyncio.get_running_loop().create_future())
+            heapq.heappush(self._sleepers, entry)
+            try:
+                while True:
+                    seen = self._elapsed
+                    try:
+                        await asyncio.wait_for(asyncio.shield(entry[2]), seconds)
+                        return
+                    except asyncio.TimeoutError:
+                        if self._elapsed == seen:
+                            return   # no tick for `seconds` of wall time
+            finally:
+                if not entry[2].done():
+                    self._sleepers.remove(entry)
+                    heapq.heapify(self._sleepers)
+        else:
+            await asyncio.sleep(0)
+
+    async def tick(self, seconds: float) -> None:
+        """
+        Pace the data source by one reading interval. In fast mode this is
+        what advances virtual time (and wakes every sleeper now due), so
+        only the source should call it.
+        """
+        if self.mode != "fast":
+            await self.sleep(seconds)
+            return
+        self._elapsed += max(0.0, seconds)
+        while self._sleepers and self._sleepers[0][0] <= self._elapsed:
+            _, _, waiter = heapq.heappop(self._sleepers)
+            if not waiter.done():
+                waiter.set_result(None)
+        await asyncio.sleep(0)   # stay cooperative — let woken loops and I/O run
+
+
+clock = SimClock()
@@ -0,0 +1,398 @@
+"""
+HarvesSink – Multi-worker deployment: one stream owner, many API workers.
+With CLUSTER_ENABLED=true every uvicorn worker (--workers N) serves REST
+and /ws/live, but only the worker holding the leader lease (an exclusive
+lock on DATA_DIR/leader.lock) connects the data source and runs the
+pipeline. Followers retry the lease, so a crashed owner is replaced
+within CLUSTER_ELECTION_INTERVAL_S.
+
+Shared state lives in one SQLite file (DATA_DIR/cluster.db, WAL mode):
+  replica   upserted (kind, key) → JSON, tagged with a publish sequence;
+            the leader publishes impact/baselines at each checkpoint and
+            map rows, nudges and status documents every
+            CLUSTER_PUBLISH_INTERVAL_S; followers apply everything newer
+            than what they've seen to their own singletons, so read
+            endpoints are unchanged
+  packets   encoded /ws/live messages, appended only while some follower
+            has WebSocket clients, tailed by followers every CLUSTER_POLL_MS
+  commands  mutating requests received by a follower, executed by the
+            leader (same handler), with the result handed back
+  workers   heartbeats: pid, role, WebSocket clients
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from app.config import settings
+from app.database import DATA_DIR
+
+
+Item = tuple[str, str, Any]       # (kind, key, JSON-able body or None = deleted)
+
+
+def _max_wait_s() -> float:
+    """Longest a follower waits on a forwarded command (see Cluster.forward)."""
+    return 2 * max(settings.cluster_command_timeout_s, settings.cluster_ingest_timeout_s)
+
+
+class LeaderLease:
+    """Exclusive, non-blocking lock on a file; the OS releases it when the holder dies."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.name == "nt":
+                import msvcrt
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class SharedState:
+    """The cluster's SQLite file. One connection per process; call from worker threads."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS replica (
+                    kind TEXT, key TEXT, seq INTEGER, body TEXT, PRIMARY KEY (kind, key));
+                CREATE INDEX IF NOT EXISTS replica_seq ON replica (seq);
+                CREATE TABLE IF NOT EXISTS packets (seq INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT);
+                CREATE TABLE IF NOT EXISTS commands (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, args TEXT,
+                    status TEXT DEFAULT 'pending', result TEXT, created_at REAL,
+                    claimed_by INTEGER, updated_at REAL);
+                CREATE TABLE IF NOT EXISTS workers (
+                    pid INTEGER PRIMARY KEY, role TEXT, clients INTEGER, seen_at REAL);
+            """)
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(commands)")}
+            for column, kind in (("claimed_by", "INTEGER"), ("updated_at", "REAL")):
+                if column not in columns:           # cluster.db from an older version
+                    self._db.execute(f"ALTER TABLE commands ADD COLUMN {column} {kind}")
+
+    def _tx(self, fn):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._db)
+                self._db.execute("COMMIT")
+                return result
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql: str, args: tuple = ()) -> list:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    # ── Replica ─────────────────────────────────────────
+    def max_seq(self) -> int:
+        return self._query("SELECT COALESCE(MAX(seq), 0) FROM replica")[0][0]
+
+    def publish(self, seq: int, items: list[Item]):
+        rows = [(kind, key, seq, json.dumps(body, separators=(",", ":"), default=str)) for kind, key, body in items]
+        self._tx(lambda db: db.executemany("INSERT OR REPLACE INTO replica VALUES (?, ?, ?, ?)", rows))
+
+    def changes(self, since: int) -> list[tuple[int, str, str, Any]]:
+        rows = self._query("SELECT seq, kind, key, body FROM replica WHERE seq > ? ORDER BY seq", (since,))
+        return [(seq, kind, key, json.loads(body)) for seq, kind, key, body in rows]
+
+    # ── Packets ─────────────────────────────────────────
+    def append_packets(self, texts: list[str], keep: int):
+        def write(db):
+            db.executemany("INSERT INTO packets (body) VALUES (?)", [(t,) for t in texts])
+            db.execute("DELETE FROM packets WHERE seq <= (SELECT MAX(seq) FROM packets) - ?", (keep,))
+        self._tx(write)
+
+    def last_packet(self) -> int:
+        return self._query("SELECT COALESCE(MAX(seq), 0) FROM packets")[0][0]
+
+    def packets(self, since: int, limit: int) -> list[tuple[int, str]]:
+        return self._query("SELECT seq, body FROM packets WHERE seq > ? ORDER BY seq LIMIT ?", (since, limit))
+
+    # ── Commands ────────────────────────────────────────
+    def submit(self, name: str, args: dict) -> int:
+        return self._tx(lambda db: db.execute(
+            "INSERT INTO commands (name, args, created_at) VALUES (?, ?, ?)", (name, json.dumps(args), time.time()),
+        ).lastrowid)
+
+    def claim(self, pid: int) -> list[tuple[int, str, dict]]:
+        def take(db):
+            rows = db.execute("SELECT id, name, args FROM commands WHERE status = 'pending' ORDER BY id").fetchall()
+            db.executemany(
+                "UPDATE commands SET status = 'running', claimed_by = ?, updated_at = ? WHERE id = ?",
+                [(pid, time.time(), r[0]) for r in rows],
+            )
+            return rows
+        return [(i, name, json.loads(args)) for i, name, args in self._tx(take)]
+
+    def complete(self, command_id: int, result: dict):
+        self._tx(lambda db: db.execute(
+            "UPDATE commands SET status = 'done', result = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(result, default=str), time.time(), command_id),
+        ))
+
+    def poll(self, command_id: int) -> tuple[Optional[str], Optional[dict]]:
+        """(status, result once done — the row is then removed); status None = the row is gone."""
+        rows = self._query("SELECT status, result FROM commands WHERE id = ?", (command_id,))
+        if not rows:
+            return None, None
+        status, result = rows[0]
+        if status == "done":
+            self._tx(lambda db: db.execute("DELETE FROM commands WHERE id = ?", (command_id,)))
+            return status, json.loads(result)
+        return status, None
+
+    def abandon(self, command_id: int) -> bool:
+        """Withdraw a command the leader hasn't claimed yet. False = it is already running (or done)."""
+        return self._tx(lambda db: db.execute(
+            "DELETE FROM commands WHERE id = ? AND status = 'pending'", (command_id,),
+        ).rowcount) > 0
+
+    def expire(self, leader_pid: int, max_age_s: float):
+        """
+        Leader housekeeping: commands still "running" under a previous
+        leader (it died mid-command), and results or requests nobody came
+        back for within max_age_s.
+        """
+        cutoff = time.time() - max_age_s
+        self._tx(lambda db: db.execute(
+            "DELETE FROM commands WHERE (status = 'running' AND claimed_by != ?)"
+            " OR (status = 'done' AND updated_at < ?) OR (status = 'pending' AND created_at < ?)",
+            (leader_pid, cutoff, cutoff),
+        ))
+
+    # ── Workers ─────────────────────────────────────────
+    def heartbeat(self, pid: int, role: str, clients: int, stale_s: float) -> list[dict]:
+        now = time.time()
+
+        def beat(db):
+            db.execute("INSERT OR REPLACE INTO workers VALUES (?, ?, ?, ?)", (pid, role, clients, now))
+            db.execute("DELETE FROM workers WHERE seen_at < ?", (now - stale_s,))
+            return db.execute("SELECT pid, role, clients, seen_at FROM workers ORDER BY pid").fetchall()
+        return [{"pid": p, "role": r, "clients": c, "age_s": round(now - t, 1)} for p, r, c, t in self._tx(beat)]
+
+
+class Cluster:
+    """
+    This worker's view of the cluster. Disabled (the default) it is always
+    the leader and every hook is a no-op, so single-process runs are unchanged.
+    """
+
+    def __init__(self):
+        self.enabled = settings.cluster_enabled
+        self.is_leader = not self.enabled
+        self.pid = os.getpid()
+        self.docs: dict[str, Any] = {}          # follower: latest documents from the leader
+        self.workers: list[dict] = []
+        self._lease = LeaderLease(os.path.join(DATA_DIR, "leader.lock"))
+        self._shared: Optional[SharedState] = None
+        self._staged: dict[tuple[str, str], Any] = {}
+        self._packets: list[str] = []
+        self._follower_clients = 0
+        self._seq = 0                 # leader: last publish; follower: last applied
+        self._packet_seq = 0
+        self._tasks: set[asyncio.Task] = set()
+        self.promoted_at: Optional[float] = None
+        self.published = 0
+        self.applied = 0
+        self.forwarded = 0
+        self.commands = 0
+        # Wired by main.py
+        self.on_promote: Optional[Callable[[], Awaitable[None]]] = None
+        self.collect: Optional[Callable[[], list[Item]]] = None
+        self.apply: Optional[Callable[[str, str, Any], None]] = None
+        self.execute: Optional[Callable[[str, dict], Awaitable[dict]]] = None
+        self.broadcast: Optional[Callable[[str], Awaitable[None]]] = None
+        self.clients: Callable[[], int] = lambda: 0
+
+    # ── Startup ─────────────────────────────────────────
+    async def start(self) -> bool:
+        """Open the shared state and try for the lease. Returns True if this worker owns the stream."""
+        if not self.enabled:
+            return True
+        path = settings.cluster_db_path or os.path.join(DATA_DIR, "cluster.db")
+        self._shared = await asyncio.to_thread(SharedState, path)
+        self._packet_seq = await asyncio.to_thread(self._shared.last_packet)
+        if self._lease.try_acquire():
+            await self._become_leader()
+        else:
+            await self._catch_up()
+            print(f"👥 Worker {self.pid} following — stream owned by another worker")
+        return self.is_leader
+
+    async def _become_leader(self):
+        self._seq = await asyncio.to_thread(self._shared.max_seq)
+        self.is_leader = True
+        self.promoted_at = time.time()
+        print(f"👑 Worker {self.pid} owns the stream")
+
+    def stop(self):
+        self._lease.release()
+
+    # ── Leader side ─────────────────────────────────────
+    def stage(self, kind: str, key: str, body: Any):
+        """Queue a replica update for the next publish (last write per key wins)."""
+        if self.enabled:
+            self._staged[(kind, key)] = body
+
+    def stage_devices(self, impacts: dict, baselines: dict):
+        """Checkpointer hook: what was just persisted goes to the replicas too."""
+        for device_id, snapshot in impacts.items():
+            self.stage("impact", device_id, snapshot)
+        for device_id, baseline in baselines.items():
+            self.stage("baseline", device_id, baseline)
+
+    def stage_packet(self, text: str):
+        if self.enabled and self._follower_clients:
+            self._packets.append(text)
+
+    async def _lead_tick(self, publish: bool):
+        if self._packets:
+            packets, self._packets = self._packets, []
+            await asyncio.to_thread(self._shared.append_packets, packets, settings.cluster_packet_backlog)
+        for command_id, name, args in await asyncio.to_thread(self._shared.claim, self.pid):
+            # A long command (bulk ingest) mustn't hold up packets and publishing
+            task = asyncio.create_task(self._run_command(command_id, name, args))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if publish:
+            await asyncio.to_thread(self._shared.expire, self.pid, 2 * _max_wait_s())   # well after anyone waits
+            for kind, key, body in self.collect():
+                self._staged[(kind, key)] = body
+            if self._staged:
+                items = [(kind, key, body) for (kind, key), body in self._staged.items()]
+                self._staged = {}
+                self._seq += 1
+                await asyncio.to_thread(self._shared.publish, self._seq, items)
+                self.published += len(items)
+
+    async def _run_command(self, command_id: int, name: str, args: dict):
+        self.commands += 1
+        try:
+            result = await self.execute(name, args)
+        except Exception as e:
+            result = {"status_code": 500, "body": {"detail": f"{name} failed on the stream owner: {e}"}}
+        await asyncio.to_thread(self._shared.complete, command_id, result)
+
+    # ── Follower side ───────────────────────────────────
+    async def _catch_up(self):
+        for seq, kind, key, body in await asyncio.to_thread(self._shared.changes, self._seq):
+            if kind == "doc":
+                self.docs[key] = body
+            self.apply(kind, key, body)
+            self._seq = seq
+            self.applied += 1
+
+    async def _follow_tick(self):
+        while True:
+            rows = await asyncio.to_thread(self._shared.packets, self._packet_seq, 5000)
+            for seq, text in rows:
+                await self.broadcast(text)
+                self._packet_seq = seq
+            if len(rows) < 5000:
+                break
+        await self._catch_up()
+
+    async def forward(self, name: str, args: dict, timeout_s: Optional[float] = None) -> dict:
+        """
+        Run a mutating request on the leader and wait for {"status_code", "body"}.
+        Only a command the leader never picked up is withdrawn with a 503
+        (safe to retry); once it runs, the answer is its result, or a 504
+        saying it may have been applied (leader died, or ran past twice the
+        timeout) — retrying a bulk ingest then could count it twice.
+        """
+        self.forwarded += 1
+        command_id = await asyncio.to_thread(self._shared.submit, name, args)
+        started = time.monotonic()
+        timeout_s = timeout_s or settings.cluster_command_timeout_s
+        while True:
+            await asyncio.sleep(settings.cluster_poll_ms / 1000)
+            status, result = await asyncio.to_thread(self._shared.poll, command_id)
+            if result is not None:
+                return result
+            waited = time.monotonic() - started
+            if status is None or waited >= 2 * timeout_s:
+                return {"status_code": 504, "body": {"detail": (
+                    "The stream owner started this request but did not answer — it may have been "
+                    "applied; check before retrying"
+                )}}
+            if waited >= timeout_s and status == "pending" and await asyncio.to_thread(self._shared.abandon, command_id):
+                return {"status_code": 503, "body": {"detail": "No stream owner answered in time — retry shortly"}}
+
+    # ── Loop ────────────────────────────────────────────
+    async def run(self):
+        """Per-worker background loop: lead (publish, run commands) or follow (tail, apply, elect)."""
+        if not self.enabled:
+            return
+        tick = settings.cluster_poll_ms / 1000
+        last_publish = last_election = 0.0
+        while True:
+            try:
+                await asyncio.sleep(tick)
+                now = time.monotonic()
+                publish = now - last_publish >= settings.cluster_publish_interval_s
+                if publish:
+                    last_publish = now
+                    self.workers = await asyncio.to_thread(
+                        self._shared.heartbeat, self.pid, "leader" if self.is_leader else "follower",
+                        self.clients(), 3 * max(settings.cluster_publish_interval_s, settings.cluster_election_interval_s),
+                    )
+                    self._follower_clients = sum(w["clients"] for w in self.workers if w["pid"] != self.pid)
+                if self.is_leader:
+                    await self._lead_tick(publish)
+                    continue
+                await self._follow_tick()
+                if now - last_election >= settings.cluster_election_interval_s:
+                    last_election = now
+                    if self._lease.try_acquire():
+                        await self._catch_up()
+                        await self._become_leader()
+                        await self.on_promote()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"Cluster error ({'leader' if self.is_leader else 'follower'} {self.pid}): {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pid": self.pid,
+            "role": "leader" if self.is_leader else "follower",
+            "workers": self.workers,
+            "seq": self._seq,
+            "published": self.published,
+            "applied": self.applied,
+            "forwarded": self.forwarded,
+            "commands_executed": self.commands,
+        }
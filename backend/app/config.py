@@ -9,24 +9,100 @@ from typing import Literal
 
 class Settings(BaseSettings):
     # ── Data source ──────────────────────────────────────────
-    data_source: Literal["simulation", "serial"] = "simulation"
+    data_source: Literal["simulation", "serial", "fleet", "replay", "gateway"] = "simulation"
     serial_port: str = "COM3"
     serial_baud: int = 9600           # Must match Arduino Serial.begin(9600)
+    serial_ports: str = ""              # multi-port: "COM3=HVS-001,COM4=HVS-002" (overrides serial_port)
+    serial_max_line: int = 1024         # bytes without a newline before the framer resyncs
+    serial_queue_size: int = 10000      # readings buffered between reader threads and the stream loop
+    serial_reconnect_s: float = 1.0
+    serial_protocol: Literal["json", "binary", "auto"] = "json"   # auto = negotiate binary frames, fall back to JSON
+    serial_negotiate_s: float = 2.0     # resend the binary request until the firmware answers
+
+    # ── Replay (DATA_SOURCE=replay) ──────────────────────────
+    replay_paths: str = ""              # comma-separated capture files
+    replay_speed: float = 1.0           # 1 = real time, 10 = 10× faster, 0 = as fast as possible
+    replay_loop: bool = False
+    replay_copies: int = 1              # replay each capture as N distinct devices
+    replay_batch_size: int = 5000
+
+    # ── Network ingest gateway (DATA_SOURCE=gateway) ───────
+    gateway_host: str = "0.0.0.0"
+    gateway_tcp_port: int = 7070        # 0 = any free port, -1 = disabled
+    gateway_udp_port: int = 7071        # 0 = any free port, -1 = disabled
+    gateway_max_connections: int = 1000
+    gateway_queue_size: int = 50000     # readings buffered before TCP senders are throttled
+    gateway_batch_size: int = 5000
+    gateway_max_line: int = 65536       # bytes per line (batches included) before resync
+    gateway_idle_timeout_s: float = 60.0
+
+    # ── Bulk ingest (POST /api/ingest) ───────────────────────
+    ingest_batch_size: int = 20000      # records validated + processed together
+    ingest_max_bytes: int = 256 * 1024 * 1024
+    ingest_max_readings: int = 2_000_000
+    ingest_max_future_s: float = 300.0  # clock skew allowed on uploaded timestamps
+
+    # ── Serialization ────────────────────────────────────────
+    packet_encoder: Literal["template", "pydantic"] = "template"   # /ws/live packets + /api/history
 
     # ── Database ─────────────────────────────────────────────
     database_url: str = "sqlite+aiosqlite:///./harvessink.db"
+    data_dir: str = ""                  # JSON store location (default: backend/data)
+    checkpoint_interval_s: float = 5.0  # impact/baseline flush of changed devices
 
     # ── Simulation ───────────────────────────────────────────
     sim_interval_ms: int = 500
-    sim_num_nodes: int = 50
+    sim_num_nodes: int = 50             # devices simulated by the fleet source
+    clock_mode: Literal["realtime", "accelerated", "fast"] = "realtime"
+    clock_speed: float = 60.0           # accelerated: simulated seconds per wall second
+    clock_start: str = ""               # ISO start of simulated time (default: now)
+
+    # ── Fleet simulator (DATA_SOURCE=fleet) ──────────────────
+    fleet_batch_size: int = 5000        # readings handed to the pipeline per batch
+    fleet_scenario_mix: str = "clean:0.85,dishwashing:0.08,vegetable_wash:0.05,contamination:0.02"
+    fleet_scenario_switch_prob: float = 0.01   # per device per tick
 
     # ── LLM (optional) ──────────────────────────────────────
     openai_api_key: str = ""
     llm_enabled: bool = False
+    llm_backend: str = "openai"          # openai | local (canned offline stand-in)
+    llm_model: str = "gpt-4o-mini"
+    llm_timeout_s: float = 3.0           # per backend call; rule-based nudge after that
+    llm_local_latency_ms: float = 300.0  # simulated latency of the local backend
+    nudge_cache_ttl_s: float = 600.0
+    nudge_error_ttl_s: float = 30.0      # how long a fallback after a timeout/error is served
+    nudge_cache_size: int = 4096
+    nudge_quant_ph: float = 0.5          # cache buckets: readings within a bucket share a nudge
+    nudge_quant_tds: float = 50.0
+    nudge_quant_turbidity: float = 2.0
+    nudge_precompute_rate: float = 5.0       # background nudges started per second
+    nudge_precompute_concurrency: int = 4    # background nudges in flight
+    nudge_transition_readings: int = 3       # readings a new activity must hold before it counts
 
     # ── Calibration ──────────────────────────────────────────
     calibration_sample_count: int = 50
 
+    # ── Model management ─────────────────────────────────────
+    shadow_eval_interval_s: float = 1.0   # how often sampled readings are scored by a shadow model
+    inference_surrogate: bool = True      # serve from the lookup grid (python -m app.ai.surrogate) when one exists
+    surrogate_ph_points: int = 1401       # grid over pH 0–14 (0.01 steps)
+    surrogate_turbidity_points: int = 1024  # grid over log1p(turbidity), 0–1000 NTU
+    surrogate_tolerance: float = 0.5      # mg/L; cells with a bigger jump are answered by the model
+
+    # ── Multi-worker deployment (uvicorn --workers N) ────────
+    cluster_enabled: bool = False        # one elected worker owns the stream, all serve REST/WS
+    cluster_db_path: str = ""            # shared state (default: DATA_DIR/cluster.db)
+    cluster_poll_ms: float = 100.0       # followers tail packets / leader runs forwarded requests
+    cluster_publish_interval_s: float = 1.0   # map rows, nudges and status documents → followers
+    cluster_election_interval_s: float = 2.0  # how often followers try to take over the stream
+    cluster_command_timeout_s: float = 30.0   # forwarded request without an answer → 503
+    cluster_ingest_timeout_s: float = 600.0
+    cluster_packet_backlog: int = 20000  # /ws/live messages kept for followers
+
+    # ── Pipeline shards (SHARD_WORKERS=N) ────────────────────
+    shard_workers: int = 0               # 0 = pipeline runs in the API process
+    shard_vnodes: int = 128              # hash-ring points per shard (balance vs. lookup cost)
+
     # ── Safety caps (WHO / CPCB) ─────────────────────────────
     ph_min: float = 6.5
     ph_max: float = 8.5
@@ -37,6 +113,27 @@ class Settings(BaseSettings):
     bod_kill_threshold: float = 30.0    # mg/L — force drain if BOD exceeds
     cod_kill_threshold: float = 250.0   # mg/L — force drain if COD exceeds
 
+    # ── Impact ledger ────────────────────────────────────────
+    impact_zone_zoom: int = 10              # spatial grid level of a zone (~10km cells)
+    impact_hourly_retention_h: int = 336    # hourly buckets kept (older ranges resolve to days)
+    impact_daily_retention_d: int = 730
+
+    # ── Municipal snapshots ──────────────────────────────────
+    municipal_snapshot_interval_s: float = 1.0   # max rebuild rate of /api/municipal/nodes
+
+    # ── Resource forecasting ─────────────────────────────────
+    forecast_households: int = 1_000_000
+    forecast_draws: int = 5000
+
+    # ── Crisis detection (municipal) ─────────────────────────
+    crisis_zoom: int = 14               # grid level for hot cells (~600m cells)
+    crisis_window_s: float = 60.0       # sliding window per cell
+    crisis_hot_ratio: float = 0.5       # bad devices / reporting devices to mark a cell hot
+    crisis_min_readings: int = 5        # readings in window before a cell can be hot
+    crisis_min_devices: int = 3         # affected devices before a cluster is a crisis
+    crisis_eval_interval_s: float = 2.0
+    crisis_history: int = 50            # resolved events kept for the REST endpoint
+
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
 
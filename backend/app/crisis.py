@@ -0,0 +1,310 @@
+"""
+HarvesSink – Neighbourhood crisis detection.
+Streams every node reading into a spatial grid of short sliding windows
+(poor / caution / anomaly counts per cell), marks cells "hot" when most of
+the devices reporting from them currently see bad water, and joins touching hot cells into crisis
+events — pipe breaches or illegal dumping affect many sinks at once, a
+single dirty sink does not.
+"""
+
+import itertools
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.clock import clock
+from app.config import settings
+from app.schemas import CrisisEvent
+from app.spatial import cell_of, cell_size
+
+
+WINDOW_BUCKETS = 6   # sliding window resolution (window / 6 per bucket)
+
+Cell = tuple[int, int]
+
+
+def _epoch(ts: datetime) -> float:
+    """Seconds since epoch; naive timestamps are UTC (as produced by the sources)."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class _CellWindow:
+    """
+    Ring of time buckets with reading counts, plus the latest status of
+    every device reporting from the cell (0=good, 1=caution, 2=bad).
+    """
+
+    __slots__ = ("epochs", "total", "poor", "caution", "anomaly", "devices", "status_counts", "pruned_at")
+
+    def __init__(self):
+        self.epochs = [-1] * WINDOW_BUCKETS
+        self.total = [0] * WINDOW_BUCKETS
+        self.poor = [0] * WINDOW_BUCKETS
+        self.caution = [0] * WINDOW_BUCKETS
+        self.anomaly = [0] * WINDOW_BUCKETS
+        self.devices: dict[str, tuple[float, int]] = {}
+        self.status_counts = [0, 0, 0]
+        self.pruned_at = 0.0
+
+    def add(self, bucket: int, device_id: str, ts: float, quality: str, anomaly: bool):
+        i = bucket % WINDOW_BUCKETS
+        if self.epochs[i] != bucket:
+            self.epochs[i] = bucket
+            self.total[i] = self.poor[i] = self.caution[i] = self.anomaly[i] = 0
+        self.total[i] += 1
+        if quality == "poor":
+            self.poor[i] += 1
+        elif quality == "caution":
+            self.caution[i] += 1
+        if anomaly:
+            self.anomaly[i] += 1
+
+        status = 2 if quality == "poor" or anomaly else 1 if quality == "caution" else 0
+        prev = self.devices.get(device_id)
+        if prev is not None:
+            self.status_counts[prev[1]] -= 1
+        self.status_counts[status] += 1
+        self.devices[device_id] = (ts, status)
+
+    def counts(self, bucket: int) -> tuple[int, int, int, int]:
+        """(total, poor, caution, anomaly) over buckets still inside the window."""
+        total = poor = caution = anomaly = 0
+        for i, epoch in enumerate(self.epochs):
+            if bucket - epoch < WINDOW_BUCKETS:
+                total += self.total[i]
+                poor += self.poor[i]
+                caution += self.caution[i]
+                anomaly += self.anomaly[i]
+        return total, poor, caution, anomaly
+
+    def prune_devices(self, cutoff: float):
+        """Forget devices that have not reported inside the window."""
+        stale = [d for d, (ts, _) in self.devices.items() if ts < cutoff]
+        for d in stale:
+            self.status_counts[self.devices.pop(d)[1]] -= 1
+        self.pruned_at = cutoff
+
+
+@dataclass
+class _Cluster:
+    event_id: int
+    cells: set[Cell]
+    started_at: float
+    announced: bool = False
+    stats: dict = field(default_factory=dict)
+
+
+class CrisisDetector:
+    """
+    Incremental spatio-temporal contamination detector.
+
+    observe() is O(1) per reading and only marks the reading's cell dirty.
+    evaluate() re-scores dirty and currently-hot cells, then re-clusters
+    only the components that touch a cell whose hot/cold state changed.
+    """
+
+    def __init__(self):
+        self.zoom = settings.crisis_zoom
+        self.window_s = settings.crisis_window_s
+        self._bucket_s = self.window_s / WINDOW_BUCKETS
+        self._cells: dict[Cell, _CellWindow] = {}
+        self._dirty: set[Cell] = set()
+        self._hot: dict[Cell, tuple[int, int, int, int, int]] = {}   # cell → counts + bad devices
+        self._cell_cluster: dict[Cell, int] = {}
+        self._clusters: dict[int, _Cluster] = {}
+        self._resolved: list[CrisisEvent] = []
+        self._ids = itertools.count(1)
+        self._now = 0.0                # detector time: newest reading, moved on by the clock in silence
+        self._synced = (0.0, 0.0)      # (_now, clock time) at the last evaluate()
+
+    # ── Ingest ──────────────────────────────────────────
+    def observe(self, device_id: str, lat: float, lng: float, ts: datetime, quality: str, anomaly: bool):
+        """Count one node reading (quality: good | caution | poor)."""
+        t = _epoch(ts)
+        if t > self._now:
+            self._now = t
+        key = cell_of(lat, lng, self.zoom)
+        win = self._cells.get(key)
+        if win is None:
+            win = self._cells[key] = _CellWindow()
+        win.add(int(t // self._bucket_s), device_id, t, quality, anomaly)
+        self._dirty.add(key)
+
+    # ── Scoring ─────────────────────────────────────────
+    def _score(self, key: Cell, bucket: int, cutoff: float) -> Optional[tuple[int, int, int, int, int]]:
+        """Window counts + affected devices if the cell is hot, else None."""
+        win = self._cells.get(key)
+        if win is None:
+            return None
+        if cutoff - win.pruned_at >= self._bucket_s:
+            win.prune_devices(cutoff)
+        if not win.devices:
+            del self._cells[key]
+            return None
+        total, poor, caution, anomaly = win.counts(bucket)
+        good, cautious, bad = win.status_counts
+        if total < settings.crisis_min_readings or bad == 0:
+            return None
+        if (bad + 0.5 * cautious) / (good + cautious + bad) < settings.crisis_hot_ratio:
+            return None
+        return total, poor, caution, anomaly, bad
+
+    # ── Clustering pass ─────────────────────────────────
+    def _advance(self):
+        """
+        Move detector time on by the clock time elapsed since readings last
+        did, so windows of sinks (or sources) that went silent still expire.
+        Relative, not clock.now() itself — replayed readings carry their
+        original timestamps.
+        """
+        t = _epoch(clock.now())
+        now, at = self._synced
+        if self._now <= now:
+            self._now = now + max(0.0, t - at)
+        self._synced = (self._now, t)
+
+    def evaluate(self) -> list[CrisisEvent]:
+        """
+        Re-score changed cells and update crisis clusters.
+        Returns events that opened, grew/shrank or resolved since the last call.
+        """
+        self._advance()
+        bucket = int(self._now // self._bucket_s)
+        cutoff = self._now - self.window_s
+        candidates = self._dirty | set(self._hot)
+        self._dirty = set()
+
+        changed: set[Cell] = set()
+        for key in candidates:
+            scored = self._score(key, bucket, cutoff)
+            was_hot = key in self._hot
+            if scored is None:
+                if was_hot:
+                    del self._hot[key]
+                    changed.add(key)
+            else:
+                # Re-cluster only when the set of affected devices moved
+                if not was_hot or self._hot[key][4] != scored[4]:
+                    changed.add(key)
+                self._hot[key] = scored
+
+        if not changed:
+            return []
+
+        # Dissolve clusters touching a changed cell (or its neighbours)
+        touched: set[Cell] = set()
+        for x, y in changed:
+            touched.update((x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+        dissolved: dict[int, _Cluster] = {}
+        for key in touched:
+            cid = self._cell_cluster.get(key)
+            if cid is not None and cid not in dissolved:
+                dissolved[cid] = self._clusters.pop(cid)
+        for cluster in dissolved.values():
+            for key in cluster.cells:
+                self._cell_cluster.pop(key, None)
+
+        # Re-grow components from every hot cell that lost or never had a cluster
+        seeds = [k for k in touched | set().union(*(c.cells for c in dissolved.values()))
+                 if k in self._hot and k not in self._cell_cluster]
+        emitted: list[CrisisEvent] = []
+        reused: set[int] = set()
+        for seed in seeds:
+            if seed in self._cell_cluster:
+                continue
+            component = self._flood(seed)
+            # Keep the identity of the dissolved cluster it overlaps most
+            best, overlap = None, 0
+            for cid, old in dissolved.items():
+                common = len(old.cells & component)
+                if cid not in reused and common > overlap:
+                    best, overlap = cid, common
+            if best is not None:
+                reused.add(best)
+                prev = dissolved[best]
+                cluster = _Cluster(best, component, prev.started_at, announced=prev.announced)
+            else:
+                cluster = _Cluster(next(self._ids), component, self._now)
+            for key in component:
+                self._cell_cluster[key] = cluster.event_id
+            self._clusters[cluster.event_id] = cluster
+            event = self._to_event(cluster)
+            if event.status == "active":
+                cluster.announced = True
+                emitted.append(event)
+            elif cluster.announced:
+                cluster.announced = False
+                emitted.append(self._resolve(event))
+
+        for cid, old in dissolved.items():
+            if cid not in reused and old.announced:
+                emitted.append(self._resolve(self._to_event(old, resolved=True)))
+        return emitted
+
+    def _resolve(self, event: CrisisEvent) -> CrisisEvent:
+        self._resolved.append(event)
+        del self._resolved[:-settings.crisis_history]
+        return event
+
+    def _flood(self, seed: Cell) -> set[Cell]:
+        """8-connected component of hot cells containing seed."""
+        component = {seed}
+        stack = [seed]
+        while stack:
+            x, y = stack.pop()
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    key = (x + dx, y + dy)
+                    if key in self._hot and key not in component and key not in self._cell_cluster:
+                        component.add(key)
+                        stack.append(key)
+        return component
+
+    def _to_event(self, cluster: _Cluster, resolved: bool = False) -> CrisisEvent:
+        size = cell_size(self.zoom)
+        total = poor = caution = anomaly = devices = 0
+        xs, ys = [], []
+        for key in cluster.cells:
+            if not resolved:
+                t, p, c, a, d = self._hot[key]
+                total += t
+                poor += p
+                caution += c
+                anomaly += a
+                devices += d
+            xs.append(key[0])
+            ys.append(key[1])
+        if not resolved:
+            cluster.stats = {
+                "total": total, "poor": poor, "caution": caution, "anomaly": anomaly,
+                "devices": devices, "is_crisis": devices >= settings.crisis_min_devices,
+            }
+        stats = cluster.stats
+        west, east = min(xs) * size - 180.0, (max(xs) + 1) * size - 180.0
+        south, north = min(ys) * size - 90.0, (max(ys) + 1) * size - 90.0
+        return CrisisEvent(
+            event_id=cluster.event_id,
+            status="resolved" if resolved or not stats["is_crisis"] else "active",
+            started_at=datetime.fromtimestamp(cluster.started_at, tz=timezone.utc).replace(tzinfo=None),
+            updated_at=datetime.fromtimestamp(self._now, tz=timezone.utc).replace(tzinfo=None),
+            lat=round((south + north) / 2, 6),
+            lng=round((west + east) / 2, 6),
+            bbox=[round(west, 6), round(south, 6), round(east, 6), round(north, 6)],
+            cells=len(cluster.cells),
+            device_count=stats["devices"],
+            readings=stats["total"],
+            poor=stats["poor"],
+            caution=stats["caution"],
+            anomaly=stats["anomaly"],
+        )
+
+    # ── Queries ─────────────────────────────────────────
+    def active(self) -> list[CrisisEvent]:
+        """Currently active crisis events (clusters with enough affected devices)."""
+        events = [self._to_event(c) for c in self._clusters.values()]
+        return [e for e in events if e.status == "active"]
+
+    def recent_resolved(self) -> list[CrisisEvent]:
+        return list(self._resolved)
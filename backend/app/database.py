@@ -1,6 +1,12 @@
 """
 HarvesSink – JSON-file based persistence.
 Simple, portable, no DB setup needed. Stores baselines, impact, and recent readings.
+
+Every write is appended to the store's journal (one JSON line per write)
+instead of rewriting the whole store. Loading replays the journal over
+the store — baselines and impact entries replace a device's previous one,
+readings are appended to its history — and once the journal outgrows the
+store it is folded back in.
 """
 
 import json
@@ -8,8 +14,11 @@ import os
 from datetime import datetime
 from typing import Optional
 
+from app.config import settings
+from app.encoder import dumps
+
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+DATA_DIR = settings.data_dir or os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 
 _PATHS = {
     "baselines": os.path.join(DATA_DIR, "baselines.json"),
@@ -19,28 +28,103 @@ _PATHS = {
 
 MAX_READINGS = 2000  # keep last N readings per device
 
+_JOURNALED = ("baselines", "impact", "readings")
+JOURNAL_MIN_COMPACT_BYTES = 4 * 1024 * 1024   # never compact smaller journals
+
 
 def _ensure_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
+def _journal_path(key: str) -> str:
+    return os.path.splitext(_PATHS[key])[0] + ".journal"
+
+
 def _load_json(key: str) -> dict:
     _ensure_dir()
     path = _PATHS[key]
+    data = {}
     if os.path.exists(path):
         try:
             with open(path, "r") as f:
-                return json.load(f)
+                data = json.load(f)
         except (json.JSONDecodeError, IOError):
             pass
-    return {}
+    if key in _JOURNALED:
+        _replay_journal(key, data)
+    return data
+
+
+def _replay_journal(key: str, data: dict):
+    path = _journal_path(key)
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entries = json.loads(line)
+            except json.JSONDecodeError:
+                continue    # torn write from a crash — the entries after it are intact
+            if key == "readings":
+                _append_rows(data, entries)
+            else:
+                data.update(entries)
+
+
+def _append_rows(data: dict, entries: dict):
+    for device_id, rows in entries.items():
+        history = data.setdefault(device_id, [])
+        history.extend(rows)
+        if len(history) > MAX_READINGS:
+            del history[:-MAX_READINGS]
+
+
+def _append_journal(key: str, entries: dict):
+    """
+    Append one write to the store's journal. Each entry starts on a fresh
+    line, so a write torn by a crash never corrupts the next one.
+    """
+    _ensure_dir()
+    path = _journal_path(key)
+    with open(path, "ab") as f:
+        f.write(b"\n" + dumps(entries))
+    size = os.path.getsize(path)
+    store = os.path.getsize(_PATHS[key]) if os.path.exists(_PATHS[key]) else 0
+    if size > max(JOURNAL_MIN_COMPACT_BYTES, store):
+        compact(key)
+
+
+def compact(key: str):
+    """
+    Fold the journal into the store. Only file contents are merged, so a
+    crash between the store swap and the journal removal just replays
+    entries the store already has (for readings: repeats that journal's
+    rows in the history).
+    """
+    data = _load_json(key)
+    _save_json(key, data)
+    path = _journal_path(key)
+    if os.path.exists(path):
+        os.remove(path)
 
 
 def _save_json(key: str, data: dict):
+    """Write to a temp file and swap it in, so a store is never half-written."""
     _ensure_dir()
     path = _PATHS[key]
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2, default=str)
+    tmp = path + ".tmp"
+    # readings and impact (with its buckets) are the big ones — compact, and
+    # encoded in one C call (json.dump streams through many small writes and
+    # is several times slower)
+    if key in ("readings", "impact"):
+        text = json.dumps(data, separators=(",", ":"), default=str)
+    else:
+        text = json.dumps(data, indent=2, default=str)
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
 
 
 # ── Public API ───────────────────────────────────────────────
@@ -54,9 +138,12 @@ async def init_db():
 
 
 def save_baseline(device_id: str, baseline_dict: dict):
-    data = _load_json("baselines")
-    data[device_id] = baseline_dict
-    _save_json("baselines", data)
+    save_baselines({device_id: baseline_dict})
+
+
+def save_baselines(baselines: dict[str, dict]):
+    """Store several baselines with a single journal append."""
+    _append_journal("baselines", baselines)
 
 
 def load_baselines() -> dict:
@@ -64,9 +151,12 @@ def load_baselines() -> dict:
 
 
 def save_impact(device_id: str, impact_dict: dict):
-    data = _load_json("impact")
-    data[device_id] = impact_dict
-    _save_json("impact", data)
+    save_impacts({device_id: impact_dict})
+
+
+def save_impacts(impacts: dict[str, dict]):
+    """Store several impact counters with a single journal append."""
+    _append_journal("impact", impacts)
 
 
 def load_impacts() -> dict:
@@ -74,15 +164,15 @@ def load_impacts() -> dict:
 
 
 def save_reading(reading_dict: dict):
-    data = _load_json("readings")
-    device_id = reading_dict.get("device_id", "unknown")
-    if device_id not in data:
-        data[device_id] = []
-    data[device_id].append(reading_dict)
-    # Trim to last MAX_READINGS
-    if len(data[device_id]) > MAX_READINGS:
-        data[device_id] = data[device_id][-MAX_READINGS:]
-    _save_json("readings", data)
+    save_readings([reading_dict])
+
+
+def save_readings(rows: list[dict]):
+    """Append a batch of readings with a single journal append (trimmed to MAX_READINGS when loaded)."""
+    by_device: dict[str, list[dict]] = {}
+    for reading_dict in rows:
+        by_device.setdefault(reading_dict.get("device_id", "unknown"), []).append(reading_dict)
+    _append_journal("readings", by_device)
 
 
 def load_readings(device_id: str, limit: int = 100) -> list:
@@ -0,0 +1,159 @@
+"""
+HarvesSink – Pre-encoded live packet serializer.
+Most of a LivePacket does not change between ticks: a device's id, GPS and
+edge fields, the Quad-Guard tier names and (usually) its all-clear
+verdict. PacketEncoder keeps those parts as ready-made JSON fragments and
+only formats the numbers that change, so a packet is one string join
+instead of a full model dump. Output is the same document as
+LivePacket.model_dump_json().
+
+dumps() is the fast general-purpose encoder for everything else (history
+responses): orjson when installed, else pydantic-core's serializer.
+"""
+
+import math
+
+from pydantic_core import to_json
+
+from app.config import settings
+from app.records import Packet, Reading
+
+try:
+    import orjson
+except ImportError:                 # optional — pip install orjson
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON bytes (orjson if available); NaN/inf become null either way."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return to_json(obj, inf_nan_mode="null")
+
+
+def _str(value: str) -> str:
+    return dumps(value).decode() if value else '""'
+
+
+def _num(value) -> str:
+    # repr() of a finite float is already valid JSON; NaN/inf are null (like
+    # model_dump_json — devices can send them in unconstrained fields);
+    # bools/None/numpy go the slow way
+    if type(value) is int:
+        return repr(value)
+    if type(value) is float:
+        return repr(value) if math.isfinite(value) else "null"
+    return dumps(value).decode()
+
+
+_BOOL = {True: "true", False: "false"}
+_DECISIONS = {d: f'"{d}"' for d in ("harvest", "caution", "drain")}
+_NO_TIERS = "{}"
+MAX_CACHED_VERDICTS = 1024
+MAX_VARIANTS_PER_DEVICE = 16       # edge state combinations a device cycles through
+_Z_MARKER = "\x00z_scores\x00"     # placeholder spliced out of cached verdict JSON
+
+
+class PacketEncoder:
+    """
+    Templated Packet → JSON. Per device it caches the static part of the
+    reading for each combination of GPS/edge values it has seen (devices
+    cycle through a handful); Quad-Guard verdicts are cached by their
+    flags and details with the per-reading z-scores spliced in.
+    """
+
+    def __init__(self):
+        self._devices: dict[str, dict[tuple, tuple[str, str]]] = {}   # device → edge state → fragments
+        self._verdicts: dict[tuple, tuple[str, str]] = {}
+        self._last_ts = None
+        self._last_iso = ""
+        self.hits = 0
+        self.misses = 0
+
+    # ── Fragments ───────────────────────────────────────
+    def _reading_parts(self, r: Reading) -> tuple[str, str]:
+        key = (
+            r.gps_lat, r.gps_lng, r.valve_position, r.device_mode, r.edge_state,
+            r.edge_progress, r.edge_base_tds, r.edge_nudge, r.edge_valve, r.edge_confidence,
+        )
+        variants = self._devices.get(r.device_id)
+        if variants is None:
+            variants = self._devices[r.device_id] = {}
+        parts = variants.get(key)
+        if parts is not None:
+            self.hits += 1
+            return parts
+        self.misses += 1
+        if len(variants) >= MAX_VARIANTS_PER_DEVICE:
+            variants.clear()
+        head = '{"reading":{"device_id":' + _str(r.device_id) + ',"timestamp":"'
+        tail = (
+            f',"gps_lat":{_num(r.gps_lat)},"gps_lng":{_num(r.gps_lng)}'
+            f',"valve_position":{_num(r.valve_position)},"device_mode":{_str(r.device_mode)}'
+            f',"edge_state":{_num(r.edge_state)},"edge_progress":{_num(r.edge_progress)}'
+            f',"edge_base_tds":{_num(r.edge_base_tds)},"edge_nudge":{_num(r.edge_nudge)}'
+            f',"edge_valve":{_num(r.edge_valve)},"edge_confidence":{_num(r.edge_confidence)}}}'
+            ',"inference":{"bod_predicted":'
+        )
+        parts = variants[key] = (head, tail)
+        return parts
+
+    def _tiers(self, verdict) -> str:
+        if verdict is None:
+            return _NO_TIERS
+        v = verdict
+        key = (
+            v.is_anomaly, v.severity, v.action, v.t1_fault, v.t1_detail, v.t2_fault, v.t2_detail,
+            v.t3_fault, v.t3_detail, v.t4_fault, v.t4_detail, tuple(v.t3_z_scores),
+        )
+        parts = self._verdicts.get(key)
+        if parts is None:
+            if len(self._verdicts) >= MAX_CACHED_VERDICTS:
+                self._verdicts.clear()
+            doc = v.to_dict()
+            doc["tiers"]["t3"]["z_scores"] = _Z_MARKER
+            before, after = dumps(doc).decode().split(dumps(_Z_MARKER).decode())
+            parts = self._verdicts[key] = (before, after)
+        z = v.t3_z_scores
+        return parts[0] + (dumps(z).decode() if z else "{}") + parts[1]
+
+    # ── Public API ──────────────────────────────────────
+    def encode(self, packet: Packet) -> str:
+        r, i = packet.reading, packet.inference
+        head, tail = self._reading_parts(r)
+        # a fleet tick stamps every reading with the same datetime object
+        if r.timestamp is not self._last_ts:
+            self._last_ts, self._last_iso = r.timestamp, r.timestamp.isoformat()
+        # all changing numbers in one encoder call, then split — cheaper than repr() each
+        ph, tds, turbidity, bod, cod, progress, liters, money, lake = dumps((
+            r.ph, r.tds, r.turbidity, i.bod_predicted, i.cod_predicted, float(packet.calibration_progress),
+            packet.liters_saved, packet.money_saved, packet.lake_impact_score,
+        )).decode()[1:-1].split(",")
+        return (
+            f'{head}{self._last_iso}","ph":{ph},"tds":{tds},"turbidity":{turbidity}{tail}{bod}'
+            f',"cod_predicted":{cod},"anomaly_flag":{_BOOL[bool(i.anomaly_flag)]}'
+            f',"anomaly_detail":{_str(i.anomaly_detail)}}},"valve_decision":{_DECISIONS[packet.valve_decision]}'
+            f',"calibration_progress":{progress},"liters_saved":{liters},"money_saved":{money}'
+            f',"lake_impact_score":{lake},"anomaly_tiers":{self._tiers(packet.verdict)}'
+            f',"kill_switch_active":{_BOOL[bool(packet.kill_switch_active)]}'
+            f',"guard_enabled":{_BOOL[bool(packet.guard_enabled)]}}}'
+        )
+
+    def stats(self) -> dict:
+        return {
+            "devices": len(self._devices),
+            "verdicts": len(self._verdicts),
+            "template_hits": self.hits,
+            "template_misses": self.misses,
+            "json_library": "orjson" if orjson is not None else "pydantic-core",
+        }
+
+
+packet_encoder = PacketEncoder()
+
+
+def encode_packet(packet: Packet) -> str:
+    """A live packet as sent on /ws/live (PACKET_ENCODER picks the encoder)."""
+    if settings.packet_encoder == "template":
+        return packet_encoder.encode(packet)
+    return packet.to_json()
@@ -1,45 +1,420 @@
 """
-HarvesSink – Impact tracker.
-Tracks liters saved, money saved, and lake impact score.
+HarvesSink – Impact ledger.
+Tracks liters saved, money saved, and lake impact score. Besides each
+device's running total, every harvest lands in an hourly and a daily
+bucket of its device, of its zone (a municipal grid cell) and of the
+fleet, so "this week" or "per zone" is a sum over a few buckets instead
+of a scan of raw readings.
+
+Everything is counted in harvests (integers). Liters, rupees and the lake
+score are derived from a count when it is read, so money is rounded once
+per answer and bucket sums never drift from the totals.
 """
 
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.clock import clock
+from app.config import settings
+from app.spatial import cell_of
+
 
 # Average flow rate for household greywater (liters per reading interval)
 LITERS_PER_HARVEST = 0.25       # ~0.5L/s at 500ms interval
 TANKER_COST_PER_LITER = 0.50   # ₹0.50 per liter (tanker water in Delhi)
 LAKE_IMPACT_PER_LITER = 0.01   # arbitrary score unit
 
+HOURS_PER_DAY = 24
+MAX_SERIES_POINTS = 2000        # buckets returned by one time-series query
+MAX_FUTURE_HOURS = 1            # clock skew tolerated before a harvest counts in the current hour
+
+_EPOCH = datetime(1970, 1, 1)
+_HOUR = timedelta(hours=1)
+
+
+def _naive_utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo is None else ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def hour_index(ts: datetime) -> int:
+    """Hours since the Unix epoch (naive UTC, like reading timestamps)."""
+    return (_naive_utc(ts) - _EPOCH) // _HOUR
+
+
+def hour_start(hour: int) -> datetime:
+    return _EPOCH + hour * _HOUR
+
+
+def zone_of(lat: float, lng: float, zoom: Optional[int] = None) -> str:
+    """Zone id "zoom:x:y" — the spatial grid cell containing a position."""
+    zoom = settings.impact_zone_zoom if zoom is None else zoom
+    x, y = cell_of(lat, lng, zoom)
+    return f"{zoom}:{x}:{y}"
+
+
+def totals(harvests: int) -> dict:
+    """Harvest count → liters / ₹ / lake score."""
+    liters = harvests * LITERS_PER_HARVEST
+    return {
+        "harvests": harvests,
+        "liters_saved": liters,
+        "money_saved": round(liters * TANKER_COST_PER_LITER, 2),
+        "lake_impact_score": round(liters * LAKE_IMPACT_PER_LITER, 2),
+    }
+
 
-class ImpactTracker:
-    """Accumulates impact metrics per device."""
+class _Buckets:
+    """Harvest counts of one device, zone or the fleet: total + hourly + daily."""
+
+    __slots__ = ("total", "hourly", "daily", "newest")
 
     def __init__(self):
-        self._data: dict[str, dict] = {}
-
-    def _ensure(self, device_id: str):
-        if device_id not in self._data:
-            self._data[device_id] = {
-                "liters_saved": 0.0,
-                "money_saved": 0.0,
-                "lake_impact_score": 0.0,
-            }
-
-    def record_harvest(self, device_id: str):
-        """Call each time a reading results in 'harvest' decision."""
-        self._ensure(device_id)
-        d = self._data[device_id]
-        d["liters_saved"] += LITERS_PER_HARVEST
-        d["money_saved"] = round(d["liters_saved"] * TANKER_COST_PER_LITER, 2)
-        d["lake_impact_score"] = round(d["liters_saved"] * LAKE_IMPACT_PER_LITER, 2)
+        self.total = 0
+        self.hourly: dict[int, int] = {}      # hour index → harvests
+        self.daily: dict[int, int] = {}       # day index → harvests
+        self.newest = 0                       # newest hour seen
+
+    def add(self, hour: int, count: int, now_hour: int, hourly_keep: int, daily_keep: int):
+        self.total += count
+        hourly, daily = self.hourly, self.daily
+        hourly[hour] = hourly.get(hour, 0) + count
+        day = hour // HOURS_PER_DAY
+        daily[day] = daily.get(day, 0) + count
+        if hour > self.newest:
+            self.newest = hour
+        # Expired buckets go in bulk once a series holds twice its retention,
+        # so trimming stays O(1) amortized per harvest
+        if len(hourly) > 2 * hourly_keep:
+            _trim(hourly, now_hour - hourly_keep)
+        if len(daily) > 2 * daily_keep:
+            _trim(daily, now_hour // HOURS_PER_DAY - daily_keep)
+
+    def count(self, start: int, end: int) -> int:
+        """Harvests in hours [start, end) — hourly buckets for partial days, daily for whole ones."""
+        first_day = -(-start // HOURS_PER_DAY)
+        last_day = end // HOURS_PER_DAY
+        hourly = self.hourly
+        if first_day >= last_day:
+            return _sum(hourly, start, end)
+        return (
+            _sum(hourly, start, first_day * HOURS_PER_DAY)
+            + _sum(self.daily, first_day, last_day)
+            + _sum(hourly, last_day * HOURS_PER_DAY, end)
+        )
+
+    def series(self, start: int, end: int, bucket: str) -> list[tuple[int, int]]:
+        """(hour index of bucket start, harvests) for every bucket in [start, end)."""
+        if bucket == "hour":
+            return [(h, self.hourly.get(h, 0)) for h in range(start, end)]
+        return [
+            (d * HOURS_PER_DAY, self.daily.get(d, 0))
+            for d in range(start // HOURS_PER_DAY, end // HOURS_PER_DAY)
+        ]
+
+    def merge(self, other: "_Buckets", sign: int = 1):
+        """Add (sign=-1: take back out) another series' buckets — aggregates on load."""
+        self.total += sign * other.total
+        for mine, theirs in ((self.hourly, other.hourly), (self.daily, other.daily)):
+            for key, n in theirs.items():
+                left = mine.get(key, 0) + sign * n
+                if left > 0:
+                    mine[key] = left
+                else:
+                    mine.pop(key, None)
+        self.newest = max(self.newest, other.newest)
+
+
+def _sum(buckets: dict[int, int], start: int, end: int) -> int:
+    """Buckets in [start, end): by key for short ranges, over the stored buckets for long ones."""
+    if end - start > len(buckets):
+        return sum(n for key, n in buckets.items() if start <= key < end)
+    return sum(buckets.get(key, 0) for key in range(start, end))
 
+
+def _trim(buckets: dict[int, int], oldest: int):
+    for key in [k for k in buckets if k < oldest]:
+        del buckets[key]
+
+
+def _until_now(buckets: dict[int, int], hours: int) -> dict[int, int]:
+    """Fold buckets (each `hours` long) dated past the skew allowance into the current one."""
+    now_hour = hour_index(clock.now())
+    current, limit = now_hour // hours, (now_hour + MAX_FUTURE_HOURS) // hours
+    for key in [k for k in buckets if k > limit]:
+        buckets[current] = buckets.get(current, 0) + buckets.pop(key)
+    return buckets
+
+
+class _DeviceImpact(_Buckets):
+    __slots__ = ("zone", "lat", "lng", "updated_at", "earlier")
+
+    def __init__(self):
+        super().__init__()
+        self.zone: Optional[str] = None
+        self.lat = self.lng = None
+        self.updated_at: Optional[datetime] = None
+        self.earlier: dict[str, _Buckets] = {}     # harvests made in zones the device has left
+
+    def in_zone(self) -> _Buckets:
+        """Harvests made in the current zone: all of them minus those made in earlier zones."""
+        if not self.earlier:
+            return self
+        here = _Buckets()
+        here.merge(self)
+        for buckets in self.earlier.values():
+            here.merge(buckets, -1)
+        return here
+
+
+def _dump(buckets: _Buckets) -> dict:
+    return {
+        "hourly": {str(h): n for h, n in buckets.hourly.items()},
+        "daily": {str(d): n for d, n in buckets.daily.items()},
+    }
+
+
+class ImpactLedger:
+    """
+    Per-device, per-zone and fleet-wide harvest buckets. A harvest costs a
+    handful of dict increments regardless of history length; a range query
+    reads at most two partial days of hourly buckets plus one daily bucket
+    per whole day — or just the stored buckets, when there are fewer.
+
+    Hourly buckets are kept for impact_hourly_retention_h hours and daily
+    ones for impact_daily_retention_d days. Ranges reaching further back
+    than the hourly window are widened to whole days.
+    """
+
+    def __init__(self, zone_zoom: Optional[int] = None):
+        self.zone_zoom = settings.impact_zone_zoom if zone_zoom is None else zone_zoom
+        self.hourly_keep = settings.impact_hourly_retention_h
+        self.daily_keep = settings.impact_daily_retention_d
+        self._devices: dict[str, _DeviceImpact] = {}
+        self._zones: dict[str, _Buckets] = {}
+        self._zone_devices: dict[str, set[str]] = {}
+        self._fleet = _Buckets()
+        self._dirty: set[str] = set()          # devices changed since the last take_dirty()
+        self._last_ts: Optional[datetime] = None
+        self._last_hour = 0
+        self._now_hour = 0
+
+    # ── Recording ───────────────────────────────────────
+    def record_harvest(self, device_id: str, at: Optional[datetime] = None,
+                       lat: Optional[float] = None, lng: Optional[float] = None):
+        """Call each time a reading results in 'harvest' decision (at = reading time, default: clock now)."""
+        self.record_harvests(device_id, 1, at, lat, lng)
+
+    def record_harvests(self, device_id: str, count: int, at: Optional[datetime] = None,
+                        lat: Optional[float] = None, lng: Optional[float] = None):
+        """record_harvest() × count, all in the hour of `at` (bulk ingest)."""
+        at = at or clock.now()
+        # a fleet tick stamps every reading with the same datetime object
+        if at is not self._last_ts:
+            now_hour = self._now_hour = hour_index(clock.now())
+            hour = hour_index(at)
+            # a harvest stamped in the future counts now, so it can't push the retention window ahead
+            self._last_ts, self._last_hour = at, hour if hour <= now_hour + MAX_FUTURE_HOURS else now_hour
+        hour, now_hour = self._last_hour, self._now_hour
+
+        device = self._devices.get(device_id)
+        if device is None:
+            device = self._devices[device_id] = _DeviceImpact()
+        if lat is not None and (lat != device.lat or lng != device.lng):
+            device.lat, device.lng = lat, lng
+            self._move(device_id, device, zone_of(lat, lng, self.zone_zoom))
+
+        hourly_keep, daily_keep = self.hourly_keep, self.daily_keep
+        device.add(hour, count, now_hour, hourly_keep, daily_keep)
+        device.updated_at = at
+        self._dirty.add(device_id)
+        self._fleet.add(hour, count, now_hour, hourly_keep, daily_keep)
+        if device.zone is not None:
+            self._zones[device.zone].add(hour, count, now_hour, hourly_keep, daily_keep)
+
+    def _move(self, device_id: str, device: _DeviceImpact, zone: str):
+        """
+        Attribute the device's future harvests to a zone. Past ones stay
+        where they happened — the device remembers them per zone, so load()
+        and remove() put them back in the same place.
+        """
+        if zone == device.zone:
+            return
+        if device.zone is not None:
+            self._zone_devices[device.zone].discard(device_id)
+            left = device.earlier.setdefault(device.zone, _Buckets())
+            left.merge(device.in_zone())
+            _trim(left.hourly, self._now_hour - self.hourly_keep)
+            _trim(left.daily, self._now_hour // HOURS_PER_DAY - self.daily_keep)
+        device.zone = zone
+        self._zone(zone)
+        self._zone_devices[zone].add(device_id)
+
+    def _zone(self, zone: str) -> _Buckets:
+        if zone not in self._zones:
+            self._zones[zone] = _Buckets()
+            self._zone_devices[zone] = set()
+        return self._zones[zone]
+
+    # ── Totals ──────────────────────────────────────────
     def get(self, device_id: str) -> dict:
-        self._ensure(device_id)
-        return self._data[device_id]
-
-    def load(self, device_id: str, liters: float, money: float, lake: float):
-        """Load persisted values on startup."""
-        self._data[device_id] = {
-            "liters_saved": liters,
-            "money_saved": money,
-            "lake_impact_score": lake,
+        """All-time impact of a device."""
+        device = self._devices.get(device_id)
+        if device is None:
+            return totals(0)
+        data = totals(device.total)
+        data["zone"] = device.zone
+        if device.updated_at:
+            data["updated_at"] = device.updated_at.isoformat()
+        return data
+
+    def device_ids(self) -> list[str]:
+        return list(self._devices)
+
+    def fleet_totals(self) -> dict:
+        return {**totals(self._fleet.total), "devices": len(self._devices), "zones": len(self._zones)}
+
+    # ── Time-ranged queries ─────────────────────────────
+    def _resolve(self, start: datetime, end: datetime, bucket: Optional[str]) -> tuple[int, int, str]:
+        """
+        Range → [start hour, end hour) at the finest resolution the buckets
+        still hold: whole hours inside the hourly window (counted back from
+        the clock), whole days before it.
+        """
+        start_h = hour_index(start)
+        end_h = -(-(_naive_utc(end) - _EPOCH) // _HOUR)      # partial hours round outward
+        now_h = hour_index(clock.now())
+        horizon = now_h - self.hourly_keep
+        if bucket == "hour":
+            if start_h < horizon:
+                raise ValueError(f"Hourly buckets only cover the last {self.hourly_keep} hours")
+            resolution = "hour"
+        elif bucket == "day" or start_h < horizon:
+            start_h = start_h // HOURS_PER_DAY * HOURS_PER_DAY
+            end_h = -(-end_h // HOURS_PER_DAY) * HOURS_PER_DAY
+            resolution = "day"
+        else:
+            resolution = "hour"
+        if end_h <= start_h:
+            raise ValueError("end must be after start")
+        step = 1 if resolution == "hour" else HOURS_PER_DAY
+        span = end_h - start_h
+        if not bucket:
+            # A total only reads buckets that can exist: the retained window up to the newest hour
+            newest = min(self._fleet.newest, now_h + MAX_FUTURE_HOURS)
+            oldest = (now_h // HOURS_PER_DAY - self.daily_keep) * HOURS_PER_DAY
+            span = min(end_h, newest + 1) - max(start_h, oldest)
+        if span // step > MAX_SERIES_POINTS:
+            raise ValueError(f"More than {MAX_SERIES_POINTS} {resolution} buckets requested")
+        return start_h, end_h, resolution
+
+    def _range(self, buckets: Optional[_Buckets], start: datetime, end: datetime,
+               bucket: Optional[str]) -> dict:
+        start_h, end_h, resolution = self._resolve(start, end, bucket)
+        buckets = buckets or _Buckets()
+        result = {
+            "start": hour_start(start_h),
+            "end": hour_start(end_h),
+            "resolution": resolution,
+            **totals(buckets.count(start_h, end_h)),
+            "all_time": totals(buckets.total),
+        }
+        if bucket:
+            result["series"] = [
+                {"start": hour_start(h), **totals(n)}
+                for h, n in buckets.series(start_h, end_h, resolution)
+            ]
+        return result
+
+    def device_range(self, device_id: str, start: datetime, end: datetime, bucket: Optional[str] = None) -> dict:
+        """Impact of one device in [start, end), optionally as an hourly/daily series."""
+        return {"device_id": device_id, **self._range(self._devices.get(device_id), start, end, bucket)}
+
+    def fleet_range(self, start: datetime, end: datetime, bucket: Optional[str] = None) -> dict:
+        return {"devices": len(self._devices), **self._range(self._fleet, start, end, bucket)}
+
+    def zone_range(self, zone: str, start: datetime, end: datetime, bucket: Optional[str] = None) -> dict:
+        return {
+            "zone": zone,
+            "devices": len(self._zone_devices.get(zone, ())),
+            **self._range(self._zones.get(zone), start, end, bucket),
         }
+
+    def zones(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> list[dict]:
+        """Every zone's impact (all-time, or in [start, end)), largest first."""
+        if start is None:
+            counts = {z: b.total for z, b in self._zones.items()}
+        else:
+            start_h, end_h, _ = self._resolve(start, end, None)
+            counts = {z: b.count(start_h, end_h) for z, b in self._zones.items()}
+        return [
+            {"zone": z, "devices": len(self._zone_devices[z]), **totals(n)}
+            for z, n in sorted(counts.items(), key=lambda kv: -kv[1])
+        ]
+
+    # ── Persistence ─────────────────────────────────────
+    def take_dirty(self) -> set[str]:
+        """Devices recorded since the previous call (for the checkpointer)."""
+        dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def mark_dirty(self, device_ids):
+        self._dirty.update(device_ids)
+
+    def snapshot(self, device_id: str) -> dict:
+        """Device totals plus its buckets, for the JSON store."""
+        device = self._devices.get(device_id)
+        data = self.get(device_id)
+        if device is not None:
+            data["lat"], data["lng"] = device.lat, device.lng
+            data.update(_dump(device))
+            if device.earlier:
+                data["earlier_zones"] = {
+                    z: {"harvests": b.total, **_dump(b)} for z, b in device.earlier.items()
+                }
+        return data
+
+    def load(self, device_id: str, data: dict):
+        """
+        Restore a device from snapshot() on startup and fold it into the zone
+        and fleet aggregates — harvests made in zones it has since left go
+        back to those zones. Stores written before the ledger only have
+        liters_saved; that becomes the total without buckets. Loading a
+        device again (cluster replicas, shard collection) replaces its
+        previous copy.
+        """
+        self.remove(device_id)
+        device = self._devices[device_id] = _DeviceImpact()
+        harvests = data.get("harvests")
+        if harvests is None:
+            harvests = round(data.get("liters_saved", 0) / LITERS_PER_HARVEST)
+        device.total = int(harvests)
+        device.hourly = _until_now({int(h): n for h, n in data.get("hourly", {}).items()}, 1)
+        device.daily = _until_now({int(d): n for d, n in data.get("daily", {}).items()}, HOURS_PER_DAY)
+        device.newest = max(device.hourly, default=0)
+        if data.get("updated_at"):
+            device.updated_at = datetime.fromisoformat(data["updated_at"])
+        if data.get("lat") is not None:
+            device.lat, device.lng = data["lat"], data["lng"]
+        for zone, past in data.get("earlier_zones", {}).items():
+            buckets = device.earlier[zone] = _Buckets()
+            buckets.total = int(past["harvests"])
+            buckets.hourly = {int(h): n for h, n in past["hourly"].items()}
+            buckets.daily = {int(d): n for d, n in past["daily"].items()}
+            self._zone(zone).merge(buckets)
+        if data.get("zone"):
+            self._move(device_id, device, data["zone"])
+            self._zones[device.zone].merge(device.in_zone())
+        self._fleet.merge(device)
+
+    def remove(self, device_id: str):
+        """Drop a device and take its harvests back out of its zone and the fleet (shard rebalancing)."""
+        old = self._devices.pop(device_id, None)
+        self._dirty.discard(device_id)
+        if old is None:
+            return
+        self._fleet.merge(old, -1)
+        if old.zone is not None:
+            self._zones[old.zone].merge(old.in_zone(), -1)
+            self._zone_devices[old.zone].discard(device_id)
+        for zone, past in old.earlier.items():
+            self._zones[zone].merge(past, -1)
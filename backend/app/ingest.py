@@ -0,0 +1,209 @@
+"""
+HarvesSink – Bulk ingest of buffered readings.
+Gateways that were offline upload hours of readings at once (NDJSON or a
+JSON array). Records are parsed a chunk at a time, validated as columns
+instead of one pydantic model per reading, and handed to the pipeline's
+batch path.
+"""
+
+import json
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+from app.schemas import SensorReading
+
+
+MAX_ERRORS = 20          # rejected records echoed back in the response
+_EPOCH = datetime(1970, 1, 1)
+_DEFAULTS = SensorReading.model_fields
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _column(records: list[dict], key: str, default) -> np.ndarray:
+    values = [r.get(key, default) for r in records]
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_to_float(v) for v in values], dtype=np.float64)
+
+
+def _parse_timestamp(value, now: datetime) -> Optional[datetime]:
+    if value is None:
+        return now
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value):
+            return None
+        try:
+            return datetime.utcfromtimestamp(value)
+        except (OverflowError, ValueError, OSError):      # outside datetime's / the platform's range
+            return None
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00") if value.endswith("Z") else value)
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return ts if ts.tzinfo is None else ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def split_records(chunk: bytes) -> list:
+    """
+    Complete NDJSON lines → JSON values, with one json.loads call for the
+    whole chunk. Falls back to line by line so one bad line only rejects
+    itself (as None).
+    """
+    lines = [line for line in chunk.split(b"\n") if line.strip()]
+    if not lines:
+        return []
+    try:
+        return json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                records.append(None)
+        return records
+
+
+@dataclass
+class IngestBatch:
+    """Validated readings as columns, in upload order."""
+    device_ids: list[str]
+    timestamps: list[datetime]
+    ph: np.ndarray
+    tds: np.ndarray
+    turbidity: np.ndarray
+    gps_lat: np.ndarray
+    gps_lng: np.ndarray
+    edge_valve: np.ndarray
+    warmup: np.ndarray
+    errors: list[dict] = field(default_factory=list)
+    rejected: int = 0
+    _epoch: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.device_ids)
+
+    def epoch_seconds(self) -> np.ndarray:
+        """Timestamps as seconds since the Unix epoch (computed once)."""
+        if self._epoch is None:
+            self._epoch = np.fromiter(
+                ((t - _EPOCH).total_seconds() for t in self.timestamps), dtype=np.float64, count=len(self),
+            )
+        return self._epoch
+
+    def take(self, rows: list[int]) -> "IngestBatch":
+        """The given rows (upload order) as a batch of their own — one pipeline shard's share."""
+        idx = np.asarray(rows, dtype=np.int64)
+        return IngestBatch(
+            device_ids=[self.device_ids[i] for i in rows],
+            timestamps=[self.timestamps[i] for i in rows],
+            ph=self.ph[idx],
+            tds=self.tds[idx],
+            turbidity=self.turbidity[idx],
+            gps_lat=self.gps_lat[idx],
+            gps_lng=self.gps_lng[idx],
+            edge_valve=self.edge_valve[idx],
+            warmup=self.warmup[idx],
+            _epoch=None if self._epoch is None else self._epoch[idx],
+        )
+
+    def grouped(self) -> tuple[np.ndarray, list[str], np.ndarray]:
+        """
+        (order, devices, starts): row order sorted by device then time,
+        and where each device's run begins in that order.
+        """
+        codes: dict[str, int] = {}
+        device_code = np.fromiter((codes.setdefault(d, len(codes)) for d in self.device_ids), dtype=np.int64, count=len(self))
+        order = np.lexsort((self.epoch_seconds(), device_code))
+        sorted_codes = device_code[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        names = list(codes)
+        devices = [names[c] for c in sorted_codes[starts].tolist()]
+        return order, devices, starts
+
+
+def validate(records: list, offset: int = 0, now: Optional[datetime] = None) -> IngestBatch:
+    """
+    Column-wise validation against the SensorReading constraints. Invalid
+    records are dropped and reported by index (offset = position of the
+    first record in the whole upload).
+    """
+    now = now or datetime.utcnow()
+    n = len(records)
+    valid = np.ones(n, dtype=bool)
+    reasons: dict[int, str] = {}
+
+    is_dict = [isinstance(r, dict) for r in records]
+    if not all(is_dict):
+        for i, ok in enumerate(is_dict):
+            if not ok:
+                valid[i] = False
+                reasons[i] = "not a JSON object"
+        records = [r if ok else {} for r, ok in zip(records, is_dict)]
+
+    ph = _column(records, "ph", math.nan)
+    tds = _column(records, "tds", math.nan)
+    turbidity = _column(records, "turbidity", math.nan)
+    gps_lat = _column(records, "gps_lat", _DEFAULTS["gps_lat"].default)
+    gps_lng = _column(records, "gps_lng", _DEFAULTS["gps_lng"].default)
+    edge_valve = _column(records, "edge_valve", _DEFAULTS["edge_valve"].default)
+
+    with np.errstate(invalid="ignore"):
+        checks = (
+            (~np.isfinite(ph) | (ph < 0) | (ph > 14), "ph must be a number in [0, 14]"),
+            (~np.isfinite(tds) | (tds < 0), "tds must be a number ≥ 0"),
+            (~np.isfinite(turbidity) | (turbidity < 0), "turbidity must be a number ≥ 0"),
+            (~np.isfinite(gps_lat) | ~np.isfinite(gps_lng), "gps_lat/gps_lng must be numbers"),
+            ((edge_valve != 0) & (edge_valve != 1), "edge_valve must be 0 or 1"),
+        )
+    for bad, reason in checks:
+        for i in np.flatnonzero(bad & valid).tolist():
+            reasons[i] = reason
+        valid &= ~bad
+
+    default_id = _DEFAULTS["device_id"].default
+    device_ids = [str(r.get("device_id") or default_id) for r in records]
+    timestamps = [_parse_timestamp(r.get("timestamp"), now) for r in records]
+    latest = now + timedelta(seconds=settings.ingest_max_future_s)
+    for i, ts in enumerate(timestamps):
+        if not valid[i]:
+            continue
+        if ts is None:
+            valid[i] = False
+            reasons[i] = "timestamp must be ISO-8601 or finite, in-range epoch seconds"
+        elif ts > latest:
+            valid[i] = False
+            reasons[i] = f"timestamp is more than {settings.ingest_max_future_s:g}s in the future"
+    warmup = np.array([r.get("device_mode") == "warmup" for r in records], dtype=bool)
+
+    keep = np.flatnonzero(valid)
+    if len(keep) < n:
+        keep_list = keep.tolist()
+        device_ids = [device_ids[i] for i in keep_list]
+        timestamps = [timestamps[i] for i in keep_list]
+    errors = [{"index": offset + i, "error": reasons[i]} for i in sorted(reasons)[:MAX_ERRORS]]
+    return IngestBatch(
+        device_ids=device_ids,
+        timestamps=timestamps,
+        ph=ph[keep],
+        tds=tds[keep],
+        turbidity=turbidity[keep],
+        gps_lat=gps_lat[keep],
+        gps_lng=gps_lng[keep],
+        edge_valve=edge_valve[keep].astype(np.int8),
+        warmup=warmup[keep],
+        errors=errors,
+        rejected=n - len(keep),
+    )
@@ -4,69 +4,128 @@ Wires up all components: data source, calibration, AI, and WebSocket streaming.
 """
 
 import asyncio
+import functools
+import json
+import math
+import os
+import time
 from contextlib import asynccontextmanager
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Literal, Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query
+from app.startup import startup        # first, so the clock covers every import below
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
 
 from app.config import settings
+from app.clock import clock
 from app.database import (
-    init_db, save_baseline, load_baselines,
-    save_impact, load_impacts, save_reading, load_readings,
+    init_db, load_baselines, load_impacts, load_readings, MAX_READINGS, DATA_DIR,
+)
+from app.schemas import (
+    NodeSummary, NodeCluster, CrisisEvent, ResourceForecast,
+    SustainabilityNudge, CalibrationBaseline, ImpactRange, ZoneImpact,
 )
-from app.schemas import SensorReading, LivePacket, NodeSummary, SustainabilityNudge, CalibrationBaseline, InferenceResult
 from app.sources.bridge import create_data_source
 from app.sources.base import DataSource
-from app.calibration import CalibrationEngine, ValveController
-from app.ai.inference import InferenceEngine
-from app.ai.anomaly import QuadGuardEngine
-from app.ai.llm_nudge import generate_nudge
-from app.impact import ImpactTracker
-from app.municipal import get_all_node_summaries
+from app.records import Reading
+from app.encoder import encode_packet, dumps
+from app.pipeline import SensorPipeline, BatchResult, DECISIONS
+from app.ingest import split_records, validate, MAX_ERRORS
+from app.ai.llm_nudge import NudgeService, _fallback_nudge
+from app.ai.model_manager import ModelManager
+from app.ai import registry
+from app.checkpoint import Checkpointer, ReadingWriter
+from app.cluster import Cluster
+from app.shards import ShardPool
+from app.nudges import NudgeWorker
+from app.municipal import MunicipalAggregator, SnapshotCache, DECISION_QUALITY
+from app.crisis import CrisisDetector
+from app.forecast import ResourceForecaster
+from app.spatial import BBox
 
 
 # ── Singletons ───────────────────────────────────────────────
 data_source: DataSource = create_data_source()
-calibration = CalibrationEngine()
-valve = ValveController()
-engine = InferenceEngine()
-quad_guard = QuadGuardEngine()
-impact = ImpactTracker()
+pipeline = SensorPipeline()
+calibration = pipeline.calibration
+engine = pipeline.engine
+impact = pipeline.impact
+municipal = MunicipalAggregator()
+snapshots = SnapshotCache(municipal)
+crisis = CrisisDetector()
+forecaster = ResourceForecaster()
+cluster = Cluster()
+shards = ShardPool()
+checkpointer = Checkpointer(impact, on_flush=cluster.stage_devices, collect=shards.collect)
+readings_writer = ReadingWriter()
+models = ModelManager(engine, on_swap=shards.swap_model)
+nudges = NudgeService()
+nudge_worker = NudgeWorker(nudges, publish=lambda text: _broadcast(text))
 
 # Connected WebSocket clients
 ws_clients: set[WebSocket] = set()
 
-# Background task handle
-_stream_task: Optional[asyncio.Task] = None
+# Background task handles (stream-owner loops + the cluster loop)
+_tasks: list[asyncio.Task] = []
 
 # Track last reading per device (for nudge endpoint)
-_last_readings: dict[str, SensorReading] = {}
-
-# Persist counter — save impact/baseline every N readings
-_persist_counter = 0
-PERSIST_EVERY = 20
+_last_readings: dict[str, Reading] = {}
 
+startup.mark("imported")
 
 # ── Lifespan ─────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup — every worker restores state; only the stream owner connects the source
     await init_db()
-    engine.load_model()
     _load_persisted_state()
-    await data_source.connect()
-
-    global _stream_task
-    _stream_task = asyncio.create_task(_sensor_stream_loop())
+    cluster.on_promote = _start_stream
+    cluster.collect = _cluster_collect
+    cluster.apply = _cluster_apply
+    cluster.execute = _execute_command
+    cluster.broadcast = _send_local
+    cluster.clients = lambda: len(ws_clients)
+    if await cluster.start():
+        await _start_stream()
+    _tasks.append(asyncio.create_task(cluster.run()))
+    startup.mark("ready")
 
     yield
 
-    # Shutdown — persist final state
-    _persist_state()
-    if _stream_task:
-        _stream_task.cancel()
-    await data_source.disconnect()
+    # Shutdown — stop the loops, then persist final state
+    for task in _tasks:
+        task.cancel()
+    if cluster.is_leader:
+        await checkpointer.flush()
+        await readings_writer.close()
+        await nudges.close()
+        await data_source.disconnect()
+    shards.stop()
+    cluster.stop()
+
+
+async def _start_stream():
+    """
+    Become the stream owner: start loading the model, start the pipeline
+    shards, connect the source, start the loops. Readings are served by the
+    formula fallback until the model is swapped in.
+    """
+    if engine.model is None:
+        _tasks.append(asyncio.create_task(_load_model()))
+    if shards.enabled:
+        await shards.start(calibration, impact)
+    await data_source.connect()
+    for loop in (_sensor_stream_loop(), _crisis_loop(), checkpointer.run(), models.run(), nudge_worker.run()):
+        _tasks.append(asyncio.create_task(loop))
+
+
+async def _load_model():
+    await models.load_active()
+    startup.mark("model_loaded")
 
 
 app = FastAPI(title="HarvesSink API", version="1.0.0", lifespan=lifespan)
@@ -81,131 +140,77 @@ app.add_middleware(
 
 
 # ── Background sensor stream ────────────────────────────────
+async def _broadcast(text: str):
+    """Send a message to this worker's WebSocket clients and, clustered, to the other workers'."""
+    cluster.stage_packet(text)
+    await _send_local(text)
+
+
+async def _send_local(text: str):
+    """Send a message to every WebSocket client of this worker, dropping dead connections."""
+    dead = set()
+    for ws in ws_clients:
+        try:
+            await ws.send_text(text)
+        except Exception:
+            dead.add(ws)
+    ws_clients.difference_update(dead)
+
+
+def _process_local(batch: list[Reading]):
+    """The in-process pipeline, one reading at a time → (reading, result, packet text)."""
+    for reading in batch:
+        try:
+            result = pipeline.process(reading)
+        except Exception as e:
+            print(f"Pipeline error ({reading.device_id}): {e}")
+            continue
+        yield reading, result, encode_packet(result.packet)
+
+
 async def _sensor_stream_loop():
-    """Continuously reads from data source, runs inference, broadcasts."""
-    global ws_clients, _persist_counter
+    """Continuously reads batches from the data source, runs the pipeline, broadcasts."""
     while True:
         try:
-            reading = await data_source.read()
-            _last_readings[reading.device_id] = reading
-
-            # If Arduino is in warmup, skip calibration/inference
-            if reading.device_mode == "warmup":
-                packet = LivePacket(
-                    reading=reading,
-                    inference=InferenceResult(),
-                    valve_decision="drain",
-                    calibration_progress=0,
-                )
-                packet_json = packet.model_dump_json()
-                dead = set()
-                for ws in ws_clients:
-                    try:
-                        await ws.send_text(packet_json)
-                    except Exception:
-                        dead.add(ws)
-                ws_clients.difference_update(dead)
-                continue
-
-            # Calibration phase (auto-calibrate on first connection)
-            if not calibration.is_calibrated(reading.device_id):
-                reading.device_mode = "calibration"
-                result = calibration.feed_sample(reading)
-                # Persist baseline when calibration completes
-                if result and result.is_complete:
-                    save_baseline(reading.device_id, result.model_dump())
-
-            # AI inference (BOD/COD only)
-            inference = engine.predict(reading)
-
-            # Quad-Guard anomaly detection (4-tier) — skipped if guard disabled
-            baseline = calibration.get_baseline(reading.device_id)
-            if _guard_enabled:
-                anomaly_verdict = quad_guard.evaluate(reading, baseline)
+            batch = await data_source.read_batch()
+            rows = []
+            for reading in batch:
+                _last_readings[reading.device_id] = reading
+                nudge_worker.observe(reading)
+            if shards.running:
+                results = await shards.process(batch, pipeline.kill_switch_forced, pipeline.guard_enabled)
             else:
-                anomaly_verdict = quad_guard.evaluate(reading, None)  # produces all-clear
-                anomaly_verdict.is_anomaly = False
-                anomaly_verdict.severity = "ok"
-
-            # Valve decision (safety caps + baseline)
-            decision = valve.decide(reading, baseline)
-
-            # Anomaly override — QuadGuard can force drain/caution (only when guard enabled)
-            if _guard_enabled and anomaly_verdict.is_anomaly:
-                inference.anomaly_flag = True
-                inference.anomaly_detail = anomaly_verdict.t1_detail or anomaly_verdict.t2_detail or anomaly_verdict.t3_detail or anomaly_verdict.t4_detail
-                if anomaly_verdict.severity == "critical":
-                    reading.device_mode = "fault"
-                    decision = "drain"
-                elif anomaly_verdict.severity == "warning" and decision == "harvest":
-                    decision = "caution"
-
-            # Kill-switch: if XGBoost predicts dangerous BOD/COD
-            # but Arduino is still harvesting, send "0" to force drain
-            kill_switch_active = False
-            if _kill_switch_forced:
-                # Manual override from demo button
-                kill_switch_active = True
-                decision = "drain"
-                reading.device_mode = "fault"
-            elif (
-                inference.bod_predicted > settings.bod_kill_threshold
-                or inference.cod_predicted > settings.cod_kill_threshold
-            ):
-                if reading.edge_valve == 1:  # Arduino thinks it's safe
-                    await data_source.write("0")
-                    kill_switch_active = True
-                    decision = "drain"
-                    reading.device_mode = "fault"
-
-            # Impact tracking
-            if decision == "harvest":
-                impact.record_harvest(reading.device_id)
-
-            impact_data = impact.get(reading.device_id)
-
-            # Build packet
-            packet = LivePacket(
-                reading=reading,
-                inference=inference,
-                valve_decision=decision,
-                calibration_progress=calibration.get_progress(reading.device_id),
-                liters_saved=round(impact_data["liters_saved"], 1),
-                money_saved=impact_data["money_saved"],
-                lake_impact_score=impact_data["lake_impact_score"],
-                anomaly_tiers=anomaly_verdict.to_dict(),
-                kill_switch_active=kill_switch_active,
-                guard_enabled=_guard_enabled,
-            )
-
-            # Persist reading
-            save_reading({
-                "device_id": reading.device_id,
-                "timestamp": reading.timestamp.isoformat(),
-                "ph": reading.ph,
-                "tds": reading.tds,
-                "turbidity": reading.turbidity,
-                "bod": inference.bod_predicted,
-                "cod": inference.cod_predicted,
-                "valve_decision": decision,
-                "anomaly": inference.anomaly_flag,
-            })
-
-            # Periodically persist impact
-            _persist_counter += 1
-            if _persist_counter >= PERSIST_EVERY:
-                _persist_counter = 0
-                _persist_state()
-
-            # Broadcast to all WebSocket clients
-            packet_json = packet.model_dump_json()
-            dead = set()
-            for ws in ws_clients:
-                try:
-                    await ws.send_text(packet_json)
-                except Exception:
-                    dead.add(ws)
-            ws_clients.difference_update(dead)
+                results = _process_local(batch)
+            for reading, result, text in results:
+                # Persist baseline when calibration completes (next checkpoint)
+                if result.baseline:
+                    checkpointer.baseline_completed(result.baseline)
+                    if shards.running:
+                        calibration.load_baseline(result.baseline)
+                if result.send_kill_switch:
+                    await data_source.write("0", reading.device_id)
+
+                if result.persist:
+                    rows.append(result.persist)
+                    models.observe(reading, result.inference)
+                    # Municipal table + neighbourhood crisis windows + forecast stats
+                    municipal.update(reading, result.inference, result.decision)
+                    forecaster.decisions.record(result.decision)
+                    crisis.observe(
+                        reading.device_id, reading.gps_lat, reading.gps_lng, reading.timestamp,
+                        DECISION_QUALITY[result.decision], result.inference.anomaly_flag,
+                    )
+
+                # Broadcast to all WebSocket clients
+                await _broadcast(text)
+                if startup.mark("first_packet"):
+                    print(f"🚀 First packet {startup.marks['first_packet']:.2f}s after start "
+                          f"(model: {engine.model_version or 'formula fallback'})")
+
+            # Persist readings (one journal append per batch, off the event loop);
+            # impact goes with the checkpointer
+            if rows:
+                readings_writer.add(rows)
 
         except asyncio.CancelledError:
             break
@@ -214,10 +219,17 @@ async def _sensor_stream_loop():
             await asyncio.sleep(1)
 
 
-def _persist_state():
-    """Save impact counters to JSON files."""
-    for device_id in impact._data:
-        save_impact(device_id, impact._data[device_id])
+async def _crisis_loop():
+    """Periodically cluster hot grid cells and push crisis changes to clients."""
+    while True:
+        try:
+            await clock.sleep(settings.crisis_eval_interval_s)
+            for event in crisis.evaluate():
+                await _broadcast(json.dumps({"topic": "crisis", "event": event.model_dump(mode="json")}))
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print(f"Crisis detector error: {e}")
 
 
 def _load_persisted_state():
@@ -232,16 +244,82 @@ def _load_persisted_state():
         # Load impact
         impacts = load_impacts()
         for device_id, imp_dict in impacts.items():
-            impact.load(
-                device_id,
-                imp_dict.get("liters_saved", 0),
-                imp_dict.get("money_saved", 0),
-                imp_dict.get("lake_impact_score", 0),
-            )
+            impact.load(device_id, imp_dict)
     except Exception as e:
         print(f"Warning: Could not load persisted state: {e}")
 
 
+# ── Cluster (CLUSTER_ENABLED, uvicorn --workers N) ───────────
+_published_version = 0          # municipal table version already published to followers
+
+
+def _cluster_collect() -> list[tuple]:
+    """Stream owner: what changed since the last publish, plus the small documents followers serve."""
+    global _published_version
+    items = [("node", row["device_id"], row) for row in municipal.rows_since(_published_version)]
+    _published_version = municipal.version
+    items += [("nudge", d, n.model_dump()) for d, n in nudge_worker.take_updated().items()]
+    items += [
+        ("doc", "status", _status()),
+        ("doc", "models", models.stats()),
+        ("doc", "flags", {"kill_switch_forced": pipeline.kill_switch_forced, "guard_enabled": pipeline.guard_enabled}),
+        ("doc", "decisions", forecaster.decisions.counts),
+        ("doc", "crises", {
+            "active": [e.model_dump(mode="json") for e in crisis.active()],
+            "resolved": [e.model_dump(mode="json") for e in crisis.recent_resolved()],
+        }),
+    ]
+    return items
+
+
+def _cluster_apply(kind: str, key: str, body):
+    """Follower: fold a published change into this worker's singletons."""
+    if kind == "impact":
+        impact.load(key, body)
+    elif kind == "baseline":
+        if body is None:
+            calibration.reset(key)
+        else:
+            calibration.load_baseline(CalibrationBaseline(**body))
+    elif kind == "node":
+        municipal.apply_row(body)
+    elif kind == "nudge":
+        nudge_worker.set_latest(key, SustainabilityNudge(**body))
+    elif kind == "doc" and key == "flags":
+        pipeline.kill_switch_forced = body["kill_switch_forced"]
+        pipeline.guard_enabled = body["guard_enabled"]
+    elif kind == "doc" and key == "decisions":
+        forecaster.decisions.counts = dict(body)
+
+
+# Mutating endpoints a follower hands to the stream owner, by name
+_COMMANDS: dict = {}
+
+
+def _leader_only(handler):
+    """Endpoint runs on the stream owner; on a follower it is forwarded there and the result relayed."""
+    _COMMANDS[handler.__name__] = handler
+
+    @functools.wraps(handler)
+    async def endpoint(**kwargs):
+        if cluster.is_leader:
+            return await handler(**kwargs)
+        result = await cluster.forward(handler.__name__, kwargs)
+        return JSONResponse(result["body"], status_code=result["status_code"])
+    return endpoint
+
+
+async def _execute_command(name: str, args: dict) -> dict:
+    """Stream owner: run a forwarded request → {"status_code", "body"}."""
+    try:
+        result = await _COMMANDS[name](**args)
+    except HTTPException as e:
+        return {"status_code": e.status_code, "body": {"detail": e.detail}}
+    if isinstance(result, Response):
+        return {"status_code": result.status_code, "body": json.loads(result.body)}
+    return {"status_code": 200, "body": jsonable_encoder(result)}
+
+
 # ── WebSocket endpoint ───────────────────────────────────────
 @app.websocket("/ws/live")
 async def websocket_live(ws: WebSocket):
@@ -260,56 +338,199 @@ async def root():
     return {"service": "HarvesSink", "version": "1.0.0", "status": "running"}
 
 
-@app.get("/api/status")
-async def get_status():
+def _status() -> dict:
     return {
         "data_source": settings.data_source,
         "connected": data_source.is_connected(),
         "llm_enabled": settings.llm_enabled,
+        "clock_mode": clock.mode,
+        "sim_time": clock.now().isoformat(),
+        "source_stats": data_source.stats() if hasattr(data_source, "stats") else None,
+        "checkpoint": checkpointer.stats(),
+        "readings_store": readings_writer.stats(),
+        "nudges": {**nudges.stats(), "precompute": nudge_worker.stats()},
+        "shards": shards.stats() if shards.running else None,
+        "startup": startup.report(),
     }
 
 
+@app.get("/api/status")
+async def get_status():
+    status = _status() if cluster.is_leader else cluster.docs.get("status", {})
+    return {**status, "cluster": cluster.stats()}
+
+
 @app.get("/api/calibration/{device_id}")
 async def get_calibration(device_id: str):
-    baseline = calibration.get_baseline(device_id)
-    return {
-        "calibrated": calibration.is_calibrated(device_id),
-        "progress": calibration.get_progress(device_id),
-        "baseline": baseline.model_dump() if baseline else None,
-    }
+    if shards.running:
+        return await shards.calibration(device_id)
+    return calibration.status(device_id)
 
 
 @app.post("/api/calibration/reset/{device_id}")
+@_leader_only
 async def reset_calibration(device_id: str):
     """Reset calibration for a device — triggers re-calibration from scratch."""
     calibration.reset(device_id)
+    if shards.running:
+        await shards.reset(device_id)
+    cluster.stage("baseline", device_id, None)
     return {"status": "ok", "message": f"Calibration reset for {device_id}. Re-learning baseline..."}
 
 
+def _impact_range(start: Optional[datetime], end: Optional[datetime]) -> tuple[datetime, datetime]:
+    """Default range: the 24 hours up to now (simulated clock)."""
+    end = end or clock.now()
+    return start or end - timedelta(days=1), end
+
+
+@app.get("/api/impact/fleet", response_model=ImpactRange, response_model_exclude_none=True)
+async def get_fleet_impact(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Optional[Literal["hour", "day"]] = None,
+):
+    """Fleet-wide savings in [start, end) (default: last 24h), optionally as an hourly/daily series."""
+    try:
+        return impact.fleet_range(*_impact_range(start, end), bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/impact/zones", response_model=list[ZoneImpact])
+async def get_zone_impacts(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Savings per zone (spatial grid cell), all-time or in [start, end), largest first."""
+    if start is None and end is None:
+        return impact.zones()
+    try:
+        return impact.zones(*_impact_range(start, end))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/impact/zones/{zone}", response_model=ImpactRange, response_model_exclude_none=True)
+async def get_zone_impact(
+    zone: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Optional[Literal["hour", "day"]] = None,
+):
+    try:
+        return impact.zone_range(zone, *_impact_range(start, end), bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/api/impact/{device_id}")
 async def get_impact(device_id: str):
     return impact.get(device_id)
 
 
+@app.get("/api/impact/{device_id}/range", response_model=ImpactRange, response_model_exclude_none=True)
+async def get_impact_range(
+    device_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Optional[Literal["hour", "day"]] = None,
+):
+    """One device's savings in [start, end) (default: last 24h), optionally as an hourly/daily series."""
+    try:
+        return impact.device_range(device_id, *_impact_range(start, end), bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _parse_bbox(bbox: Optional[str]) -> Optional[list[BBox]]:
+    """
+    Parse Leaflet's toBBoxString() format: 'west,south,east,north'.
+    Coordinates are clamped to the map; a box crossing the antimeridian
+    (west > east) comes back as its two halves.
+    """
+    if not bbox:
+        return None
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'west,south,east,north'")
+    if not all(math.isfinite(v) for v in (west, south, east, north)) or south > north:
+        raise HTTPException(status_code=400, detail="bbox must be finite numbers with south <= north")
+    west, east = (min(max(v, -180.0), 180.0) for v in (west, east))
+    south, north = (min(max(v, -90.0), 90.0) for v in (south, north))
+    if west > east:
+        return [(west, south, 180.0, north), (-180.0, south, east, north)]
+    return [(west, south, east, north)]
+
+
 @app.get("/api/municipal/nodes", response_model=list[NodeSummary])
-async def get_municipal_nodes():
-    return get_all_node_summaries()
+async def get_municipal_nodes(request: Request, bbox: Optional[str] = None,
+                              since: Optional[str] = Query(None, max_length=64, pattern=r"^[0-9a-f-]*[0-9]$")):
+    """
+    Node summaries for the map. Without a bbox the response comes from the
+    shared versioned snapshot: supports If-None-Match (304) and, with
+    ?since=<version token from a previous response>, returns
+    {"version", "full", "nodes"} with changed nodes only ("full": true when
+    the token came from another process).
+    """
+    if bbox:
+        # Rows already match NodeSummary — skip per-node model validation
+        return JSONResponse([row for box in _parse_bbox(bbox) for row in municipal.rows(box)])
+
+    snap = snapshots.current()
+    etag = snap.etag if since is None else f'{snap.etag[:-1]}-since{since}"'
+    headers = {"ETag": etag, "X-Snapshot-Version": snap.token}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    body = snap.body if since is None else snap.diff(since)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/municipal/clusters", response_model=list[NodeCluster])
+async def get_municipal_clusters(zoom: int = Query(12, ge=0, le=22), bbox: Optional[str] = None):
+    """Zoom-level node clusters (count, worst quality, mean readings) inside the visible map area."""
+    boxes = _parse_bbox(bbox) or [None]
+    return JSONResponse([c for box in boxes for c in municipal.clusters(zoom, box)])
+
+
+@app.get("/api/municipal/crises", response_model=list[CrisisEvent])
+async def get_municipal_crises(include_resolved: bool = False):
+    """Active neighbourhood crisis events (optionally followed by recently resolved ones)."""
+    if not cluster.is_leader:
+        doc = cluster.docs.get("crises", {"active": [], "resolved": []})
+        return doc["active"] + (doc["resolved"] if include_resolved else [])
+    events = crisis.active()
+    if include_resolved:
+        events += crisis.recent_resolved()
+    return events
+
+
+@app.get("/api/municipal/forecast", response_model=ResourceForecast)
+async def get_municipal_forecast(
+    adoption: float = Query(0.1, ge=0.0, le=1.0),
+    households: int = Query(0, ge=0, le=50_000_000),
+    draws: int = Query(0, ge=0, le=50_000),
+):
+    """City-wide demand reduction at an adoption rate (Monte-Carlo percentile bands)."""
+    return forecaster.forecast(adoption, households, draws)
 
 
 @app.get("/api/nudge/{device_id}", response_model=SustainabilityNudge)
 async def get_nudge(device_id: str):
-    reading = _last_readings.get(device_id) or SensorReading(
+    """Latest nudge precomputed by the background worker; rule-based until it has one."""
+    nudge = nudge_worker.latest(device_id)
+    if nudge is not None:
+        return nudge
+    reading = _last_readings.get(device_id) or Reading(
         device_id=device_id, ph=7.2, tds=300, turbidity=3.0,
     )
-    nudge = await generate_nudge(reading)
-    return nudge or SustainabilityNudge(message="No tip available.")
+    return _fallback_nudge(reading)
 
 
 @app.post("/api/scenario/{scenario_name}")
+@_leader_only
 async def set_scenario(scenario_name: str):
     """Switch the simulator to a named scenario (dishwashing, contamination, etc.)."""
-    from app.sources.simulator import MockSTM32, SCENARIOS
-    if isinstance(data_source, MockSTM32):
+    from app.sources.simulator import SCENARIOS
+    if hasattr(data_source, "set_scenario"):
         if scenario_name in SCENARIOS:
             data_source.set_scenario(scenario_name)
             return {"status": "ok", "scenario": scenario_name}
@@ -321,28 +542,219 @@ async def set_scenario(scenario_name: str):
 async def get_history(device_id: str, limit: int = Query(100, le=1000)):
     """Get recent readings for a device from JSON store."""
     rows = load_readings(device_id, limit)
+    if settings.packet_encoder == "template":
+        return Response(dumps(rows), media_type="application/json")
     return rows
 
 
-# ── Kill-Switch (Reverse Handshake) ──────────────────────────
-_kill_switch_forced = False  # manual override flag
-_guard_enabled = True  # Quad-Guard toggle (can be disabled from UI)
+# ── Bulk ingest ──────────────────────────────────────────────
+class _IngestRun:
+    """
+    One upload: every batch is validated first (limits included), then all
+    of them run through the pipeline as one unit — if any batch fails, the
+    touched devices are rolled back and nothing is checkpointed.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.offset = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors: list[dict] = []
+        self.decisions = dict.fromkeys(DECISIONS, 0)
+        self.anomalies = 0
+        self.kill_switch = 0
+        self.rows: list[dict] = []
+        self.baselines: dict[str, CalibrationBaseline] = {}
+        self.latest: dict[str, tuple] = {}
+        self.devices: set[str] = set()
+
+    def validate(self, records: list):
+        if self.offset + len(records) > settings.ingest_max_readings:
+            raise HTTPException(status_code=413, detail=f"More than {settings.ingest_max_readings} readings")
+        batch = validate(records, offset=self.offset)
+        self.offset += len(records)
+        self.accepted += len(batch)
+        self.devices.update(batch.device_ids)
+        self.rejected += batch.rejected
+        self.errors.extend(batch.errors[:MAX_ERRORS - len(self.errors)])
+        if len(batch):
+            self.batches.append(batch)
+
+    async def apply(self):
+        """Run the validated batches; on any failure restore the touched devices and re-raise."""
+        async with checkpointer.hold():
+            if shards.running:
+                undo = await shards.snapshot_devices(self.devices)
+            else:
+                undo = pipeline.snapshot_devices(self.devices)
+            try:
+                for batch in self.batches:
+                    if shards.running:
+                        for result in await shards.process_batch(
+                            batch, pipeline.kill_switch_forced, pipeline.guard_enabled, keep_last=MAX_READINGS,
+                        ):
+                            self.add(result)
+                    else:
+                        self.add(pipeline.process_batch(batch, keep_last=MAX_READINGS))
+                    await asyncio.sleep(0)    # let the live stream run between batches
+            except BaseException:
+                # Live readings of these devices that arrived meanwhile are rolled back with it
+                if shards.running:
+                    await shards.restore_devices(undo)
+                else:
+                    pipeline.restore_devices(undo)
+                raise
+
+    def add(self, result: BatchResult):
+        for decision, n in result.decisions.items():
+            self.decisions[decision] += n
+        self.anomalies += result.anomalies
+        self.kill_switch += result.kill_switch
+        self.rows.extend(result.rows)
+        for bl in result.baselines:
+            self.baselines[bl.device_id] = bl
+        self.latest.update(result.latest)
+
+
+@app.post("/api/ingest")
+async def bulk_ingest(request: Request):
+    """
+    Backfill buffered readings from an offline gateway. Body is NDJSON
+    (one SensorReading object per line) or a JSON array. NDJSON is parsed
+    while it streams in, ingest_batch_size records at a time; each batch
+    is validated as columns and run through the vectorized pipeline
+    (calibration → inference → Quad-Guard → valve → impact) in timestamp
+    order per device. Invalid records are skipped and reported by index.
+    Nothing touches device state until the whole body is read and within
+    limits; a failure part-way rolls the touched devices back. Accepted
+    readings are written to the store in one atomic write at the end.
+    On a follower worker the body is spooled to disk and ingested by the stream owner.
+    """
+    if cluster.is_leader:
+        return await _ingest(request.stream())
+    path = await _spool(request.stream())
+    result = await cluster.forward("_ingest_spooled", {"path": path}, settings.cluster_ingest_timeout_s)
+    return JSONResponse(result["body"], status_code=result["status_code"])
+
+
+async def _spool(chunks) -> str:
+    """Write a request body to DATA_DIR/spool for the stream owner to read."""
+    os.makedirs(os.path.join(DATA_DIR, "spool"), exist_ok=True)
+    path = os.path.join(DATA_DIR, "spool", f"ingest-{os.getpid()}-{time.time_ns()}.body")
+    size = 0
+    with open(path, "wb") as f:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > settings.ingest_max_bytes:
+                f.close()
+                os.remove(path)
+                raise HTTPException(status_code=413, detail=f"Body larger than {settings.ingest_max_bytes} bytes")
+            f.write(chunk)
+    return path
+
+
+async def _ingest_spooled(path: str) -> dict:
+    async def chunks():
+        with open(path, "rb") as f:
+            while chunk := await asyncio.to_thread(f.read, 1 << 20):
+                yield chunk
+    try:
+        return await _ingest(chunks())
+    finally:
+        os.remove(path)
+
+_COMMANDS["_ingest_spooled"] = _ingest_spooled
+
+
+async def _ingest(chunks) -> dict:
+    started = time.perf_counter()
+    run = _IngestRun()
+    pending = bytearray()
+    lines = 0
+    size = 0
+    array_body = None
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > settings.ingest_max_bytes:
+            raise HTTPException(status_code=413, detail=f"Body larger than {settings.ingest_max_bytes} bytes")
+        if array_body is None and not pending.strip() and chunk.strip():
+            array_body = chunk.lstrip().startswith(b"[")
+        pending += chunk
+        if array_body:
+            continue
+        lines += chunk.count(b"\n")
+        if lines >= settings.ingest_batch_size:
+            cut = pending.rfind(b"\n") + 1
+            run.validate(split_records(bytes(pending[:cut])))
+            del pending[:cut]
+            lines = 0
+
+    if array_body:
+        try:
+            records = json.loads(pending)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON array: {e}")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        for i in range(0, len(records), settings.ingest_batch_size):
+            run.validate(records[i:i + settings.ingest_batch_size])
+            await asyncio.sleep(0)
+    elif pending.strip():
+        run.validate(split_records(bytes(pending)))
+
+    # Pipeline — only now that the whole body is accepted
+    await run.apply()
+
+    # Store — one readings write for the whole upload; impact and baselines
+    # of the touched devices go out in one checkpoint before responding
+    if run.rows:
+        readings_writer.add(run.rows)
+        await readings_writer.flush()
+    for bl in run.baselines.values():
+        checkpointer.baseline_completed(bl)
+        if shards.running:
+            calibration.load_baseline(bl)
+    await checkpointer.flush()
+
+    # Dashboards only move forward: a backfill never replaces a newer live reading
+    for device_id, (reading, inference, decision) in run.latest.items():
+        current = _last_readings.get(device_id)
+        if current is None or reading.timestamp >= current.timestamp:
+            _last_readings[device_id] = reading
+            municipal.update(reading, inference, decision)
+    forecaster.decisions.record_many(run.decisions)
 
+    elapsed = time.perf_counter() - started
+    return {
+        "accepted": run.accepted,
+        "rejected": run.rejected,
+        "errors": run.errors,
+        "devices": len(run.devices),
+        "decisions": run.decisions,
+        "anomalies": run.anomalies,
+        "kill_switch": run.kill_switch,
+        "baselines_completed": len(run.baselines),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "readings_per_s": round(run.offset / elapsed) if elapsed > 0 else 0,
+    }
 
+
+# ── Kill-Switch (Reverse Handshake) ──────────────────────────
 @app.post("/api/killswitch/trigger")
+@_leader_only
 async def killswitch_trigger():
     """Manually force Arduino into DRAIN via serial kill-switch (demo button)."""
-    global _kill_switch_forced
-    _kill_switch_forced = True
+    pipeline.kill_switch_forced = True
     await data_source.write("0")
     return {"status": "ok", "message": "Kill-switch ACTIVATED — sent '0' to Arduino. Valve forced to DRAIN."}
 
 
 @app.post("/api/killswitch/release")
+@_leader_only
 async def killswitch_release():
     """Release the manual kill-switch, allow Arduino to resume normal operation."""
-    global _kill_switch_forced
-    _kill_switch_forced = False
+    pipeline.kill_switch_forced = False
     await data_source.write("1")
     return {"status": "ok", "message": "Kill-switch RELEASED — sent '1' to Arduino. Normal operation resumed."}
 
@@ -350,27 +762,94 @@ async def killswitch_release():
 @app.get("/api/killswitch/status")
 async def killswitch_status():
     """Get current kill-switch state."""
-    return {"active": _kill_switch_forced}
+    return {"active": pipeline.kill_switch_forced}
 
 
 # ── Quad-Guard Toggle ────────────────────────────────────────
 @app.post("/api/guard/enable")
+@_leader_only
 async def guard_enable():
     """Enable Quad-Guard anomaly detection."""
-    global _guard_enabled
-    _guard_enabled = True
+    pipeline.guard_enabled = True
     return {"status": "ok", "guard_enabled": True}
 
 
 @app.post("/api/guard/disable")
+@_leader_only
 async def guard_disable():
     """Disable Quad-Guard anomaly detection."""
-    global _guard_enabled
-    _guard_enabled = False
+    pipeline.guard_enabled = False
     return {"status": "ok", "guard_enabled": False}
 
 
 @app.get("/api/guard/status")
 async def guard_status():
     """Get current Quad-Guard state."""
-    return {"guard_enabled": _guard_enabled}
+    return {"guard_enabled": pipeline.guard_enabled}
+
+
+# ── Model management (hot swap + shadow) ─────────────────────
+@app.get("/api/admin/models")
+async def get_models():
+    """Registry versions with their metrics, the serving version, and any load / shadow run in progress."""
+    stats = models.stats() if cluster.is_leader else cluster.docs.get("models", {})
+    return {**stats, "versions": registry.list_versions()}
+
+
+def _schedule_model_load(version: str, coro) -> JSONResponse:
+    if registry.get_version(version) is None:
+        coro.close()
+        raise HTTPException(status_code=404, detail=f"Unknown model version '{version}'")
+    try:
+        models.schedule(coro)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse({"status": "loading", "version": version}, status_code=202)
+
+
+@app.post("/api/admin/models/{version}/activate", status_code=202)
+@_leader_only
+async def activate_model(version: str):
+    """
+    Load and warm up a registry version in the background, then swap it in
+    atomically (no restart: calibration, Quad-Guard state and WebSocket
+    clients are kept). Poll GET /api/admin/models for the outcome.
+    """
+    return _schedule_model_load(version, models.activate(version))
+
+
+@app.post("/api/admin/models/{version}/shadow", status_code=202)
+@_leader_only
+async def shadow_model(version: str, fraction: float = Query(0.1, gt=0.0, le=1.0)):
+    """Run a version in shadow on a sampled fraction of live readings (never affects valve decisions)."""
+    return _schedule_model_load(version, models.start_shadow(version, fraction))
+
+
+@app.delete("/api/admin/models/shadow")
+@_leader_only
+async def stop_shadow_model():
+    """Stop the shadow run and return its final comparison."""
+    return {"stopped": models.stop_shadow()}
+
+
+# ── Pipeline shards (SHARD_WORKERS=N) ────────────────────────
+@app.get("/api/admin/shards")
+async def get_shards():
+    """Pipeline shards: devices, readings and last batch time per process, and the last rebalance."""
+    status = _status() if cluster.is_leader else cluster.docs.get("status", {})
+    if not status.get("shards"):
+        raise HTTPException(status_code=404, detail="Sharding is off (SHARD_WORKERS=0)")
+    return status["shards"]
+
+
+@app.post("/api/admin/shards/resize")
+@_leader_only
+async def resize_shards(workers: int = Query(..., ge=1, le=64)):
+    """
+    Rebalance devices onto `workers` pipeline processes. Only devices the
+    new hash ring places elsewhere move, with their calibration, Quad-Guard
+    and impact state; the live stream waits for the hand-over.
+    """
+    if not shards.running:
+        raise HTTPException(status_code=409, detail="Sharding is off (SHARD_WORKERS=0) — set it and restart")
+    return await shards.resize(workers)
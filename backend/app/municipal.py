@@ -1,65 +1,229 @@
 """
-HarvesSink – Municipal node simulator.
-Generates N virtual nodes spread across a city for the map view.
+HarvesSink – Municipal aggregation engine.
+Keeps the latest reading / inference / valve decision of every reporting
+device in a compact columnar table that backs the municipal map view.
 """
 
-import random
-import math
-from datetime import datetime
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
 
-from app.schemas import SensorReading, NodeSummary
 from app.config import settings
+from app.records import Reading, Inference
+from app.spatial import GridIndex, BBox
+
+
+# Valve decision → map quality (index into QUALITY_LEVELS)
+QUALITY_LEVELS = ("good", "caution", "poor")
+_DECISION_QUALITY = {"harvest": 0, "caution": 1, "drain": 2}
+DECISION_QUALITY = {d: QUALITY_LEVELS[q] for d, q in _DECISION_QUALITY.items()}
+_QUALITY_DECISION = {q: d for d, q in DECISION_QUALITY.items()}
+
+INITIAL_CAPACITY = 1024
+
+
+class MunicipalAggregator:
+    """
+    Column-oriented table with one row per device.
+    Rows are assigned on first sight and updated in place, so a reading
+    costs O(1) and a full snapshot costs O(devices).
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self._index: dict[str, int] = {}
+        self._ids: list[str] = []
+        self._lat = np.zeros(capacity, dtype=np.float64)
+        self._lng = np.zeros(capacity, dtype=np.float64)
+        self._ph = np.zeros(capacity, dtype=np.float64)
+        self._tds = np.zeros(capacity, dtype=np.float64)
+        self._turbidity = np.zeros(capacity, dtype=np.float64)
+        self._bod = np.zeros(capacity, dtype=np.float64)
+        self._cod = np.zeros(capacity, dtype=np.float64)
+        self._quality = np.zeros(capacity, dtype=np.int8)
+        self._row_version = np.zeros(capacity, dtype=np.int64)
+        self.version = 0            # bumped on every update
+        self.grid = GridIndex()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _grow(self):
+        """Double the capacity of every column."""
+        for name in ("_lat", "_lng", "_ph", "_tds", "_turbidity", "_bod", "_cod", "_quality", "_row_version"):
+            col = getattr(self, name)
+            grown = np.zeros(len(col) * 2, dtype=col.dtype)
+            grown[:len(col)] = col
+            setattr(self, name, grown)
+
+    def _row(self, device_id: str) -> int:
+        row = self._index.get(device_id)
+        if row is None:
+            row = len(self._ids)
+            if row >= len(self._lat):
+                self._grow()
+            self._index[device_id] = row
+            self._ids.append(device_id)
+        return row
 
+    def update(self, reading: Reading, inference: Inference, decision: str) -> int:
+        """Store the latest state of a device. Returns its row index."""
+        row = self._row(reading.device_id)
+        self._lat[row] = reading.gps_lat
+        self._lng[row] = reading.gps_lng
+        self._ph[row] = reading.ph
+        self._tds[row] = reading.tds
+        self._turbidity[row] = reading.turbidity
+        self._bod[row] = inference.bod_predicted
+        self._cod[row] = inference.cod_predicted
+        self._quality[row] = quality = _DECISION_QUALITY.get(decision, 0)
+        self.version += 1
+        self._row_version[row] = self.version
+        self.grid.update(
+            reading.device_id, reading.gps_lat, reading.gps_lng, quality,
+            reading.ph, reading.tds, reading.turbidity, inference.bod_predicted,
+        )
+        return row
 
-# ── Delhi NCR bounding box ──────────────────────────────────
-CENTER_LAT, CENTER_LNG = 28.6139, 77.2090
-SPREAD = 0.15  # ~15km radius
+    def rows(self, bbox: Optional[BBox] = None) -> list[dict]:
+        """
+        Plain-dict snapshot in NodeSummary field order — every device,
+        or only those inside a (west, south, east, north) bounding box.
+        """
+        if bbox is None:
+            return self._rows(self._ids, slice(0, len(self._ids)))
+        candidates = self.grid.query(bbox)
+        sel = np.fromiter((self._index[d] for d in candidates), dtype=np.int64, count=len(candidates))
+        # Grid cells overhang the box edges — keep only devices strictly inside
+        west, south, east, north = bbox
+        lat, lng = self._lat[sel], self._lng[sel]
+        sel = sel[(lat >= south) & (lat <= north) & (lng >= west) & (lng <= east)]
+        return self._rows([self._ids[i] for i in sel.tolist()], sel)
 
+    def rows_since(self, version: int) -> list[dict]:
+        """Rows of devices updated after `version` (cluster replication)."""
+        sel = np.nonzero(self._row_version[:len(self._ids)] > version)[0]
+        return self._rows([self._ids[i] for i in sel.tolist()], sel)
 
-def _generate_node_positions(n: int) -> list[dict]:
-    """Generate N random positions in a circle around the center."""
-    rng = random.Random(42)
-    nodes = []
-    for i in range(n):
-        angle = rng.uniform(0, 2 * math.pi)
-        r = rng.uniform(0, SPREAD)
-        nodes.append({
-            "device_id": f"HVS-{i+1:03d}",
-            "lat": round(CENTER_LAT + r * math.sin(angle), 6),
-            "lng": round(CENTER_LNG + r * math.cos(angle), 6),
-        })
-    return nodes
+    def _rows(self, ids: list[str], sel) -> list[dict]:
+        columns = zip(
+            ids,
+            np.round(self._lat[sel], 6).tolist(),
+            np.round(self._lng[sel], 6).tolist(),
+            self._quality[sel].tolist(),
+            np.round(self._ph[sel], 2).tolist(),
+            np.round(self._tds[sel], 1).tolist(),
+            np.round(self._turbidity[sel], 2).tolist(),
+            np.round(self._bod[sel], 2).tolist(),
+            np.round(self._cod[sel], 2).tolist(),
+        )
+        return [
+            {
+                "device_id": device_id,
+                "lat": lat,
+                "lng": lng,
+                "quality": QUALITY_LEVELS[q],
+                "ph": ph,
+                "tds": tds,
+                "turbidity": turb,
+                "bod": bod,
+                "cod": cod,
+            }
+            for device_id, lat, lng, q, ph, tds, turb, bod, cod in columns
+        ]
 
+    def apply_row(self, row: dict):
+        """Replica side of rows_since(): store a row published by the stream owner."""
+        inference = Inference(bod_predicted=row["bod"], cod_predicted=row["cod"])
+        reading = Reading(
+            device_id=row["device_id"], ph=row["ph"], tds=row["tds"], turbidity=row["turbidity"],
+            gps_lat=row["lat"], gps_lng=row["lng"],
+        )
+        self.update(reading, inference, _QUALITY_DECISION[row["quality"]])
 
-# Pre-generate positions (deterministic, uses config value)
-_NODE_POSITIONS = _generate_node_positions(settings.sim_num_nodes)
+    def clusters(self, zoom: int, bbox: Optional[BBox] = None) -> list[dict]:
+        """Server-side map clusters at a zoom level (see GridIndex.clusters)."""
+        return self.grid.clusters(zoom, bbox)
 
+    def row_versions(self) -> np.ndarray:
+        """Copy of the per-device version column (aligned with rows())."""
+        return self._row_version[:len(self._ids)].copy()
 
-def get_all_node_summaries() -> list[NodeSummary]:
+
+# ── Versioned, pre-serialized snapshots ─────────────────────
+# Random per-process token so ETags / versions from a previous run never match
+_EPOCH = os.urandom(4).hex()
+MAX_CACHED_DIFFS = 8            # serialized diffs kept per snapshot (oldest dropped first)
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+@dataclass
+class MunicipalSnapshot:
+    """Serialized node list at one table version, plus cached diffs against it."""
+    version: int
+    body: bytes
+    rows: list[dict]
+    row_versions: np.ndarray
+    _diffs: dict[Optional[int], bytes] = field(default_factory=dict)
+
+    @property
+    def token(self) -> str:
+        """"<process epoch>-<version>" — what clients pass back as ?since=."""
+        return f"{_EPOCH}-{self.version}"
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.token}"'
+
+    def diff(self, since: str) -> bytes:
+        """
+        Nodes that changed after the `since` token, as {"version", "full", "nodes"}.
+        A token from another process (a restart, another cluster worker),
+        from the future or without an epoch yields the full list.
+        """
+        epoch, _, version = since.rpartition("-")
+        base = int(version) if epoch == _EPOCH and version.isdigit() and int(version) <= self.version else None
+        cached = self._diffs.get(base)
+        if cached is None:
+            if base is None:
+                payload = {"version": self.token, "full": True, "nodes": self.rows}
+            else:
+                changed = np.flatnonzero(self.row_versions > base).tolist()
+                payload = {"version": self.token, "full": False, "nodes": [self.rows[i] for i in changed]}
+            if len(self._diffs) >= MAX_CACHED_DIFFS:
+                self._diffs.pop(next(iter(self._diffs)))
+            cached = self._diffs[base] = _dumps(payload)
+        return cached
+
+
+class SnapshotCache:
     """
-    Generate a snapshot of all municipal nodes with randomized
-    but realistic current readings.
+    Rebuilds the municipal snapshot at most once per interval, and only if
+    the table changed — concurrent dashboards share one serialized body.
     """
-    summaries = []
-    for node in _NODE_POSITIONS:
-        ph = round(random.gauss(7.2, 0.8), 2)
-        tds = round(max(50, random.gauss(280, 120)), 1)
-        turb = round(max(0.1, random.expovariate(0.2)), 2)
-
-        if ph < 6.5 or ph > 8.5 or tds > 500 or turb > 10:
-            quality = "poor"
-        elif tds > 350 or turb > 5:
-            quality = "caution"
-        else:
-            quality = "good"
-
-        summaries.append(NodeSummary(
-            device_id=node["device_id"],
-            lat=node["lat"],
-            lng=node["lng"],
-            quality=quality,
-            ph=ph,
-            tds=tds,
-            turbidity=turb,
-        ))
-    return summaries
+
+    def __init__(self, aggregator: MunicipalAggregator, interval_s: Optional[float] = None):
+        self._aggregator = aggregator
+        self._interval_s = settings.municipal_snapshot_interval_s if interval_s is None else interval_s
+        self._snapshot: Optional[MunicipalSnapshot] = None
+        self._built_at = 0.0
+
+    def current(self) -> MunicipalSnapshot:
+        snap = self._snapshot
+        now = time.monotonic()
+        if snap is None or (now - self._built_at >= self._interval_s and snap.version != self._aggregator.version):
+            rows = self._aggregator.rows()
+            snap = self._snapshot = MunicipalSnapshot(
+                version=self._aggregator.version,
+                body=_dumps(rows),
+                rows=rows,
+                row_versions=self._aggregator.row_versions(),
+            )
+            self._built_at = now
+        return snap
@@ -0,0 +1,128 @@
+"""
+HarvesSink – Background nudge precomputation.
+Watches the live stream for activity transitions per device (e.g. clean
+water → a dishwashing signature held for NUDGE_TRANSITION_READINGS
+readings) and generates the nudge right away, at most
+NUDGE_PRECOMPUTE_RATE per second, through NudgeService (so cache and
+coalescing still apply). The latest nudge per device is kept for
+/api/nudge and pushed to /ws/live clients as a "nudge" topic.
+"""
+
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.ai.llm_nudge import NudgeService, classify_activity
+from app.config import settings
+from app.records import Reading
+from app.schemas import SustainabilityNudge
+
+
+class _DeviceActivity:
+    __slots__ = ("activity", "candidate", "streak")
+
+    def __init__(self):
+        self.activity: Optional[str] = None     # settled activity the latest nudge is for
+        self.candidate: Optional[str] = None
+        self.streak = 0
+
+
+class NudgeWorker:
+    """Transition detection on the stream loop; rate-limited generation in the background."""
+
+    def __init__(self, service: NudgeService, publish: Callable[[str], Awaitable[None]]):
+        self.service = service
+        self.publish = publish
+        self._devices: dict[str, _DeviceActivity] = {}
+        self._pending: dict[str, tuple[Reading, float]] = {}   # device → (reading, queued at), oldest first
+        self._latest: dict[str, SustainabilityNudge] = {}
+        self._updated: set[str] = set()            # since take_updated() (cluster replication)
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(settings.nudge_precompute_concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self.transitions = 0
+        self.computed = 0
+        self.failed = 0
+        self.lag_s = 0.0          # transition → nudge published, last one
+
+    def observe(self, reading: Reading):
+        """Stream hook — a dict lookup unless the device's activity just changed."""
+        activity = classify_activity(reading)
+        state = self._devices.get(reading.device_id)
+        if state is None:
+            state = self._devices[reading.device_id] = _DeviceActivity()
+        if activity == state.activity:
+            state.candidate, state.streak = None, 0
+            return
+        if activity == state.candidate:
+            state.streak += 1
+        else:
+            state.candidate, state.streak = activity, 1
+        # First sighting settles at once; later changes must hold for a few readings
+        if state.activity is not None and state.streak < settings.nudge_transition_readings:
+            return
+        state.activity, state.candidate, state.streak = activity, None, 0
+        self.transitions += 1
+        queued = self._pending.get(reading.device_id)
+        self._pending[reading.device_id] = (reading, queued[1] if queued else time.monotonic())
+        self._wake.set()
+
+    def latest(self, device_id: str) -> Optional[SustainabilityNudge]:
+        return self._latest.get(device_id)
+
+    def set_latest(self, device_id: str, nudge: SustainabilityNudge):
+        """Replica side: a nudge generated by the stream owner."""
+        self._latest[device_id] = nudge
+
+    def take_updated(self) -> dict[str, SustainabilityNudge]:
+        updated, self._updated = self._updated, set()
+        return {d: self._latest[d] for d in updated}
+
+    async def run(self):
+        """Background loop: generate pending nudges, oldest transition first, rate-limited."""
+        interval = 1.0 / settings.nudge_precompute_rate
+        while True:
+            try:
+                if not self._pending:
+                    self._wake.clear()
+                    await self._wake.wait()
+                await self._slots.acquire()
+                device_id = next(iter(self._pending))
+                reading, queued_at = self._pending.pop(device_id)
+                task = asyncio.create_task(self._compute(device_id, reading, queued_at))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"Nudge worker error: {e}")
+
+    async def _compute(self, device_id: str, reading: Reading, queued_at: float):
+        try:
+            nudge = await self.service.get(reading)
+            self._latest[device_id] = nudge
+            self._updated.add(device_id)
+            self.computed += 1
+            await self.publish(json.dumps({
+                "topic": "nudge", "device_id": device_id, "activity": classify_activity(reading),
+                "nudge": nudge.model_dump(),
+            }))
+            self.lag_s = time.monotonic() - queued_at
+        except Exception as e:
+            self.failed += 1
+            print(f"Nudge precompute error ({device_id}): {e}")
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "devices": len(self._devices),
+            "transitions": self.transitions,
+            "pending": len(self._pending),
+            "computed": self.computed,
+            "failed": self.failed,
+            "last_lag_s": round(self.lag_s, 3),
+            "rate_per_s": settings.nudge_precompute_rate,
+        }
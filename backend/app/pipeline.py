@@ -0,0 +1,321 @@
+"""
+HarvesSink – Per-reading processing pipeline.
+Calibration → BOD/COD inference → Quad-Guard → valve decision → kill-switch
+→ impact, for one sensor reading at a time. Owns all per-device state so
+the stream loop only deals with I/O (sources, persistence, WebSockets).
+"""
+
+import copy
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+from app.schemas import CalibrationBaseline
+from app.records import Reading, Inference, Packet
+from app.calibration import CalibrationEngine, ValveController
+from app.ai.inference import InferenceEngine
+from app.ai.anomaly import QuadGuardEngine
+from app.impact import ImpactLedger
+from app.ingest import IngestBatch
+
+
+DECISIONS = ("harvest", "caution", "drain")
+
+
+@dataclass
+class PipelineResult:
+    """Everything the stream loop needs to act on after one reading."""
+    packet: Packet
+    inference: Inference
+    decision: str
+    persist: Optional[dict] = None                      # row for the readings store
+    baseline: Optional[CalibrationBaseline] = None      # set when calibration just completed
+    send_kill_switch: bool = False                      # write "0" back to the device
+
+    @property
+    def reading(self) -> Reading:
+        return self.packet.reading
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a bulk-ingested batch (see SensorPipeline.process_batch)."""
+    rows: list[dict] = field(default_factory=list)                   # for the readings store
+    decisions: dict = field(default_factory=lambda: dict.fromkeys(DECISIONS, 0))
+    latest: dict[str, tuple] = field(default_factory=dict)            # device → (reading, inference, decision)
+    baselines: list[CalibrationBaseline] = field(default_factory=list)
+    anomalies: int = 0
+    kill_switch: int = 0           # readings the kill-switch forced to drain (not sent — data is historical)
+
+
+class SensorPipeline:
+    """Runs every stage of the server-side decision chain for a reading."""
+
+    def __init__(self):
+        self.calibration = CalibrationEngine()
+        self.valve = ValveController()
+        self.engine = InferenceEngine()
+        self.quad_guard = QuadGuardEngine()
+        self.impact = ImpactLedger()
+
+        self.guard_enabled = True         # Quad-Guard toggle (can be disabled from UI)
+        self.kill_switch_forced = False   # manual override flag
+
+    def process(self, reading: Reading) -> PipelineResult:
+        # If Arduino is in warmup, skip calibration/inference
+        if reading.device_mode == "warmup":
+            inference = Inference()
+            packet = Packet(
+                reading=reading,
+                inference=inference,
+                valve_decision="drain",
+                calibration_progress=0,
+            )
+            return PipelineResult(packet=packet, inference=inference, decision="drain")
+
+        # Calibration phase (auto-calibrate on first connection)
+        completed = None
+        if not self.calibration.is_calibrated(reading.device_id):
+            reading.device_mode = "calibration"
+            result = self.calibration.feed_sample(reading)
+            if result and result.is_complete:
+                completed = result
+
+        # AI inference (BOD/COD only)
+        inference = self.engine.predict(reading)
+
+        # Quad-Guard anomaly detection (4-tier) — skipped if guard disabled
+        baseline = self.calibration.get_baseline(reading.device_id)
+        if self.guard_enabled:
+            anomaly_verdict = self.quad_guard.evaluate(reading, baseline)
+        else:
+            anomaly_verdict = self.quad_guard.evaluate(reading, None)  # produces all-clear
+            anomaly_verdict.is_anomaly = False
+            anomaly_verdict.severity = "ok"
+
+        # Valve decision (safety caps + baseline)
+        decision = self.valve.decide(reading, baseline)
+
+        # Anomaly override — QuadGuard can force drain/caution (only when guard enabled)
+        if self.guard_enabled and anomaly_verdict.is_anomaly:
+            inference.anomaly_flag = True
+            inference.anomaly_detail = anomaly_verdict.t1_detail or anomaly_verdict.t2_detail or anomaly_verdict.t3_detail or anomaly_verdict.t4_detail
+            if anomaly_verdict.severity == "critical":
+                reading.device_mode = "fault"
+                decision = "drain"
+            elif anomaly_verdict.severity == "warning" and decision == "harvest":
+                decision = "caution"
+
+        # Kill-switch: if XGBoost predicts dangerous BOD/COD
+        # but Arduino is still harvesting, send "0" to force drain
+        kill_switch_active = False
+        send_kill_switch = False
+        if self.kill_switch_forced:
+            # Manual override from demo button
+            kill_switch_active = True
+            decision = "drain"
+            reading.device_mode = "fault"
+        elif (
+            inference.bod_predicted > settings.bod_kill_threshold
+            or inference.cod_predicted > settings.cod_kill_threshold
+        ):
+            if reading.edge_valve == 1:  # Arduino thinks it's safe
+                send_kill_switch = True
+                kill_switch_active = True
+                decision = "drain"
+                reading.device_mode = "fault"
+
+        # Impact tracking
+        if decision == "harvest":
+            self.impact.record_harvest(reading.device_id, reading.timestamp, reading.gps_lat, reading.gps_lng)
+
+        impact_data = self.impact.get(reading.device_id)
+
+        packet = Packet(
+            reading=reading,
+            inference=inference,
+            valve_decision=decision,
+            calibration_progress=self.calibration.get_progress(reading.device_id),
+            liters_saved=round(impact_data["liters_saved"], 1),
+            money_saved=impact_data["money_saved"],
+            lake_impact_score=impact_data["lake_impact_score"],
+            verdict=anomaly_verdict,
+            kill_switch_active=kill_switch_active,
+            guard_enabled=self.guard_enabled,
+        )
+        persist = {
+            "device_id": reading.device_id,
+            "timestamp": reading.timestamp.isoformat(),
+            "ph": reading.ph,
+            "tds": reading.tds,
+            "turbidity": reading.turbidity,
+            "bod": inference.bod_predicted,
+            "cod": inference.cod_predicted,
+            "valve_decision": decision,
+            "anomaly": inference.anomaly_flag,
+        }
+        return PipelineResult(
+            packet=packet,
+            inference=inference,
+            decision=decision,
+            persist=persist,
+            baseline=completed,
+            send_kill_switch=send_kill_switch,
+        )
+
+    def process_batch(self, batch: IngestBatch, keep_last: Optional[int] = None) -> BatchResult:
+        """
+        The same decision chain as process(), vectorized over a batch of
+        buffered readings. Per-device state (calibration, Quad-Guard
+        buffers, impact) advances exactly as if the readings had arrived
+        one by one in timestamp order. Nothing is broadcast.
+        keep_last: only build store rows for each device's newest N readings
+        (older ones would be trimmed by the store anyway).
+        """
+        result = BatchResult()
+        if not len(batch):
+            return result
+        order, devices, starts = batch.grouped()
+        ends = np.append(starts[1:], len(order))
+        ph, tds, turb = batch.ph[order], batch.tds[order], batch.turbidity[order]
+        warmup = batch.warmup[order]
+        live = ~warmup
+        n = len(order)
+
+        # Calibration — feed until complete; the baseline applies from the completing reading on
+        bl_mean = np.full((len(devices), 3), np.nan)
+        bl_std = np.full((len(devices), 3), np.nan)
+        begin = starts.copy()
+        for i, (device_id, s, e) in enumerate(zip(devices, starts.tolist(), ends.tolist())):
+            if not self.calibration.is_calibrated(device_id):
+                rows = s + np.flatnonzero(live[s:e])
+                if not len(rows):
+                    continue
+                used, completed = self.calibration.feed_batch(
+                    device_id, ph[rows].tolist(), tds[rows].tolist(), turb[rows].tolist(),
+                )
+                if completed is None:
+                    continue
+                result.baselines.append(completed)
+                begin[i] = rows[used - 1]
+            bl = self.calibration.get_baseline(device_id)
+            bl_mean[i] = (bl.ph_mean, bl.tds_mean, bl.turbidity_mean)
+            bl_std[i] = (bl.ph_std, bl.tds_std, bl.turbidity_std)
+        row_device = np.repeat(np.arange(len(devices)), ends - starts)
+        mean, std = bl_mean[row_device], bl_std[row_device]
+        before = np.arange(n) < begin[row_device]
+        mean[before] = np.nan
+        std[before] = np.nan
+
+        # Inference + valve decision
+        bod, cod = self.engine.predict_batch(ph, tds, turb)
+        decision = self.valve.decide_batch(ph, tds, turb, mean, std)
+
+        # Quad-Guard (runs on every non-warmup reading, like evaluate())
+        values = np.column_stack((ph, tds, turb))
+        anomaly = np.zeros(n, dtype=bool)
+        if live.all():
+            critical, warning = self.quad_guard.evaluate_batch(devices, starts, values, mean, std)
+        else:
+            keep = np.flatnonzero(live)
+            sub_codes = np.searchsorted(starts, keep, side="right") - 1
+            sub_starts = np.flatnonzero(np.r_[True, sub_codes[1:] != sub_codes[:-1]])
+            sub_devices = [devices[c] for c in sub_codes[sub_starts].tolist()]
+            critical, warning = np.zeros(n, bool), np.zeros(n, bool)
+            critical[keep], warning[keep] = self.quad_guard.evaluate_batch(
+                sub_devices, sub_starts, values[keep], mean[keep], std[keep],
+            )
+        if self.guard_enabled:
+            anomaly = critical | warning
+            decision[critical] = 2
+            decision[warning & (decision == 0)] = 1
+
+        # Kill-switch
+        if self.kill_switch_forced:
+            kill = live.copy()
+        else:
+            kill = live & ((bod > settings.bod_kill_threshold) | (cod > settings.cod_kill_threshold)) & (batch.edge_valve[order] == 1)
+        decision[kill] = 2
+
+        # Warmup readings: no inference, always drain, not persisted
+        decision[warmup] = 2
+        bod[warmup] = 0.0
+        cod[warmup] = 0.0
+        anomaly &= live
+
+        # Impact — one ledger entry per (device, hour) run of harvests, stamped
+        # with the run's last harvest (rows are sorted by device, then time)
+        timestamps = [batch.timestamps[i] for i in order.tolist()]
+        lat, lng = batch.gps_lat[order], batch.gps_lng[order]
+        rows = np.flatnonzero((decision == 0) & live)
+        if len(rows):
+            hours = (batch.epoch_seconds()[order[rows]] // 3600).astype(np.int64)
+            run_device = row_device[rows]
+            ends_at = np.flatnonzero(np.r_[(run_device[1:] != run_device[:-1]) | (hours[1:] != hours[:-1]), True])
+            counts = np.diff(np.r_[-1, ends_at])
+            for r, count in zip(rows[ends_at].tolist(), counts.tolist()):
+                self.impact.record_harvests(
+                    devices[row_device[r]], count, timestamps[r], float(lat[r]), float(lng[r]),
+                )
+
+        # Outputs
+        codes = np.bincount(decision[live], minlength=3).tolist()
+        result.decisions = dict(zip(DECISIONS, codes))
+        result.anomalies = int(anomaly.sum())
+        result.kill_switch = int(kill.sum())
+        sorted_ids = [batch.device_ids[i] for i in order.tolist()]
+        names = [DECISIONS[c] for c in decision.tolist()]
+        persist = live
+        if keep_last is not None:
+            from_end = np.repeat(ends, ends - starts) - np.arange(n)
+            persist = live & (from_end <= keep_last)
+        result.rows = [
+            {
+                "device_id": d, "timestamp": t.isoformat(), "ph": p, "tds": td, "turbidity": tb,
+                "bod": b, "cod": c, "valve_decision": v, "anomaly": a,
+            }
+            for d, t, p, td, tb, b, c, v, a, ok in zip(
+                sorted_ids, timestamps, ph.tolist(), tds.tolist(), turb.tolist(),
+                bod.tolist(), cod.tolist(), names, anomaly.tolist(), persist.tolist(),
+            )
+            if ok
+        ]
+        for device_id, e in zip(devices, (ends - 1).tolist()):
+            if warmup[e]:
+                continue
+            reading = Reading(
+                device_id=device_id, timestamp=timestamps[e], ph=float(ph[e]), tds=float(tds[e]),
+                turbidity=float(turb[e]), gps_lat=float(lat[e]), gps_lng=float(lng[e]),
+            )
+            inference = Inference(
+                bod_predicted=float(bod[e]), cod_predicted=float(cod[e]), anomaly_flag=bool(anomaly[e]),
+            )
+            result.latest[device_id] = (reading, inference, names[e])
+        return result
+
+    # ── Rollback (bulk ingest) ──────────────────────────
+    def snapshot_devices(self, device_ids) -> dict[str, dict]:
+        """Calibration, Quad-Guard and impact state of these devices, copied — restore_devices() puts it back."""
+        with_impact = set(self.impact.device_ids())
+        return {
+            device_id: copy.deepcopy({
+                "calibration": self.calibration.export_device(device_id),
+                "guard": self.quad_guard.export_device(device_id),
+                "impact": self.impact.snapshot(device_id) if device_id in with_impact else None,
+            })
+            for device_id in device_ids
+        }
+
+    def restore_devices(self, states: dict[str, dict]):
+        """Undo everything since snapshot_devices(): devices it didn't know are forgotten again."""
+        for device_id, state in states.items():
+            self.calibration.import_device(device_id, state["calibration"] or {})
+            self.quad_guard.import_device(device_id, state["guard"])
+            if state["impact"]:
+                self.impact.load(device_id, state["impact"])
+            else:
+                self.impact.remove(device_id)
+        self.impact.mark_dirty(d for d, state in states.items() if state["impact"])
@@ -0,0 +1,118 @@
+"""
+HarvesSink – Internal records for the per-reading hot path.
+Slotted dataclasses with the same field names as the pydantic schemas but
+no validation, so a reading costs one small object instead of a validated
+model per stage. Validation happens once at the trust boundaries — serial
+and network ingest parse into SensorReading and convert with
+Reading.from_model(); REST responses keep their pydantic response models.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from pydantic_core import to_json
+
+from app.schemas import SensorReading
+
+if TYPE_CHECKING:
+    from app.ai.anomaly import AnomalyVerdict
+
+
+@dataclass(slots=True)
+class Reading:
+    """Trusted sensor reading (see SensorReading for field meanings)."""
+    device_id: str = "HVS-001"
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+    ph: float = 7.0
+    tds: float = 0.0
+    turbidity: float = 0.0
+    gps_lat: float = 28.6139
+    gps_lng: float = 77.2090
+    valve_position: int = 1
+    device_mode: str = "active"
+    edge_state: int = 2
+    edge_progress: int = 100
+    edge_base_tds: float = 0.0
+    edge_nudge: bool = True
+    edge_valve: int = 1
+    edge_confidence: int = 0
+
+    @classmethod
+    def from_model(cls, model: SensorReading) -> "Reading":
+        return cls(**model.__dict__)
+
+    def to_model(self) -> SensorReading:
+        return SensorReading.model_construct(**self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+@dataclass(slots=True)
+class Inference:
+    """Trusted InferenceResult."""
+    bod_predicted: float = 0.0
+    cod_predicted: float = 0.0
+    anomaly_flag: bool = False
+    anomaly_detail: str = ""
+
+
+@dataclass(slots=True)
+class Packet:
+    """
+    Trusted LivePacket. to_json() emits the same document as
+    LivePacket.model_dump_json() without building the nested models
+    (app/encoder.py has the faster templated encoder).
+    """
+    reading: Reading
+    inference: Inference
+    valve_decision: str = "harvest"
+    calibration_progress: float = 0.0
+    liters_saved: float = 0.0
+    money_saved: float = 0.0
+    lake_impact_score: float = 0.0
+    verdict: Optional["AnomalyVerdict"] = None     # → anomaly_tiers
+    kill_switch_active: bool = False
+    guard_enabled: bool = True
+
+    def to_dict(self) -> dict:
+        r, i = self.reading, self.inference
+        return {
+            "reading": {
+                "device_id": r.device_id,
+                "timestamp": r.timestamp.isoformat(),
+                "ph": r.ph,
+                "tds": r.tds,
+                "turbidity": r.turbidity,
+                "gps_lat": r.gps_lat,
+                "gps_lng": r.gps_lng,
+                "valve_position": r.valve_position,
+                "device_mode": r.device_mode,
+                "edge_state": r.edge_state,
+                "edge_progress": r.edge_progress,
+                "edge_base_tds": r.edge_base_tds,
+                "edge_nudge": r.edge_nudge,
+                "edge_valve": r.edge_valve,
+                "edge_confidence": r.edge_confidence,
+            },
+            "inference": {
+                "bod_predicted": i.bod_predicted,
+                "cod_predicted": i.cod_predicted,
+                "anomaly_flag": i.anomaly_flag,
+                "anomaly_detail": i.anomaly_detail,
+            },
+            "valve_decision": self.valve_decision,
+            "calibration_progress": float(self.calibration_progress),
+            "liters_saved": self.liters_saved,
+            "money_saved": self.money_saved,
+            "lake_impact_score": self.lake_impact_score,
+            "anomaly_tiers": self.verdict.to_dict() if self.verdict is not None else {},
+            "kill_switch_active": self.kill_switch_active,
+            "guard_enabled": self.guard_enabled,
+        }
+
+    def to_json(self) -> str:
+        # pydantic-core's serializer without a model around it: same output
+        # (NaN/inf → null, like model_dump_json), several times faster than the stdlib encoder
+        return to_json(self.to_dict(), inf_nan_mode="null").decode()
@@ -78,6 +78,101 @@ class NodeSummary(BaseModel):
     cod: float = 0.0
 
 
+# ── Municipal map cluster (zoom-level aggregate) ────────────
+class NodeCluster(BaseModel):
+    lat: float                   # centroid of member devices
+    lng: float
+    count: int
+    quality: Literal["good", "caution", "poor"] = "good"   # worst member
+    ph: float                    # member means
+    tds: float
+    turbidity: float
+    bod: float = 0.0
+
+
+# ── Neighbourhood crisis (contiguous hot grid cells) ───────
+class CrisisEvent(BaseModel):
+    event_id: int
+    status: Literal["active", "resolved"] = "active"
+    started_at: datetime
+    updated_at: datetime
+    lat: float                   # centre of the affected area
+    lng: float
+    bbox: list[float] = []       # west, south, east, north
+    cells: int = 0               # hot grid cells in the cluster
+    device_count: int = 0        # devices with poor/anomalous readings in the window
+    readings: int = 0            # readings in the window
+    poor: int = 0
+    caution: int = 0
+    anomaly: int = 0
+
+
+# ── City-wide resource forecast (Monte-Carlo bands) ─────────
+class ForecastBand(BaseModel):
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+
+
+class ForecastCurve(BaseModel):
+    adoption_rate: list[float]
+    demand_reduction_pct: dict[str, list[float]]   # percentile → value per adoption rate
+
+
+class ResourceForecast(BaseModel):
+    adoption_rate: float
+    households: int
+    draws: int
+    harvest_ratio: float                 # observed share of "harvest" decisions
+    adopting_households: ForecastBand
+    liters_saved_per_day: ForecastBand
+    demand_reduction_pct: ForecastBand
+    money_saved_per_day: ForecastBand    # ₹ at tanker price
+    curve: ForecastCurve
+
+
+# ── Impact ledger (time-ranged savings) ─────────────────────
+class ImpactBucket(BaseModel):
+    start: datetime              # bucket start (UTC hour or day)
+    harvests: int
+    liters_saved: float
+    money_saved: float           # ₹ at tanker price
+    lake_impact_score: float
+
+
+class ImpactTotals(BaseModel):
+    harvests: int
+    liters_saved: float
+    money_saved: float
+    lake_impact_score: float
+
+
+class ImpactRange(BaseModel):
+    device_id: Optional[str] = None      # set for device queries
+    zone: Optional[str] = None           # set for zone queries
+    devices: Optional[int] = None        # fleet / zone member count
+    start: datetime                      # resolved range [start, end)
+    end: datetime
+    resolution: Literal["hour", "day"]
+    harvests: int
+    liters_saved: float
+    money_saved: float
+    lake_impact_score: float
+    all_time: ImpactTotals
+    series: Optional[list[ImpactBucket]] = None
+
+
+class ZoneImpact(BaseModel):
+    zone: str                    # "zoom:x:y" spatial grid cell
+    devices: int
+    harvests: int
+    liters_saved: float
+    money_saved: float
+    lake_impact_score: float
+
+
 # ── LLM nudge (optional feature) ───────────────────────────
 class SustainabilityNudge(BaseModel):
     message: str = ""
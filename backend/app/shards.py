@@ -0,0 +1,513 @@
+"""
+HarvesSink – Sharded pipeline: devices spread over worker processes.
+With SHARD_WORKERS=N the stream owner keeps the I/O side (data source,
+WebSockets, store, municipal map, crisis windows, nudges) and hands every
+batch to N pipeline processes, split by a consistent hash of device_id.
+Each process owns its devices' calibration, Quad-Guard and impact state
+and encodes their /ws/live packets, so the per-reading work runs on N cores.
+
+The hash ring has SHARD_VNODES points per shard: growing from N to N+1
+shards moves only ~1/(N+1) of the devices, each with its calibration
+samples, Quad-Guard window and impact buckets. The stream owner keeps an
+aggregate copy of every device's impact (pulled from the shards before
+each checkpoint), so fleet / zone / device impact views and the municipal
+map answer across all shards from one process.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from app.ai import registry
+from app.ai.inference import active_artifact, prepare_model
+from app.calibration import CalibrationEngine
+from app.clock import clock
+from app.config import settings
+from app.encoder import encode_packet
+from app.impact import ImpactLedger
+from app.ingest import IngestBatch
+from app.pipeline import BatchResult, SensorPipeline
+from app.records import Reading, Inference
+from app.schemas import CalibrationBaseline
+
+
+def _point(key: str) -> int:
+    # Stable across processes and restarts (unlike hash())
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hashing of device ids onto shards 0..count-1, `vnodes` ring points per shard."""
+
+    def __init__(self, count: int, vnodes: int):
+        self.count = count
+        self.vnodes = vnodes
+        points = sorted((_point(f"shard-{s}#{v}"), s) for s in range(count) for v in range(vnodes))
+        self._points = [p for p, _ in points]
+        self._shards = [s for _, s in points]
+
+    def owner(self, device_id: str) -> int:
+        i = bisect.bisect(self._points, _point(device_id))
+        return self._shards[i % len(self._shards)]
+
+
+@dataclass(slots=True)
+class ShardResult:
+    """What the stream loop needs from a shard for one reading (same names as PipelineResult)."""
+    text: str                         # encoded /ws/live packet
+    inference: Inference
+    decision: str
+    device_mode: str                  # the pipeline may move the reading to calibration / fault
+    persist: Optional[dict] = None
+    baseline: Optional[CalibrationBaseline] = None
+    send_kill_switch: bool = False
+
+
+# ── Pipeline process ─────────────────────────────────────────
+class _Shard:
+    """Runs inside a pipeline process: a SensorPipeline for the devices the ring gives it."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.pipeline = SensorPipeline()       # formula fallback until load_active swaps the model in
+
+    def _flags(self, kill_switch_forced: bool, guard_enabled: bool):
+        self.pipeline.kill_switch_forced = kill_switch_forced
+        self.pipeline.guard_enabled = guard_enabled
+
+    def process(self, readings: list[Reading], kill_switch_forced: bool, guard_enabled: bool) -> list[Optional[ShardResult]]:
+        self._flags(kill_switch_forced, guard_enabled)
+        out = []
+        for reading in readings:
+            try:
+                result = self.pipeline.process(reading)
+            except Exception as e:
+                print(f"Pipeline error ({reading.device_id}): {e}")
+                out.append(None)
+                continue
+            out.append(ShardResult(
+                text=encode_packet(result.packet), inference=result.inference, decision=result.decision,
+                device_mode=reading.device_mode, persist=result.persist, baseline=result.baseline,
+                send_kill_switch=result.send_kill_switch,
+            ))
+        return out
+
+    def process_batch(self, batch: IngestBatch, kill_switch_forced: bool, guard_enabled: bool,
+                      keep_last: Optional[int]):
+        self._flags(kill_switch_forced, guard_enabled)
+        return self.pipeline.process_batch(batch, keep_last=keep_last)
+
+    def collect(self) -> dict[str, dict]:
+        impact = self.pipeline.impact
+        return {d: impact.snapshot(d) for d in impact.take_dirty()}
+
+    def calibration(self, device_id: str) -> dict:
+        return self.pipeline.calibration.status(device_id)
+
+    def reset(self, device_id: str):
+        self.pipeline.calibration.reset(device_id)
+
+    def export_devices(self, count: int, vnodes: int) -> dict[str, dict]:
+        """Hand over (and forget) every device a ring of `count` shards places elsewhere."""
+        ring = HashRing(count, vnodes)
+        calibration, guard, impact = self.pipeline.calibration, self.pipeline.quad_guard, self.pipeline.impact
+        with_impact = set(impact.device_ids())
+        devices = with_impact.union(calibration.device_ids(), guard.device_ids())
+        states = {}
+        for device_id in devices:
+            if ring.owner(device_id) == self.index:
+                continue
+            states[device_id] = {
+                "calibration": calibration.export_device(device_id),
+                "guard": guard.export_device(device_id),
+                "impact": impact.snapshot(device_id) if device_id in with_impact else None,
+            }
+            calibration.reset(device_id)
+            guard.reset(device_id)
+            impact.remove(device_id)
+        return states
+
+    def import_devices(self, states: dict[str, dict]):
+        calibration, guard, impact = self.pipeline.calibration, self.pipeline.quad_guard, self.pipeline.impact
+        for device_id, state in states.items():
+            if state.get("calibration"):
+                calibration.import_device(device_id, state["calibration"])
+            if state.get("guard"):
+                guard.import_device(device_id, state["guard"])
+            if state.get("impact"):
+                impact.load(device_id, state["impact"])
+
+    def snapshot_devices(self, device_ids: list[str]) -> dict[str, dict]:
+        return self.pipeline.snapshot_devices(device_ids)
+
+    def restore_devices(self, states: dict[str, dict]):
+        self.pipeline.restore_devices(states)
+
+    def swap_model(self, version: str) -> str:
+        model, surrogate = prepare_model(registry.artifact_path(version))
+        self.pipeline.engine.swap(model, version, surrogate)
+        return version
+
+    def load_active(self) -> Optional[str]:
+        """Startup load of the active model — skipped if a swap_model got there first."""
+        artifact = active_artifact()
+        if artifact is not None:
+            path, version = artifact
+            model, surrogate = prepare_model(path)
+            if self.pipeline.engine.model is None:
+                self.pipeline.engine.swap(model, version, surrogate)
+        return self.pipeline.engine.model_version
+
+    def ping(self) -> Optional[str]:
+        return self.pipeline.engine.model_version
+
+
+def _serve(conn, index: int):
+    """Pipeline process main loop: (call id, op, args, owner's clock) in, (call id, ok, value) out."""
+    shard = _Shard(index)
+    send_lock = threading.Lock()
+
+    def run(call_id: int, op: str, args: tuple):
+        try:
+            reply = (call_id, True, getattr(shard, op)(*args))
+        except Exception as e:
+            reply = (call_id, False, f"{type(e).__name__}: {e}")
+        with send_lock:
+            conn.send(reply)
+
+    while True:
+        try:
+            call_id, op, args, now = conn.recv()
+        except (EOFError, OSError):
+            break
+        if op == "stop":
+            break
+        clock.follow(now)    # impact retention and future-dated harvests are judged by the owner's time
+        if op in ("swap_model", "load_active"):
+            # Loading + warm-up takes a while — keep processing batches meanwhile
+            threading.Thread(target=run, args=(call_id, op, args), daemon=True).start()
+            continue
+        run(call_id, op, args)
+
+
+# ── Stream-owner side ────────────────────────────────────────
+class ShardError(RuntimeError):
+    pass
+
+
+class _Worker:
+    """One pipeline process seen from the stream owner: calls over a pipe, replies read by a thread."""
+
+    def __init__(self, ctx, index: int):
+        self.index = index
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_serve, args=(child, index), name=f"harvessink-shard-{index}", daemon=True)
+        self.process.start()
+        child.close()
+        self.alive = True
+        self.model: Optional[str] = None
+        self.loading: Optional[asyncio.Task] = None
+        self.readings = 0
+        self.last_ms = 0.0
+        self._loop = asyncio.get_running_loop()
+        self._calls: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        threading.Thread(target=self._read, name=f"shard-{index}-reader", daemon=True).start()
+
+    def _read(self):
+        try:
+            while True:
+                try:
+                    call_id, ok, value = self.conn.recv()
+                except (EOFError, OSError):
+                    break
+                self._loop.call_soon_threadsafe(self._resolve, call_id, ok, value)
+            self._loop.call_soon_threadsafe(self._fail_all)
+        except RuntimeError:
+            pass                    # event loop already closed (shutdown)
+
+    def _resolve(self, call_id: int, ok: bool, value: Any):
+        future = self._calls.pop(call_id, None)
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(ShardError(f"shard {self.index}: {value}"))
+
+    def _fail_all(self):
+        self.alive = False
+        calls, self._calls = self._calls, {}
+        for future in calls.values():
+            if not future.done():
+                future.set_exception(ShardError(f"shard {self.index} exited (code {self.process.exitcode})"))
+
+    def _send(self, message: tuple):
+        with self._send_lock:
+            self.conn.send(message)
+
+    async def call(self, op: str, *args) -> Any:
+        if not self.alive:
+            raise ShardError(f"shard {self.index} is not running")
+        call_id = next(self._ids)
+        future = self._loop.create_future()
+        self._calls[call_id] = future
+        try:
+            await asyncio.to_thread(self._send, (call_id, op, args, clock.now()))
+        except (OSError, ValueError) as e:
+            self._calls.pop(call_id, None)
+            raise ShardError(f"shard {self.index}: {e}")
+        return await future
+
+    def stop(self, timeout_s: float = 5.0):
+        if self.loading is not None:
+            self.loading.cancel()
+        try:
+            self._send((0, "stop", (), None))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout_s)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class ShardPool:
+    """
+    The stream owner's pipeline shards. Disabled (SHARD_WORKERS=0, the
+    default) nothing is started and the stream loop runs the in-process
+    SensorPipeline as before.
+    """
+
+    def __init__(self, count: Optional[int] = None):
+        self.count = settings.shard_workers if count is None else count
+        self.enabled = self.count > 0
+        self.vnodes = settings.shard_vnodes
+        self.ring = HashRing(max(self.count, 1), self.vnodes)
+        self.workers: list[_Worker] = []
+        self.restarts = 0
+        self.last_rebalance: Optional[dict] = None
+        self._owners: dict[str, int] = {}          # device → shard, memoized ring lookups
+        self._lock = asyncio.Lock()                # batches vs. rebalancing / restarts
+        self._ctx = multiprocessing.get_context("spawn")
+        # Aggregate replicas kept by the stream owner (seed restarted shards, answer impact views)
+        self._calibration: Optional[CalibrationEngine] = None
+        self._impact: Optional[ImpactLedger] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self.workers)
+
+    def owner(self, device_id: str) -> int:
+        shard = self._owners.get(device_id)
+        if shard is None:
+            shard = self._owners[device_id] = self.ring.owner(device_id)
+        return shard
+
+    def _split(self, device_ids: list[str]) -> dict[int, list[int]]:
+        parts: dict[int, list[int]] = {}
+        for i, device_id in enumerate(device_ids):
+            parts.setdefault(self.owner(device_id), []).append(i)
+        return parts
+
+    # ── Lifecycle ───────────────────────────────────────
+    async def _spawn(self, index: int) -> _Worker:
+        worker = _Worker(self._ctx, index)
+        worker.model = await worker.call("ping")
+        worker.loading = asyncio.create_task(self._load_model(worker))
+        return worker
+
+    @staticmethod
+    async def _load_model(worker: _Worker):
+        """The shard serves the formula fallback until its model is loaded."""
+        try:
+            worker.model = await worker.call("load_active")
+        except ShardError as e:
+            print(f"⚠️  Shard {worker.index} model load failed: {e}")
+
+    async def start(self, calibration: CalibrationEngine, impact: ImpactLedger):
+        """Start the processes and hand each the persisted state of its devices."""
+        self._calibration, self._impact = calibration, impact
+        started = time.perf_counter()
+        self.workers = list(await asyncio.gather(*(self._spawn(i) for i in range(self.count))))
+        seeded = await self._seed(range(self.count))
+        print(f"🧩 {self.count} pipeline shards ready in {time.perf_counter() - started:.1f}s ({seeded} devices)")
+
+    async def _seed(self, shards) -> int:
+        """Baselines and impact from the stream owner's replicas → the shards that own those devices."""
+        shards = set(shards)
+        with_impact = set(self._impact.device_ids())
+        states: dict[int, dict[str, dict]] = {s: {} for s in shards}
+        for device_id in with_impact.union(self._calibration.device_ids()):
+            shard = self.owner(device_id)
+            if shard in shards:
+                states[shard][device_id] = {
+                    "calibration": self._calibration.export_device(device_id),
+                    "impact": self._impact.snapshot(device_id) if device_id in with_impact else None,
+                }
+        await asyncio.gather(*(self.workers[s].call("import_devices", part) for s, part in states.items() if part))
+        return sum(len(part) for part in states.values())
+
+    async def _restart(self, index: int):
+        """A shard died: start a new process and reseed it (impact from the last checkpoint; calibration in progress restarts)."""
+        self.restarts += 1
+        print(f"⚠️  Pipeline shard {index} exited — restarting")
+        self.workers[index] = await self._spawn(index)
+        await self._seed([index])
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    async def resize(self, count: int) -> dict:
+        """
+        Rebalance onto `count` shards: new processes start empty, every shard
+        hands over the devices the new ring places elsewhere, and the next
+        batch is split with the new ring. Batches wait while this runs.
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            before = len(self.workers)
+            self.workers += await asyncio.gather(*(self._spawn(i) for i in range(before, count)))
+            exports = await asyncio.gather(*(w.call("export_devices", count, self.vnodes) for w in self.workers))
+            self.ring = HashRing(count, self.vnodes)
+            self._owners = {}
+            moved: dict[int, dict[str, dict]] = {}
+            for states in exports:
+                for device_id, state in states.items():
+                    moved.setdefault(self.owner(device_id), {})[device_id] = state
+                    if state["impact"]:
+                        # Harvests not yet collected travel with the device — keep the aggregate current
+                        self._impact.load(device_id, state["impact"])
+                        self._impact.mark_dirty([device_id])
+            await asyncio.gather(*(self.workers[s].call("import_devices", part) for s, part in moved.items()))
+            for worker in self.workers[count:]:
+                worker.stop()
+            self.workers = self.workers[:count]
+            self.count = count
+            devices = sum(len(part) for part in moved.values())
+            self.last_rebalance = {
+                "from": before, "to": count, "devices_moved": devices,
+                "ms": round((time.perf_counter() - started) * 1000, 1), "at": time.time(),
+            }
+            print(f"🔀 Pipeline shards {before} → {count}: {devices} devices moved in {self.last_rebalance['ms']:.0f} ms")
+            return self.last_rebalance
+
+    # ── Processing ──────────────────────────────────────
+    async def process(self, readings: list[Reading], kill_switch_forced: bool,
+                      guard_enabled: bool) -> list[tuple[Reading, ShardResult, str]]:
+        """A live batch through the shards → (reading, result, packet text); per-device order is kept."""
+        async with self._lock:
+            for worker in self.workers:
+                if not worker.alive:
+                    await self._restart(worker.index)
+            parts = self._split([r.device_id for r in readings])
+            shards = list(parts)
+            replies = await asyncio.gather(*(
+                self._timed(self.workers[s], [readings[i] for i in parts[s]], kill_switch_forced, guard_enabled)
+                for s in shards
+            ), return_exceptions=True)
+            out = []
+            for shard, reply in zip(shards, replies):
+                if isinstance(reply, BaseException):
+                    print(f"Shard {shard} dropped {len(parts[shard])} readings: {reply}")
+                    continue
+                for i, result in zip(parts[shard], reply):
+                    if result is not None:
+                        reading = readings[i]
+                        reading.device_mode = result.device_mode
+                        out.append((reading, result, result.text))
+            return out
+
+    async def _timed(self, worker: _Worker, readings: list[Reading], kill_switch_forced: bool, guard_enabled: bool):
+        started = time.perf_counter()
+        results = await worker.call("process", readings, kill_switch_forced, guard_enabled)
+        worker.readings += len(readings)
+        worker.last_ms = round((time.perf_counter() - started) * 1000, 2)
+        return results
+
+    async def process_batch(self, batch: IngestBatch, kill_switch_forced: bool, guard_enabled: bool,
+                            keep_last: Optional[int] = None) -> list[BatchResult]:
+        """A bulk-ingest batch, each shard's rows processed in parallel → one BatchResult per shard."""
+        async with self._lock:
+            parts = self._split(batch.device_ids)
+            results = await asyncio.gather(*(
+                self.workers[s].call("process_batch", batch.take(rows), kill_switch_forced, guard_enabled, keep_last)
+                for s, rows in parts.items()
+            ))
+            for s, rows in parts.items():
+                self.workers[s].readings += len(rows)
+            return results
+
+    async def snapshot_devices(self, device_ids) -> dict[str, dict]:
+        """State of these devices from the shards that own them (see SensorPipeline.snapshot_devices)."""
+        parts: dict[int, list[str]] = {}
+        for device_id in device_ids:
+            parts.setdefault(self.owner(device_id), []).append(device_id)
+        states = {}
+        for reply in await asyncio.gather(*(self.workers[s].call("snapshot_devices", ids) for s, ids in parts.items())):
+            states.update(reply)
+        return states
+
+    async def restore_devices(self, states: dict[str, dict]):
+        """
+        Roll devices back on their current owners. A shard that died is
+        skipped: it is restarted from the last checkpoint, which the
+        rolled-back change never reached.
+        """
+        parts: dict[int, dict] = {}
+        for device_id, state in states.items():
+            parts.setdefault(self.owner(device_id), {})[device_id] = state
+        await asyncio.gather(*(
+            self.workers[s].call("restore_devices", part) for s, part in parts.items() if self.workers[s].alive
+        ), return_exceptions=True)
+
+    # ── Per-device requests ─────────────────────────────
+    async def collect(self):
+        """Checkpointer hook: impact of devices harvested since the last call → the aggregate ledger."""
+        if not self.running:
+            return
+        replies = await asyncio.gather(*(w.call("collect") for w in self.workers), return_exceptions=True)
+        for reply in replies:
+            if isinstance(reply, BaseException):
+                continue
+            for device_id, snapshot in reply.items():
+                self._impact.load(device_id, snapshot)
+            self._impact.mark_dirty(reply)
+
+    async def calibration(self, device_id: str) -> dict:
+        return await self.workers[self.owner(device_id)].call("calibration", device_id)
+
+    async def reset(self, device_id: str):
+        await self.workers[self.owner(device_id)].call("reset", device_id)
+
+    async def swap_model(self, version: str):
+        """ModelManager hook: every shard loads and swaps in the version the stream owner just activated."""
+        if self.running:
+            for worker, model in zip(self.workers, await asyncio.gather(*(w.call("swap_model", version) for w in self.workers))):
+                worker.model = model
+
+    def stats(self) -> dict:
+        devices = Counter(self._owners.values())
+        return {
+            "workers": self.count,
+            "vnodes": self.vnodes,
+            "restarts": self.restarts,
+            "last_rebalance": self.last_rebalance,
+            "shards": [
+                {
+                    "shard": w.index, "pid": w.process.pid, "alive": w.alive, "model": w.model, "devices": devices[w.index],
+                    "readings": w.readings, "last_batch_ms": w.last_ms,
+                }
+                for w in self.workers
+            ],
+        }
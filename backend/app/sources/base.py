@@ -4,7 +4,9 @@ Every data source (simulator, serial, websocket) implements this.
 """
 
 from abc import ABC, abstractmethod
-from app.schemas import SensorReading
+from typing import Optional
+
+from app.records import Reading
 
 
 class DataSource(ABC):
@@ -16,12 +18,22 @@ class DataSource(ABC):
         ...
 
     @abstractmethod
-    async def read(self) -> SensorReading:
+    async def read(self) -> Reading:
         """Read a single sensor packet. Blocks until data is available."""
         ...
 
-    async def write(self, data: str) -> None:
-        """Send data back to the device (e.g. kill-switch). No-op by default."""
+    async def read_batch(self) -> list[Reading]:
+        """
+        Read whatever is available as a batch (at least one packet).
+        Multi-device sources override this; the default wraps read().
+        """
+        return [await self.read()]
+
+    async def write(self, data: str, device_id: Optional[str] = None) -> None:
+        """
+        Send data back to a device (e.g. kill-switch). No-op by default.
+        Sources with a single device ignore device_id.
+        """
         pass
 
     @abstractmethod
@@ -0,0 +1,143 @@
+"""
+HarvesSink – Compact binary telemetry frames (Arduino → backend).
+Negotiated alternative to the JSON contract: the backend sends "B\n" after
+opening the port and firmware that supports it (version_4.ino) switches to
+18-byte frames — ~5× less than a JSON packet, so the same 9600-baud link
+carries a much higher sample rate.
+
+Frame layout (little-endian, as the AVR writes it):
+  offset  size  field
+  0       2     sync        0xA5 0x5A
+  2       1     version     1
+  3       2     seq         uint16, wraps
+  5       2     ph          raw pH × 100 (before the inverted-probe correction)
+  7       2     tds         ppm
+  9       2     turb        raw turbidity units
+  11      2     base_tds    learned baseline TDS
+  13      1     flags       bit0 valve, bit1 nudge, bits2-3 state
+  14      1     progress    0-100
+  15      1     conf        0-3
+  16      2     crc         CRC-16/CCITT-FALSE over bytes 2..15
+"""
+
+import struct
+from binascii import crc_hqx
+from dataclasses import dataclass
+
+SYNC = b"\xa5\x5a"
+VERSION = 1
+FRAME = struct.Struct("<2sBHHHHHBBBH")
+FRAME_SIZE = FRAME.size            # 18
+_CRC_END = FRAME_SIZE - 2
+NEGOTIATE_BINARY = b"B\n"
+NEGOTIATE_JSON = b"J\n"
+
+
+def crc16(data) -> int:
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) — binascii does it in C."""
+    return crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(
+    seq: int, ph: float, tds: float, turb: float, base_tds: float = 0.0,
+    valve: int = 0, nudge: int = 1, state: int = 2, progress: int = 100, conf: int = 0,
+) -> bytes:
+    """Build one frame (used by tests, simulators and the loopback tools)."""
+    flags = (valve & 1) | ((nudge & 1) << 1) | ((state & 3) << 2)
+    body = FRAME.pack(
+        SYNC, VERSION, seq & 0xFFFF,
+        int(round(ph * 100)) & 0xFFFF, int(round(tds)) & 0xFFFF, int(round(turb)) & 0xFFFF,
+        int(round(base_tds)) & 0xFFFF, flags, progress, conf, 0,
+    )
+    return body[:_CRC_END] + struct.pack("<H", crc16(body[2:_CRC_END]))
+
+
+def frame_to_packet(fields: tuple) -> dict:
+    """Decoded frame → the same dict the JSON contract carries."""
+    _, _, _, ph, tds, turb, base_tds, flags, progress, conf, _ = fields
+    return {
+        "ph": ph / 100,
+        "tds": tds,
+        "turb": turb,
+        "valve": flags & 1,
+        "nudge": (flags >> 1) & 1,
+        "state": (flags >> 2) & 3,
+        "progress": progress,
+        "base_tds": base_tds,
+        "conf": conf,
+    }
+
+
+@dataclass
+class FrameStats:
+    frames: int = 0
+    crc_errors: int = 0
+    resyncs: int = 0           # times the decoder had to hunt for the next sync
+    skipped_bytes: int = 0
+    seq_gaps: int = 0          # discontinuities in the sequence number
+    lost_frames: int = 0       # frames missing inside those gaps
+    out_of_order: int = 0      # duplicates / late frames / firmware restarts
+
+
+class FrameDecoder:
+    """
+    Incremental batch decoder. feed() appends a chunk and returns the
+    field tuples of every complete, CRC-valid frame in it; frames are
+    unpacked in place from the buffer via a memoryview (no per-frame copies).
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._last_seq: int | None = None
+        self.stats = FrameStats()
+
+    def feed(self, chunk: bytes) -> list[tuple]:
+        buf = self._buf
+        buf += chunk
+        frames = []
+        stats = self.stats
+        pos = 0
+        end = len(buf)
+        with memoryview(buf) as view:
+            while end - pos >= FRAME_SIZE:
+                if buf[pos] != 0xA5 or buf[pos + 1] != 0x5A:
+                    nxt = buf.find(SYNC, pos + 1)
+                    stats.resyncs += 1
+                    if nxt < 0:
+                        # keep a trailing 0xA5 — it may be the first sync byte
+                        nxt = end - 1 if buf[end - 1] == 0xA5 else end
+                    stats.skipped_bytes += nxt - pos
+                    pos = nxt
+                    continue
+                fields = FRAME.unpack_from(view, pos)
+                if fields[1] != VERSION or fields[-1] != crc16(view[pos + 2:pos + _CRC_END]):
+                    stats.crc_errors += 1
+                    stats.resyncs += 1
+                    stats.skipped_bytes += 1
+                    pos += 1                # false sync inside payload — hunt again
+                    continue
+                self._track_seq(fields[2])
+                frames.append(fields)
+                pos += FRAME_SIZE
+        del buf[:pos]
+        stats.frames += len(frames)
+        return frames
+
+    def _track_seq(self, seq: int):
+        last = self._last_seq
+        self._last_seq = seq
+        if last is None:
+            return
+        gap = (seq - last - 1) & 0xFFFF
+        if gap == 0:
+            return
+        if gap >= 0x8000:
+            self.stats.out_of_order += 1
+        else:
+            self.stats.seq_gaps += 1
+            self.stats.lost_frames += gap
+
+    def reset(self):
+        """Forget sequence state (port reopened / device rebooted)."""
+        self._buf.clear()
+        self._last_seq = None
@@ -7,13 +7,23 @@ from app.config import settings
 from app.sources.base import DataSource
 from app.sources.simulator import MockSTM32
 from app.sources.serial_source import SerialSource
+from app.sources.fleet import FleetSimulator
+from app.sources.replay import ReplaySource
+from app.sources.gateway import NetworkGateway
 
 
 def create_data_source() -> DataSource:
     """
     Factory function. Returns MockSTM32 in simulation mode,
-    SerialSource in hardware mode.
+    SerialSource in hardware mode, NetworkGateway for networked sinks,
+    FleetSimulator / ReplaySource for load and regression tests.
     """
     if settings.data_source == "serial":
         return SerialSource()
+    if settings.data_source == "fleet":
+        return FleetSimulator()
+    if settings.data_source == "replay":
+        return ReplaySource()
+    if settings.data_source == "gateway":
+        return NetworkGateway()
     return MockSTM32()
@@ -0,0 +1,222 @@
+"""
+HarvesSink – Vectorized fleet simulator.
+Simulates N Arduino sinks at once: the warmup → calibrating → operational
+state machine, confidence debounce and scenario noise of MockSTM32, but
+held as NumPy arrays and advanced for every device in a single step per
+tick. Readings are emitted in batches for load-testing the pipeline.
+"""
+
+import math
+from typing import Optional
+
+import numpy as np
+
+from app.records import Reading
+from app.sources.base import DataSource
+from app.sources.simulator import SCENARIOS, WARMUP_TICKS, CALIB_TICKS, CONFIDENCE_LIMIT
+from app.config import settings
+from app.clock import clock
+
+
+# ── Delhi NCR placement (same area as the municipal map) ─────
+CENTER_LAT, CENTER_LNG = 28.6139, 77.2090
+SPREAD = 0.15  # ~15km radius
+
+_SCENARIO_NAMES = list(SCENARIOS)
+_BASE_PH = np.array([SCENARIOS[s]["ph"] for s in _SCENARIO_NAMES])
+_BASE_TDS = np.array([SCENARIOS[s]["tds"] for s in _SCENARIO_NAMES], dtype=np.float64)
+_BASE_TURB = np.array([SCENARIOS[s]["turbidity"] for s in _SCENARIO_NAMES], dtype=np.float64)
+_MODES = ("warmup", "calibration", "active")
+
+
+def parse_scenario_mix(spec: str) -> np.ndarray:
+    """'clean:0.9,dishwashing:0.1' → probability per SCENARIOS entry."""
+    weights = np.zeros(len(_SCENARIO_NAMES))
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition(":")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' in fleet mix. Available: {_SCENARIO_NAMES}")
+        weights[_SCENARIO_NAMES.index(name)] = float(weight or 1)
+    if weights.sum() <= 0:
+        weights[_SCENARIO_NAMES.index("clean")] = 1.0
+    return weights / weights.sum()
+
+
+class FleetSimulator(DataSource):
+    """
+    N simulated devices in one DataSource. Each tick advances all devices
+    with vectorized noise/drift and yields their readings in batches of
+    settings.fleet_batch_size.
+    """
+
+    def __init__(self, num_devices: Optional[int] = None, seed: Optional[int] = None):
+        n = num_devices or settings.sim_num_nodes
+        self.n = n
+        self._rng = np.random.default_rng(seed)
+        self._connected = False
+        self._tick = 0
+        self._pending: list[Reading] = []
+
+        # Identity + placement
+        self.device_ids = [f"HVS-{i + 1:03d}" for i in range(n)]
+        self._index = {d: i for i, d in enumerate(self.device_ids)}
+        angle = self._rng.uniform(0, 2 * math.pi, n)
+        r = SPREAD * np.sqrt(self._rng.random(n))
+        self.lat = np.round(CENTER_LAT + r * np.sin(angle), 6)
+        self.lng = np.round(CENTER_LNG + r * np.cos(angle), 6)
+
+        # Scenario assignment
+        self._mix = parse_scenario_mix(settings.fleet_scenario_mix)
+        self._scenario = self._rng.choice(len(_SCENARIO_NAMES), size=n, p=self._mix)
+        self._phase = self._rng.uniform(0, 2 * math.pi, n)   # de-synchronize drift
+
+        # Arduino state machine, one slot per device (devices boot staggered)
+        self._warmup_until = WARMUP_TICKS + self._rng.integers(0, WARMUP_TICKS + 1, n)
+        self._edge_state = np.zeros(n, dtype=np.int8)
+        self._calib_count = np.zeros(n, dtype=np.int32)
+        self._tds_sum = np.zeros(n)
+        self._tds_sq_sum = np.zeros(n)
+        self._edge_base_tds = np.zeros(n)
+        self._edge_std_tds = np.zeros(n)
+        self._confidence = np.zeros(n, dtype=np.int8)
+        self._harvesting = np.zeros(n, dtype=bool)
+        self._kill_switch = np.zeros(n, dtype=bool)
+
+    async def connect(self) -> None:
+        self._connected = True
+        print(f"🏙️  Fleet simulator: {self.n} devices @ {settings.sim_interval_ms} ms")
+
+    async def disconnect(self) -> None:
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def set_scenario(self, name: str, device_id: Optional[str] = None) -> None:
+        """Switch one device, or the whole fleet, to a scenario."""
+        if name not in SCENARIOS:
+            return
+        idx = _SCENARIO_NAMES.index(name)
+        if device_id is None:
+            self._scenario[:] = idx
+        elif device_id in self._index:
+            self._scenario[self._index[device_id]] = idx
+
+    async def write(self, data: str, device_id: Optional[str] = None) -> None:
+        """Simulate kill-switch from server (one device, or all if no id)."""
+        target = slice(None) if device_id is None else self._index.get(device_id)
+        if target is None:
+            return
+        if data.strip() == "0":
+            self._kill_switch[target] = True
+            self._harvesting[target] = False
+        elif data.strip() == "1":
+            self._kill_switch[target] = False
+
+    # ── Reading ─────────────────────────────────────────
+    async def read(self) -> Reading:
+        if not self._pending:
+            self._pending = await self._next_tick()
+        return self._pending.pop()
+
+    async def read_batch(self) -> list[Reading]:
+        if not self._pending:
+            self._pending = await self._next_tick()
+        size = settings.fleet_batch_size
+        batch, self._pending = self._pending[:size], self._pending[size:]
+        return batch
+
+    async def _next_tick(self) -> list[Reading]:
+        await clock.tick(settings.sim_interval_ms / 1000)
+        return self.step()
+
+    def step(self) -> list[Reading]:
+        """Advance every device by one tick and return their readings."""
+        self._tick += 1
+        n, rng = self.n, self._rng
+
+        # Random activity changes (someone starts washing dishes, …)
+        switch = rng.random(n) < settings.fleet_scenario_switch_prob
+        if switch.any():
+            self._scenario[switch] = rng.choice(len(_SCENARIO_NAMES), size=int(switch.sum()), p=self._mix)
+
+        # Scenario base + slow sinusoidal drift + noise
+        sc = self._scenario
+        drift = np.sin(self._tick * 0.05 + self._phase) * 0.3
+        ph = np.clip(np.round(_BASE_PH[sc] + drift + rng.normal(0, 0.15, n), 2), 0.0, 14.0)
+        tds = np.maximum(0.0, np.round(_BASE_TDS[sc] + drift * 20 + rng.normal(0, 8, n), 1))
+        turbidity = np.round(np.maximum(0.0, _BASE_TURB[sc] + drift * 2 + rng.normal(0, 0.5, n)), 2)
+
+        # ── Arduino state machine (masks taken before any transition) ──
+        warmup = self._edge_state == 0
+        calibrating = self._edge_state == 1
+        operational = self._edge_state == 2
+        progress = np.zeros(n, dtype=np.int32)
+        nudge_pass = np.ones(n, dtype=bool)
+
+        # WARMUP
+        self._edge_state[warmup & (self._tick >= self._warmup_until)] = 1
+
+        # CALIBRATING — collect samples for baseline
+        self._tds_sum[calibrating] += tds[calibrating]
+        self._tds_sq_sum[calibrating] += tds[calibrating] ** 2
+        self._calib_count[calibrating] += 1
+        progress[calibrating] = (self._calib_count[calibrating] * 100) // CALIB_TICKS
+        done = calibrating & (self._calib_count >= CALIB_TICKS)
+        if done.any():
+            mean = self._tds_sum[done] / CALIB_TICKS
+            variance = self._tds_sq_sum[done] / CALIB_TICKS - mean * mean
+            self._edge_base_tds[done] = np.round(mean, 1)
+            self._edge_std_tds[done] = np.round(np.sqrt(np.maximum(0.0, variance)), 2)
+            self._edge_state[done] = 2
+            progress[done] = 100
+
+        # OPERATIONAL — adaptive nudge
+        progress[operational] = 100
+        nudging = operational & (self._edge_std_tds > 2.0)
+        z = np.abs(tds - self._edge_base_tds) / np.where(nudging, self._edge_std_tds, 1.0)
+        nudge_pass[nudging] = z[nudging] < 3.0
+
+        # Static safety check (matches Arduino Tier 1) + confidence debounce
+        static_clean = (ph >= 6.5) & (ph <= 8.5) & (tds <= 1000) & (turbidity < 5.0)
+        final = static_clean & nudge_pass
+        self._confidence = np.where(
+            final,
+            np.maximum(self._confidence - 1, 0),
+            np.minimum(self._confidence + 1, CONFIDENCE_LIMIT),
+        ).astype(np.int8)
+        self._harvesting[~final & (self._confidence >= CONFIDENCE_LIMIT)] = False
+        self._harvesting[final & (self._confidence <= 0)] = True
+        self._harvesting &= ~self._kill_switch
+
+        # ── Emit (trusted values — internal records, no validation) ──
+        now = clock.now()
+        valve = self._harvesting.astype(np.int8).tolist()
+        state = self._edge_state.tolist()
+        return [
+            Reading(
+                device_id=device_id,
+                timestamp=now,
+                ph=p,
+                tds=t,
+                turbidity=tb,
+                gps_lat=la,
+                gps_lng=lo,
+                valve_position=v,
+                device_mode=_MODES[st],
+                edge_state=st,
+                edge_progress=pr,
+                edge_base_tds=bt,
+                edge_nudge=nu,
+                edge_valve=v,
+                edge_confidence=cf,
+            )
+            for device_id, p, t, tb, la, lo, v, st, pr, bt, nu, cf in zip(
+                self.device_ids, ph.tolist(), tds.tolist(), turbidity.tolist(),
+                self.lat.tolist(), self.lng.tolist(), valve, state, progress.tolist(),
+                self._edge_base_tds.tolist(), nudge_pass.tolist(), self._confidence.tolist(),
+            )
+        ]
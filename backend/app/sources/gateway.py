@@ -0,0 +1,204 @@
+"""
+HarvesSink – Network ingest gateway.
+Accepts the Arduino JSON contract from many edge devices over TCP and UDP
+at once, so sinks no longer have to be USB-attached to the server.
+
+Framing: newline-delimited packets; a line may also hold a JSON array of
+packets (batch upload). Device identity, in order of precedence:
+  1. "device_id" in the packet
+  2. a hello line on the TCP connection: {"device_id": "HVS-042"}
+  3. the peer address ("10.0.0.7:51544")
+
+Backpressure: TCP handlers await a bounded queue, so a slow pipeline stops
+reading sockets and TCP flow control throttles the senders. UDP cannot be
+throttled — datagrams arriving at a full queue are dropped and counted.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional
+
+from app.records import Reading
+from app.sources.base import DataSource
+from app.sources.serial_source import LineFramer, parse_arduino_packet
+from app.config import settings
+
+
+def _packets(line: bytes):
+    """One framed line → packet dicts (single object or a batch array)."""
+    data = json.loads(line)
+    if isinstance(data, list):
+        return data
+    return [data]
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, gateway: "NetworkGateway"):
+        self.gateway = gateway
+
+    def connection_made(self, transport):
+        self.gateway._udp = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.gateway._on_datagram(data, addr)
+
+
+class NetworkGateway(DataSource):
+    """TCP + UDP ingest of Arduino JSON packets from many devices."""
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        tcp_port: Optional[int] = None,
+        udp_port: Optional[int] = None,
+        max_connections: Optional[int] = None,
+    ):
+        self.host = host or settings.gateway_host
+        self.tcp_port = settings.gateway_tcp_port if tcp_port is None else tcp_port
+        self.udp_port = settings.gateway_udp_port if udp_port is None else udp_port
+        self.max_connections = max_connections or settings.gateway_max_connections
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._udp: Optional[asyncio.DatagramTransport] = None
+        self._writers: dict[str, asyncio.StreamWriter] = {}   # device_id → TCP connection
+        self._udp_peers: dict[str, tuple] = {}                # device_id → last UDP address
+        self._connections = 0
+        self._connected = False
+        self.counters = {
+            "connections_total": 0, "rejected": 0, "bytes": 0, "readings": 0,
+            "parse_errors": 0, "resyncs": 0, "udp_dropped": 0,
+        }
+
+    async def connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=settings.gateway_queue_size)
+        if self.tcp_port is not None and self.tcp_port >= 0:
+            self._server = await asyncio.start_server(self._handle_tcp, self.host, self.tcp_port)
+            self.tcp_port = self._server.sockets[0].getsockname()[1]
+        if self.udp_port is not None and self.udp_port >= 0:
+            await loop.create_datagram_endpoint(lambda: _UdpProtocol(self), local_addr=(self.host, self.udp_port))
+            self.udp_port = self._udp.get_extra_info("sockname")[1]
+        self._connected = True
+        print(f"🌐 Ingest gateway: tcp://{self.host}:{self.tcp_port} udp://{self.host}:{self.udp_port}")
+
+    async def disconnect(self) -> None:
+        if self._server:
+            self._server.close()
+            for writer in list(self._writers.values()):
+                writer.close()
+            await self._server.wait_closed()
+        if self._udp:
+            self._udp.close()
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    # ── Parsing ─────────────────────────────────────────
+    def _parse(self, line: bytes, default_id: str, now: datetime) -> tuple[list[Reading], Optional[str]]:
+        """Readings in a line, plus the device id announced by a hello line."""
+        readings = []
+        hello = None
+        try:
+            packets = _packets(line)
+        except ValueError:
+            self.counters["parse_errors"] += 1
+            return readings, None
+        for packet in packets:
+            try:
+                device_id = str(packet.get("device_id") or default_id)
+                if "ph" not in packet:
+                    hello = packet.get("device_id")      # identity-only line
+                    continue
+                readings.append(parse_arduino_packet(packet, device_id, now))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.counters["parse_errors"] += 1
+        self.counters["readings"] += len(readings)
+        return readings, hello
+
+    # ── TCP ─────────────────────────────────────────────
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self._connections >= self.max_connections:
+            self.counters["rejected"] += 1
+            writer.close()
+            return
+        self._connections += 1
+        self.counters["connections_total"] += 1
+        peer = writer.get_extra_info("peername") or ("?", 0)
+        device_id = f"{peer[0]}:{peer[1]}"
+        framer = LineFramer(settings.gateway_max_line, arrays=True)
+        try:
+            while True:
+                chunk = await asyncio.wait_for(reader.read(65536), timeout=settings.gateway_idle_timeout_s)
+                if not chunk:
+                    break
+                self.counters["bytes"] += len(chunk)
+                resyncs = framer.resyncs
+                now = datetime.utcnow()
+                for line in framer.feed(chunk):
+                    readings, hello = self._parse(line, device_id, now)
+                    if hello:
+                        self._writers.pop(device_id, None)
+                        device_id = str(hello)
+                    for reading in readings:
+                        self._writers[reading.device_id] = writer
+                        await self._queue.put(reading)   # blocks when full → TCP backpressure
+                    if hello:
+                        self._writers[device_id] = writer
+                self.counters["resyncs"] += framer.resyncs - resyncs
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self._connections -= 1
+            for d in [d for d, w in self._writers.items() if w is writer]:
+                del self._writers[d]
+            writer.close()
+
+    # ── UDP ─────────────────────────────────────────────
+    def _on_datagram(self, data: bytes, addr):
+        self.counters["bytes"] += len(data)
+        default_id = f"{addr[0]}:{addr[1]}"
+        now = datetime.utcnow()
+        for line in data.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            readings, _ = self._parse(line, default_id, now)
+            for reading in readings:
+                self._udp_peers[reading.device_id] = addr
+                try:
+                    self._queue.put_nowait(reading)
+                except asyncio.QueueFull:
+                    self.counters["udp_dropped"] += 1
+
+    # ── DataSource API ──────────────────────────────────
+    async def read(self) -> Reading:
+        return await self._queue.get()
+
+    async def read_batch(self) -> list[Reading]:
+        batch = [await self._queue.get()]
+        while len(batch) < settings.gateway_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def write(self, data: str, device_id: Optional[str] = None) -> None:
+        """Kill-switch back to a device over its TCP connection (or last UDP address)."""
+        payload = data.encode("utf-8")
+        targets = list(self._writers) if device_id is None else [device_id]
+        for d in targets:
+            writer = self._writers.get(d)
+            if writer is not None and not writer.is_closing():
+                writer.write(payload)
+            elif d in self._udp_peers and self._udp:
+                self._udp.sendto(payload, self._udp_peers[d])
+
+    def stats(self) -> dict:
+        return {
+            "tcp_port": self.tcp_port,
+            "udp_port": self.udp_port,
+            "connections": self._connections,
+            "devices": len(set(self._writers) | set(self._udp_peers)),
+            "queued": self._queue.qsize() if self._queue else 0,
+            **self.counters,
+        }
@@ -0,0 +1,308 @@
+"""
+HarvesSink – Recorded-stream replay data source.
+Replays captured serial lines or stored readings through the pipeline with
+their original inter-arrival timing, warped by a speed factor
+(1× real time, 10×, … or 0 = as fast as possible). Several captures — and
+several copies of each — are multiplexed as independent devices.
+
+Accepted capture formats (auto-detected per file):
+  • serial log:  one Arduino JSON packet per line, optionally prefixed by
+                 an ISO-8601 or epoch timestamp ("2026-01-03T10:00:00.5 {...}")
+  • NDJSON:      one stored reading per line ({"device_id", "timestamp", "ph", ...})
+  • JSON store:  backend/data/readings.json layout ({device_id: [rows]}) or a list of rows
+"""
+
+import asyncio
+import heapq
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.records import Reading
+from app.schemas import SensorReading
+from app.sources.base import DataSource
+from app.sources.serial_source import parse_arduino_packet
+from app.config import settings
+from app.clock import clock
+
+
+DEFAULT_GPS = (28.6139, 77.2090)
+SERIAL_LINE_INTERVAL_S = 1.0   # Arduino sends at 1Hz when a log has no timestamps
+LOOP_GAP_S = 1.0               # pause between the end of a capture and its next loop
+
+
+@dataclass
+class Capture:
+    """One device's recorded stream: offsets (s from first event) + raw payloads."""
+    device_id: str
+    kind: str                       # "serial" | "stored"
+    offsets: list[float] = field(default_factory=list)
+    payloads: list[dict] = field(default_factory=list)
+    start: Optional[datetime] = None
+
+    @property
+    def duration(self) -> float:
+        return self.offsets[-1] if self.offsets else 0.0
+
+
+def _parse_time(token) -> Optional[datetime]:
+    try:
+        return datetime.utcfromtimestamp(float(token))
+    except (OverflowError, OSError):
+        return None                 # a number, but not a representable time
+    except (TypeError, ValueError):
+        pass
+    try:
+        ts = datetime.fromisoformat(str(token).replace("Z", "+00:00"))
+        return ts if ts.tzinfo is None else ts.astimezone(timezone.utc).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _checked_row(row, ts: datetime) -> Optional[dict]:
+    """
+    A stored row held to the live SensorReading constraints (capture files
+    are untrusted) → the numeric fields _emit needs, or None to drop it.
+    """
+    try:
+        reading = SensorReading(
+            timestamp=ts, ph=row["ph"], tds=row.get("tds", 0.0), turbidity=row.get("turbidity", 0.0),
+            gps_lat=row.get("gps_lat", DEFAULT_GPS[0]), gps_lng=row.get("gps_lng", DEFAULT_GPS[1]),
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not (math.isfinite(reading.gps_lat) and math.isfinite(reading.gps_lng)):
+        return None
+    return {
+        "ph": reading.ph, "tds": reading.tds, "turbidity": reading.turbidity,
+        "gps_lat": reading.gps_lat, "gps_lng": reading.gps_lng,
+    }
+
+
+def _checked_packet(packet: dict) -> bool:
+    """Would this serial packet pass parse_arduino_packet at playback time?"""
+    try:
+        parse_arduino_packet(packet, "replay", datetime(1970, 1, 1))
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+    return True
+
+
+def _from_rows(rows: list, default_id: str) -> tuple[list[Capture], int]:
+    """Stored readings (any number of devices) → (one capture per device, rows dropped)."""
+    by_device: dict[str, list[tuple[datetime, dict]]] = {}
+    dropped = 0
+    for row in rows:
+        ts = _parse_time(row.get("timestamp")) if isinstance(row, dict) else None
+        payload = _checked_row(row, ts) if ts is not None else None
+        if payload is None:
+            dropped += 1
+            continue
+        by_device.setdefault(str(row.get("device_id", default_id)), []).append((ts, payload))
+    captures = []
+    for device_id, items in by_device.items():
+        items.sort(key=lambda item: item[0])
+        start = items[0][0]
+        captures.append(Capture(
+            device_id=device_id,
+            kind="stored",
+            offsets=[(ts - start).total_seconds() for ts, _ in items],
+            payloads=[row for _, row in items],
+            start=start,
+        ))
+    return captures, dropped
+
+
+def load_captures(path: str) -> tuple[list[Capture], int]:
+    """Read one capture file into per-device captures; also returns how many invalid lines/rows were dropped."""
+    default_id = os.path.splitext(os.path.basename(path))[0]
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+
+    # Whole-file JSON: readings store or list of rows
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict):
+        return _from_rows([dict(row, device_id=d) if isinstance(row, dict) else row
+                           for d, rows in data.items() if isinstance(rows, list) for row in rows], default_id)
+    if isinstance(data, list):
+        return _from_rows(data, default_id)
+
+    # Line-oriented: NDJSON rows or (timestamped) serial log
+    rows: list[dict] = []
+    serial = Capture(device_id=default_id, kind="serial")
+    first_ts: Optional[datetime] = None
+    dropped = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        ts = None
+        if not line.startswith("{"):
+            token, _, line = line.partition(" ")
+            ts = _parse_time(token.strip())
+            line = line.strip()
+        try:
+            packet = json.loads(line)
+        except json.JSONDecodeError:
+            dropped += 1    # partial / corrupted line in the capture
+            continue
+        if not isinstance(packet, dict) or "ph" not in packet:
+            dropped += 1
+            continue
+        if "turbidity" in packet and "timestamp" in packet:
+            rows.append(packet)
+            continue
+        if not _checked_packet(packet):
+            dropped += 1
+            continue
+        if ts is not None and first_ts is None:
+            first_ts = ts
+        offset = (ts - first_ts).total_seconds() if ts and first_ts else len(serial.offsets) * SERIAL_LINE_INTERVAL_S
+        serial.offsets.append(offset)
+        serial.payloads.append(packet)
+
+    captures, dropped_rows = _from_rows(rows, default_id)
+    if serial.offsets:
+        serial.start = first_ts
+        captures.append(serial)
+    return captures, dropped + dropped_rows
+
+
+@dataclass
+class _Stream:
+    """Playback cursor of one capture copy."""
+    device_id: str
+    capture: Capture
+    base: datetime
+    index: int = 0
+    loop: int = 0
+
+    def due(self) -> float:
+        return self.loop * (self.capture.duration + LOOP_GAP_S) + self.capture.offsets[self.index]
+
+
+class ReplaySource(DataSource):
+    """
+    Time-warped playback of recorded streams. Readings are emitted when their
+    original offset, divided by the speed factor, has elapsed since connect().
+    """
+
+    def __init__(
+        self,
+        paths: Optional[list[str]] = None,
+        speed: Optional[float] = None,
+        loop: Optional[bool] = None,
+        copies: Optional[int] = None,
+    ):
+        self.paths = paths if paths is not None else [p.strip() for p in settings.replay_paths.split(",") if p.strip()]
+        self.speed = settings.replay_speed if speed is None else speed
+        self.loop = settings.replay_loop if loop is None else loop
+        self.copies = max(1, settings.replay_copies if copies is None else copies)
+        self._streams: list[_Stream] = []
+        self._heap: list[tuple[float, int]] = []
+        self._pending: list[Reading] = []
+        self._connected = False
+        self._finished = asyncio.Event()
+        self._t0 = 0.0
+        self.emitted = 0
+        self.dropped = 0                # capture lines/rows that failed validation at load
+        self.kill_switch_writes = 0
+
+    async def connect(self) -> None:
+        now = clock.now()
+        for path in self.paths:
+            captures, dropped = load_captures(path)
+            self.dropped += dropped
+            for capture in captures:
+                if not capture.offsets:
+                    continue
+                for k in range(self.copies):
+                    device_id = capture.device_id if self.copies == 1 else f"{capture.device_id}-{k + 1:02d}"
+                    self._streams.append(_Stream(device_id, capture, capture.start or now))
+        if not self._streams:
+            raise RuntimeError(f"No replayable readings found in: {self.paths}")
+        self._heap = [(s.due(), i) for i, s in enumerate(self._streams)]
+        heapq.heapify(self._heap)
+        self._t0 = time.monotonic()
+        self._connected = True
+        speed = "max" if self.speed <= 0 else f"{self.speed:g}×"
+        print(f"⏯️  Replay: {len(self._streams)} streams from {len(self.paths)} file(s) @ {speed}"
+              + (f" ({self.dropped} invalid lines dropped)" if self.dropped else ""))
+
+    async def disconnect(self) -> None:
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def write(self, data: str, device_id: Optional[str] = None) -> None:
+        """Recorded devices can't be actuated — just count kill-switch writes."""
+        if data.strip() == "0":
+            self.kill_switch_writes += 1
+
+    def stats(self) -> dict:
+        return {
+            "streams": len(self._streams),
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "kill_switch_writes": self.kill_switch_writes,
+        }
+
+    async def read(self) -> Reading:
+        if not self._pending:
+            self._pending = await self.read_batch()
+        return self._pending.pop(0)
+
+    async def read_batch(self) -> list[Reading]:
+        if not self._heap:
+            if not self._finished.is_set():
+                self._finished.set()
+                print(f"⏹️  Replay finished after {self.emitted} readings")
+            await asyncio.Event().wait()   # nothing left — park the stream loop
+
+        # Sleep until the next event is due on the warped clock
+        if self.speed > 0:
+            wait = self._t0 + self._heap[0][0] / self.speed - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            horizon = (time.monotonic() - self._t0) * self.speed
+        else:
+            await asyncio.sleep(0)  # stay cooperative at max speed
+            horizon = float("inf")
+
+        batch = []
+        while self._heap and self._heap[0][0] <= horizon and len(batch) < settings.replay_batch_size:
+            offset, i = heapq.heappop(self._heap)
+            stream = self._streams[i]
+            batch.append(self._emit(stream, offset))
+            stream.index += 1
+            if stream.index >= len(stream.capture.offsets):
+                if not self.loop:
+                    continue
+                stream.index = 0
+                stream.loop += 1
+            heapq.heappush(self._heap, (stream.due(), i))
+        self.emitted += len(batch)
+        return batch
+
+    def _emit(self, stream: _Stream, offset: float) -> Reading:
+        payload = stream.capture.payloads[stream.index]
+        ts = stream.base + timedelta(seconds=offset)
+        if stream.capture.kind == "serial":
+            return parse_arduino_packet(payload, stream.device_id, ts)
+        return Reading(
+            device_id=stream.device_id,
+            timestamp=ts,
+            ph=payload["ph"],
+            tds=payload["tds"],
+            turbidity=payload["turbidity"],
+            gps_lat=payload["gps_lat"],
+            gps_lng=payload["gps_lng"],
+        )
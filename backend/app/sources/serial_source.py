@@ -3,6 +3,9 @@ HarvesSink – Arduino Serial data source.
 Reads JSON packets from COM/USB port and remaps Arduino field names
 to match backend SensorReading schema.
 
+Each port gets a dedicated reader thread (SERIAL_PORTS="COM3=HVS-001,COM4=HVS-002");
+parsed readings are handed to the event loop through an asyncio queue.
+
 Arduino JSON contract (9600 baud, 1Hz):
   {"ph":7.21, "tds":560, "turb":1850, "valve":1, "state":2,
    "progress":100, "base_tds":562, "nudge":1}
@@ -10,11 +13,16 @@ Arduino JSON contract (9600 baud, 1Hz):
 
 import asyncio
 import json
+import threading
+import time
 from datetime import datetime
+from typing import Optional
 
 from app.schemas import SensorReading
+from app.records import Reading
 from app.sources.base import DataSource
 from app.config import settings
+from app.sources.binary_protocol import FrameDecoder, frame_to_packet, NEGOTIATE_BINARY
 
 try:
     import serial
@@ -26,80 +34,285 @@ except ImportError:
 _STATE_MAP = {0: "warmup", 1: "calibration", 2: "active"}
 
 
-class SerialSource(DataSource):
+def parse_arduino_packet(data: dict, device_id: str, timestamp: datetime) -> Reading:
     """
-    Reads Arduino JSON packets from a serial port, remaps field names,
-    and supports write() for the kill-switch reverse handshake.
+    Remap an Arduino JSON packet to a reading. Device data is untrusted, so
+    it is validated here as a SensorReading (raises ValueError) and enters
+    the pipeline as an internal Reading.
     """
+    if not isinstance(data, dict):
+        raise ValueError("packet must be a JSON object")
+    # Remap Arduino JSON keys → SensorReading fields
+    state_int = int(data.get("state", 2))
+    valve_int = int(data.get("valve", 1))
+
+    # pH sensor is wired inverted — calibration from two known points:
+    #   Normal water (pH 7)  → Arduino raw ≈ 14
+    #   Basic  water (pH 14) → Arduino raw ≈ 7
+    # Linear fit: corrected_pH = 21 - raw_ph
+    raw_ph = float(data["ph"])
+    corrected_ph = max(0.0, min(14.0, 21.0 - raw_ph))
+
+    return Reading.from_model(SensorReading(
+        device_id=device_id,
+        timestamp=timestamp,
+        ph=corrected_ph,
+        tds=float(data["tds"]),
+        turbidity=float(data.get("turb", 0)),       # Arduino sends "turb"
+        valve_position=valve_int,
+        device_mode=_STATE_MAP.get(state_int, "active"),
+        edge_state=state_int,
+        edge_progress=int(data.get("progress", 100)),
+        edge_base_tds=float(data.get("base_tds", 0)),
+        edge_nudge=bool(data.get("nudge", 1)),
+        edge_valve=valve_int,
+        edge_confidence=int(data.get("conf", 0)),
+    ))
+
+
+# ── Framing ─────────────────────────────────────────────────
+class LineFramer:
+    """
+    Splits a raw byte stream into newline-terminated packets. Recovers
+    from mid-packet starts, line noise and lost newlines by skipping to the
+    next '{' (resync) or dropping an over-long partial line. With arrays=True
+    (network gateway) a line starting with '[' is a batch and passes as is.
+    """
+
+    def __init__(self, max_line: int = 1024, arrays: bool = False):
+        self.max_line = max_line
+        self.arrays = arrays
+        self._buf = bytearray()
+        self.resyncs = 0
 
-    def __init__(self):
+    def feed(self, chunk: bytes) -> list[bytes]:
+        self._buf += chunk
+        lines = []
+        start = 0
+        while (end := self._buf.find(b"\n", start)) >= 0:
+            line = bytes(self._buf[start:end]).strip()
+            start = end + 1
+            if not line:
+                continue
+            if self.arrays and line[:1] == b"[":
+                lines.append(line)         # batch of packets
+                continue
+            brace = line.find(b"{")
+            if brace < 0:
+                self.resyncs += 1          # boot banner / noise — nothing to parse
+                continue
+            if brace > 0 or line.count(b"{") > 1:
+                self.resyncs += 1          # joined or truncated packets — keep the last one
+                line = line[line.rfind(b"{"):]
+            lines.append(line)
+        del self._buf[:start]
+        if len(self._buf) > self.max_line:
+            self.resyncs += 1              # newline lost — drop the partial packet
+            self._buf.clear()
+        return lines
+
+
+def parse_port_spec(spec: str, default_port: str) -> list[tuple[str, str]]:
+    """'COM3=HVS-001,COM4=HVS-002' → [(port, device_id)]; unnamed ports get HVS-00N."""
+    entries = [part.strip() for part in spec.split(",") if part.strip()] or [default_port]
+    ports = []
+    for i, entry in enumerate(entries):
+        port, _, device_id = entry.partition("=")
+        ports.append((port.strip(), device_id.strip() or f"HVS-{i + 1:03d}"))
+    return ports
+
+
+class _PortReader(threading.Thread):
+    """Owns one serial port: buffered reads, framing and parsing off the event loop."""
+
+    def __init__(self, port: str, device_id: str, deliver):
+        super().__init__(name=f"serial-{port}", daemon=True)
+        self.port = port
+        self.device_id = device_id
+        self._deliver = deliver
+        self._framer = LineFramer(settings.serial_max_line)
+        self._frames = FrameDecoder()
+        # json | binary | auto (negotiate binary, accept JSON until frames arrive)
+        self.protocol = settings.serial_protocol
+        self._binary = self.protocol == "binary"
+        self._negotiated_at = 0.0
+        self._stopping = threading.Event()
         self._ser = None
+        self.bytes_read = 0
+        self._rate = (time.monotonic(), 0, 0.0)    # (since, bytes then, last bytes/s)
+        self.readings = 0
+        self.parse_errors = 0
+        self.reconnects = 0
+        self.last_error = ""
+
+    def open(self):
+        self._ser = serial.serial_for_url(self.port, baudrate=settings.serial_baud, timeout=0.1)
+        self._frames.reset()
+        self._negotiated_at = 0.0
+
+    def stop(self):
+        self._stopping.set()
+
+    def write(self, data: bytes):
+        if self._ser and self._ser.is_open:
+            self._ser.write(data)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                if self._ser is None or not self._ser.is_open:
+                    self.open()
+                    self.reconnects += 1
+                self._negotiate()
+                # Whatever is buffered, or block (≤ timeout) for the next byte
+                chunk = self._ser.read(self._ser.in_waiting or 1)
+            except (serial.SerialException, OSError) as e:
+                self.last_error = str(e)
+                self._close()
+                self._stopping.wait(settings.serial_reconnect_s)
+                continue
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+            batch = self._decode(chunk, datetime.utcnow())
+            if batch:
+                self.readings += len(batch)
+                self._deliver(batch)
+        self._close()
+
+    def _negotiate(self):
+        """Ask the firmware for binary frames until it answers (it may still be booting)."""
+        if self.protocol == "json" or self._frames.stats.frames:
+            return
+        now = time.monotonic()
+        if now - self._negotiated_at >= settings.serial_negotiate_s:
+            self._negotiated_at = now
+            self._ser.write(NEGOTIATE_BINARY)
+
+    def _decode(self, chunk: bytes, now: datetime) -> list[Reading]:
+        batch = []
+        if self.protocol != "json":
+            for fields in self._frames.feed(chunk):
+                try:
+                    batch.append(parse_arduino_packet(frame_to_packet(fields), self.device_id, now))
+                except ValueError:
+                    self.parse_errors += 1
+            if batch and not self._binary:
+                self._binary = True      # auto: firmware switched — stop line framing
+            if self._binary:
+                return batch
+        for line in self._framer.feed(chunk):
+            try:
+                batch.append(parse_arduino_packet(json.loads(line), self.device_id, now))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.parse_errors += 1
+        return batch
+
+    def _close(self):
+        if self._ser is not None:
+            try:
+                self._ser.close()
+            except Exception:
+                pass
+            self._ser = None
+
+    def stats(self) -> dict:
+        since, bytes_then, rate = self._rate
+        now = time.monotonic()
+        if now - since >= 1.0:   # rate over the interval between status polls
+            rate = (self.bytes_read - bytes_then) / (now - since)
+            self._rate = (now, self.bytes_read, rate)
+        frames = self._frames.stats
+        return {
+            "port": self.port,
+            "device_id": self.device_id,
+            "protocol": "binary" if self._binary else "json",
+            "connected": self._ser is not None and self._ser.is_open,
+            "bytes_read": self.bytes_read,
+            "bytes_per_s": round(rate, 1),
+            "readings": self.readings,
+            "parse_errors": self.parse_errors,
+            "resyncs": frames.resyncs if self._binary else self._framer.resyncs,
+            "crc_errors": frames.crc_errors,
+            "seq_gaps": frames.seq_gaps,
+            "lost_frames": frames.lost_frames,
+            "out_of_order": frames.out_of_order,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+class SerialSource(DataSource):
+    """
+    Reads Arduino JSON packets from one or more serial ports (one reader
+    thread per port), remaps field names, and supports write() for the
+    kill-switch reverse handshake.
+    """
+
+    def __init__(self, ports: Optional[list[tuple[str, str]]] = None):
+        self.ports = ports or parse_port_spec(settings.serial_ports, settings.serial_port)
+        self._readers: dict[str, _PortReader] = {}    # device_id → reader
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._connected = False
+        self.dropped = 0
 
     async def connect(self) -> None:
         if not SERIAL_AVAILABLE:
             raise RuntimeError("pyserial is not installed. Run: pip install pyserial")
-        self._ser = serial.Serial(
-            port=settings.serial_port,
-            baudrate=settings.serial_baud,
-            timeout=1,
-        )
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=settings.serial_queue_size)
+        for port, device_id in self.ports:
+            reader = _PortReader(port, device_id, self._deliver_threadsafe)
+            reader.open()   # fail fast on a wrong port, like the single-port source did
+            self._readers[device_id] = reader
+            reader.start()
+            print(f"📡 Serial connected: {port} @ {settings.serial_baud} baud → {device_id}")
         self._connected = True
-        print(f"📡 Serial connected: {settings.serial_port} @ {settings.serial_baud} baud")
 
-    async def read(self) -> SensorReading:
-        if not self._ser:
+    def _deliver_threadsafe(self, batch: list[Reading]):
+        self._loop.call_soon_threadsafe(self._enqueue, batch)
+
+    def _enqueue(self, batch: list[Reading]):
+        for reading in batch:
+            if self._queue.full():
+                self._queue.get_nowait()   # stream loop is behind — keep the freshest data
+                self.dropped += 1
+            self._queue.put_nowait(reading)
+
+    async def read(self) -> Reading:
+        if self._queue is None:
             raise RuntimeError("Serial not connected")
+        return await self._queue.get()
 
-        loop = asyncio.get_event_loop()
-        # Keep retrying until we get a non-empty line (Arduino may not
-        # have sent a packet yet, or the read timed out mid-cycle).
-        while True:
-            line = await loop.run_in_executor(None, self._ser.readline)
-            raw = line.decode("utf-8", errors="ignore").strip()
-            if raw:
-                break
-            await asyncio.sleep(0.1)  # avoid busy-spin on empty reads
-
-        data = json.loads(raw)
-
-        # Remap Arduino JSON keys → SensorReading fields
-        state_int = int(data.get("state", 2))
-        valve_int = int(data.get("valve", 1))
-
-        # pH sensor is wired inverted — calibration from two known points:
-        #   Normal water (pH 7)  → Arduino raw ≈ 14
-        #   Basic  water (pH 14) → Arduino raw ≈ 7
-        # Linear fit: corrected_pH = 21 - raw_ph
-        raw_ph = float(data["ph"])
-        corrected_ph = max(0.0, min(14.0, 21.0 - raw_ph))
-
-        return SensorReading(
-            device_id="HVS-001",
-            timestamp=datetime.utcnow(),
-            ph=corrected_ph,
-            tds=float(data["tds"]),
-            turbidity=float(data.get("turb", 0)),       # Arduino sends "turb"
-            valve_position=valve_int,
-            device_mode=_STATE_MAP.get(state_int, "active"),
-            edge_state=state_int,
-            edge_progress=int(data.get("progress", 100)),
-            edge_base_tds=float(data.get("base_tds", 0)),
-            edge_nudge=bool(data.get("nudge", 1)),
-            edge_valve=valve_int,
-            edge_confidence=int(data.get("conf", 0)),
-        )
-
-    async def write(self, data: str) -> None:
-        """Send data to Arduino (kill-switch reverse handshake)."""
-        if self._ser and self._ser.is_open:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self._ser.write, data.encode("utf-8"))
+    async def read_batch(self) -> list[Reading]:
+        batch = [await self.read()]
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def write(self, data: str, device_id: Optional[str] = None) -> None:
+        """Send data to Arduino (kill-switch reverse handshake) — one device, or all if no id."""
+        readers = self._readers.values() if device_id is None else filter(None, [self._readers.get(device_id)])
+        loop = asyncio.get_running_loop()
+        for reader in readers:
+            await loop.run_in_executor(None, reader.write, data.encode("utf-8"))
 
     async def disconnect(self) -> None:
-        if self._ser and self._ser.is_open:
-            self._ser.close()
+        for reader in self._readers.values():
+            reader.stop()
+        for reader in self._readers.values():
+            await asyncio.get_running_loop().run_in_executor(None, reader.join, 1.0)
+        self._readers.clear()
         self._connected = False
 
     def is_connected(self) -> bool:
         return self._connected
+
+    def stats(self) -> dict:
+        """Per-port ingest counters for /api/status."""
+        return {
+            "ports": [reader.stats() for reader in self._readers.values()],
+            "queued": self._queue.qsize() if self._queue else 0,
+            "dropped": self.dropped,
+        }
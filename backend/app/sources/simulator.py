@@ -4,14 +4,14 @@ Generates realistic time-series data with noise, drift, event spikes,
 and simulates the Arduino state machine (warmup → calibrating → operational).
 """
 
-import asyncio
 import math
 import random
-from datetime import datetime
+from typing import Optional
 
-from app.schemas import SensorReading
+from app.records import Reading
 from app.sources.base import DataSource
 from app.config import settings
+from app.clock import clock
 
 
 # ── Pre-defined event scenarios ──────────────────────────────
@@ -67,7 +67,7 @@ class MockSTM32(DataSource):
         if name in SCENARIOS:
             self._scenario = name
 
-    async def write(self, data: str) -> None:
+    async def write(self, data: str, device_id: Optional[str] = None) -> None:
         """Simulate kill-switch from server."""
         if data.strip() == "0":
             self._kill_switch = True
@@ -75,8 +75,8 @@ class MockSTM32(DataSource):
         elif data.strip() == "1":
             self._kill_switch = False
 
-    async def read(self) -> SensorReading:
-        await asyncio.sleep(settings.sim_interval_ms / 1000)
+    async def read(self) -> Reading:
+        await clock.tick(settings.sim_interval_ms / 1000)
         self._tick += 1
 
         base = SCENARIOS[self._scenario]
@@ -144,9 +144,9 @@ class MockSTM32(DataSource):
         mode_map = {0: "warmup", 1: "calibration", 2: "active"}
         device_mode = mode_map.get(self._edge_state, "active")
 
-        return SensorReading(
+        return Reading(
             device_id=self.device_id,
-            timestamp=datetime.utcnow(),
+            timestamp=clock.now(),
             ph=ph,
             tds=tds,
             turbidity=turbidity,
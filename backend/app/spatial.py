@@ -0,0 +1,145 @@
+"""
+HarvesSink – Spatial grid index for the municipal map.
+Uniform lat/lng grid at a handful of zoom levels. Every cell keeps running
+aggregates (count, quality counts, pH/TDS/turbidity/BOD sums, centroid) that
+are adjusted incrementally as each device reports, so bounding-box queries
+and per-zoom clusters never rescan the fleet.
+"""
+
+import math
+from typing import Iterable, Optional
+
+
+# Zoom levels with maintained cluster aggregates. Requests for other zooms
+# snap down to the nearest level; the finest level doubles as the node index.
+CLUSTER_ZOOMS = (4, 6, 8, 10, 12, 14)
+CELLS_PER_TILE = 4  # 4×4 clusters per 256px map tile (~64px per cluster)
+
+# Aggregate slots
+_COUNT, _GOOD, _CAUTION, _POOR, _PH, _TDS, _TURB, _BOD, _LAT, _LNG = range(10)
+
+BBox = tuple[float, float, float, float]  # west, south, east, north (Leaflet toBBoxString order)
+
+
+def cell_size(zoom: int) -> float:
+    """Cell edge length in degrees at a zoom level."""
+    return 360.0 / (2 ** zoom) / CELLS_PER_TILE
+
+
+def cell_of(lat: float, lng: float, zoom: int) -> tuple[int, int]:
+    size = cell_size(zoom)
+    return math.floor((lng + 180.0) / size), math.floor((lat + 90.0) / size)
+
+
+def snap_zoom(zoom: int) -> int:
+    """Largest maintained zoom level not finer than the requested one."""
+    levels = [z for z in CLUSTER_ZOOMS if z <= zoom]
+    return levels[-1] if levels else CLUSTER_ZOOMS[0]
+
+
+def _cells_in(cells: dict, bbox: Optional[BBox], zoom: int) -> Iterable[tuple[int, int]]:
+    """Keys of non-empty cells intersecting the bounding box."""
+    if bbox is None:
+        return list(cells)
+    west, south, east, north = bbox
+    x0, y0 = cell_of(south, west, zoom)
+    x1, y1 = cell_of(north, east, zoom)
+    span = (x1 - x0 + 1) * (y1 - y0 + 1)
+    if span <= len(cells):
+        return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) in cells]
+    return [key for key in cells if x0 <= key[0] <= x1 and y0 <= key[1] <= y1]
+
+
+class GridIndex:
+    """
+    Incrementally maintained multi-level grid over device positions.
+    Each update removes the device's previous contribution and adds the new
+    one, costing O(len(CLUSTER_ZOOMS)) regardless of fleet size.
+    """
+
+    def __init__(self):
+        self._levels: dict[int, dict[tuple[int, int], list[float]]] = {z: {} for z in CLUSTER_ZOOMS}
+        self._members: dict[tuple[int, int], set[str]] = {}   # finest level → device ids
+        self._state: dict[str, tuple] = {}                     # last contribution per device
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def update(
+        self,
+        device_id: str,
+        lat: float,
+        lng: float,
+        quality: int,
+        ph: float,
+        tds: float,
+        turbidity: float,
+        bod: float,
+    ):
+        """Record the latest position/values of a device (quality: 0=good, 1=caution, 2=poor)."""
+        new = (lat, lng, quality, ph, tds, turbidity, bod)
+        old = self._state.get(device_id)
+        if old is not None:
+            self._apply(device_id, old, -1)
+        self._apply(device_id, new, +1)
+        self._state[device_id] = new
+
+    def _apply(self, device_id: str, values: tuple, sign: int):
+        lat, lng, quality, ph, tds, turbidity, bod = values
+        finest = CLUSTER_ZOOMS[-1]
+        for zoom, cells in self._levels.items():
+            key = cell_of(lat, lng, zoom)
+            agg = cells.get(key)
+            if agg is None:
+                agg = cells[key] = [0.0] * 10
+            agg[_COUNT] += sign
+            agg[_GOOD + quality] += sign
+            agg[_PH] += sign * ph
+            agg[_TDS] += sign * tds
+            agg[_TURB] += sign * turbidity
+            agg[_BOD] += sign * bod
+            agg[_LAT] += sign * lat
+            agg[_LNG] += sign * lng
+            if agg[_COUNT] <= 0:
+                del cells[key]
+            if zoom == finest:
+                members = self._members.setdefault(key, set())
+                if sign > 0:
+                    members.add(device_id)
+                else:
+                    members.discard(device_id)
+                    if not members:
+                        del self._members[key]
+
+    def query(self, bbox: Optional[BBox]) -> list[str]:
+        """Device ids whose finest-level cell intersects the bounding box."""
+        ids = []
+        for key in _cells_in(self._members, bbox, CLUSTER_ZOOMS[-1]):
+            ids.extend(self._members[key])
+        return ids
+
+    def clusters(self, zoom: int, bbox: Optional[BBox] = None) -> list[dict]:
+        """Cluster aggregates at the (snapped) zoom level, optionally limited to a bounding box."""
+        zoom = snap_zoom(zoom)
+        cells = self._levels[zoom]
+        out = []
+        for key in _cells_in(cells, bbox, zoom):
+            agg = cells[key]
+            n = agg[_COUNT]
+            if agg[_POOR] > 0:
+                quality = "poor"
+            elif agg[_CAUTION] > 0:
+                quality = "caution"
+            else:
+                quality = "good"
+            out.append({
+                "lat": round(agg[_LAT] / n, 6),
+                "lng": round(agg[_LNG] / n, 6),
+                "count": int(n),
+                "quality": quality,
+                "ph": round(agg[_PH] / n, 2),
+                "tds": round(agg[_TDS] / n, 1),
+                "turbidity": round(agg[_TURB] / n, 2),
+                "bod": round(agg[_BOD] / n, 2),
+            })
+        return out
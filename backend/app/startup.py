@@ -0,0 +1,37 @@
+"""
+HarvesSink – Startup timing.
+Seconds from the moment app.main starts importing to each startup
+milestone (module imported, app ready, model loaded, first /ws/live
+packet), plus which heavy libraries are already in memory. Exposed as
+"startup" in /api/status; python -m benchmarks.startup_bench measures it
+from a cold interpreter.
+"""
+
+import sys
+import time
+
+
+# Libraries that should load lazily, not with app.main
+HEAVY_MODULES = ("pandas", "joblib", "xgboost", "sklearn", "openai")
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks: dict[str, float] = {}
+
+    def mark(self, name: str) -> bool:
+        """Record a milestone the first time it happens; True if this call recorded it."""
+        if name in self.marks:
+            return False
+        self.marks[name] = round(time.perf_counter() - self.started, 3)
+        return True
+
+    def report(self) -> dict:
+        return {
+            "seconds": dict(self.marks),
+            "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+        }
+
+
+startup = StartupTimer()
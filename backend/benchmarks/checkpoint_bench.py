@@ -0,0 +1,74 @@
+"""
+HarvesSink – Impact persistence cost vs fleet size.
+Fills an impact ledger for N devices, then compares one round of
+persistence the old way (save every device, each save reloading and
+rewriting the whole impact.json) with a Checkpointer flush that writes
+only the devices harvested since the previous checkpoint.
+
+Usage:  python -m benchmarks.checkpoint_bench [--devices 100 1000 5000] [--dirty 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="harvessink-checkpoint-")   # never touch the real store
+
+from app.checkpoint import Checkpointer
+from app.database import _load_json, _save_json, compact, save_impacts
+from app.impact import ImpactLedger
+
+LEGACY_MAX_DEVICES = 1000     # the O(devices²) path takes minutes beyond this
+
+
+def fill(devices: int, hours: int) -> ImpactLedger:
+    rng = random.Random(5)
+    ledger = ImpactLedger()
+    start = datetime(2026, 1, 1)
+    for d in range(devices):
+        lat, lng = 12.9 + rng.random(), 77.5 + rng.random()
+        for h in range(hours):
+            ledger.record_harvests(f"HVS-{d:05d}", rng.randint(0, 50), start + timedelta(hours=h), lat, lng)
+    ledger.take_dirty()
+    return ledger
+
+
+def legacy_persist(ledger: ImpactLedger) -> float:
+    t = time.perf_counter()
+    for device_id in ledger.device_ids():
+        data = _load_json("impact")
+        data[device_id] = ledger.snapshot(device_id)
+        _save_json("impact", data)
+    return time.perf_counter() - t
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Impact persistence cost vs fleet size")
+    parser.add_argument("--devices", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--dirty", type=float, default=0.05, help="share of devices harvested between checkpoints")
+    parser.add_argument("--hours", type=int, default=48, help="hours of buckets per device")
+    args = parser.parse_args()
+
+    print(f"{'devices':>8} {'dirty':>6} {'legacy ms':>10} {'checkpoint ms':>14}")
+    for n in args.devices:
+        ledger = fill(n, args.hours)
+        save_impacts({d: ledger.snapshot(d) for d in ledger.device_ids()})
+        compact("impact")
+        legacy = legacy_persist(ledger) * 1000 if n <= LEGACY_MAX_DEVICES else None
+
+        checkpointer = Checkpointer(ledger, interval_s=0)
+        dirty = random.Random(n).sample(ledger.device_ids(), max(1, int(n * args.dirty)))
+        now = datetime(2026, 1, 1) + timedelta(hours=args.hours)
+        for device_id in dirty:
+            ledger.record_harvest(device_id, now)
+        stats = asyncio.run(checkpointer.flush())
+        legacy_ms = f"{legacy:,.0f}" if legacy is not None else "—"
+        print(f"{n:>8} {stats['last_dirty']['impact']:>6} {legacy_ms:>10} {stats['last_ms']:>14,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+HarvesSink – Crisis detector benchmark.
+Feeds a simulated city-wide fleet into CrisisDetector, injects a
+neighbourhood contamination event and reports ingest throughput,
+clustering-pass latency and detection delay.
+
+Usage:  python -m benchmarks.crisis_bench [--nodes 50000] [--ticks 40]
+"""
+
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.crisis import CrisisDetector
+
+
+CENTER_LAT, CENTER_LNG = 28.6139, 77.2090
+SPREAD = 0.15           # ~15km radius
+INCIDENT_RADIUS = 0.01  # ~1km
+NOISE_POOR_RATE = 0.02  # isolated dirty sinks (must not raise a crisis)
+
+
+def run(nodes: int, ticks: int, inject_at: int, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    positions = []
+    for i in range(nodes):
+        angle = rng.uniform(0, 2 * math.pi)
+        r = SPREAD * math.sqrt(rng.random())
+        positions.append((f"HVS-{i + 1:06d}", CENTER_LAT + r * math.sin(angle), CENTER_LNG + r * math.cos(angle)))
+    incident = (CENTER_LAT + 0.05, CENTER_LNG - 0.04)
+    affected = {
+        d for d, lat, lng in positions
+        if math.hypot(lat - incident[0], lng - incident[1]) < INCIDENT_RADIUS
+    }
+
+    detector = CrisisDetector()
+    start = datetime(2026, 1, 1)
+    observe_s = 0.0
+    eval_times = []
+    detected_at = None
+    false_alarms = 0
+    next_eval = settings.crisis_eval_interval_s
+
+    for tick in range(ticks):
+        now = start + timedelta(seconds=tick)
+        t0 = time.perf_counter()
+        for device_id, lat, lng in positions:
+            if tick >= inject_at and device_id in affected:
+                quality, anomaly = "poor", True
+            elif rng.random() < NOISE_POOR_RATE:
+                quality, anomaly = "poor", False
+            else:
+                quality, anomaly = "good", False
+            detector.observe(device_id, lat, lng, now, quality, anomaly)
+        observe_s += time.perf_counter() - t0
+
+        if tick + 1 >= next_eval:
+            next_eval += settings.crisis_eval_interval_s
+            t0 = time.perf_counter()
+            events = detector.evaluate()
+            eval_times.append(time.perf_counter() - t0)
+            for event in events:
+                if event.status != "active":
+                    continue
+                hit = (event.bbox[1] <= incident[0] <= event.bbox[3]
+                       and event.bbox[0] <= incident[1] <= event.bbox[2])
+                if hit and detected_at is None and tick >= inject_at:
+                    detected_at = tick
+                elif not hit:
+                    false_alarms += 1
+
+    readings = nodes * ticks
+    eval_times.sort()
+    return {
+        "nodes": nodes,
+        "ticks": ticks,
+        "affected_nodes": len(affected),
+        "observe_readings_per_s": round(readings / observe_s),
+        "evaluate_ms_p50": round(eval_times[len(eval_times) // 2] * 1000, 2),
+        "evaluate_ms_max": round(eval_times[-1] * 1000, 2),
+        "detection_delay_s": None if detected_at is None else detected_at - inject_at + 1,
+        "false_alarms": false_alarms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark neighbourhood crisis detection")
+    parser.add_argument("--nodes", type=int, default=50_000)
+    parser.add_argument("--ticks", type=int, default=40, help="simulated seconds (one reading per node each)")
+    parser.add_argument("--inject-at", type=int, default=20, help="tick at which the incident starts")
+    args = parser.parse_args()
+
+    result = run(args.nodes, args.ticks, args.inject_at)
+    for key, value in result.items():
+        print(f"   {key:<24} {value}")
+
+
+if __name__ == "__main__":
+    main()
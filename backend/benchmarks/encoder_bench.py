@@ -0,0 +1,123 @@
+"""
+HarvesSink – Live packet / history serialization at fleet scale.
+Runs the fleet simulator through the pipeline, keeps the packets of the
+last few ticks and encodes them with:
+  • LivePacket.model_dump_json()  (models built beforehand — dump cost only)
+  • Packet.to_json()              (records → pydantic-core)
+  • PacketEncoder.encode()        (templated fragments, PACKET_ENCODER=template)
+and a /api/history page with FastAPI's default response path vs dumps().
+Every templated packet is checked against model_dump_json, plus copies
+with NaN/inf in the fields a device can send unchecked.
+
+Usage:  python -m benchmarks.encoder_bench [--devices 2000] [--ticks 200]
+"""
+
+import argparse
+import copy
+import json
+import math
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.encoder import PacketEncoder, dumps, orjson
+from app.pipeline import SensorPipeline
+from app.schemas import LivePacket
+from app.sources.fleet import FleetSimulator
+
+
+def _us_per_item(fn, items: list) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(items) * 1e6, 2)
+
+
+def collect(devices: int, ticks: int, keep_ticks: int) -> list:
+    fleet = FleetSimulator(num_devices=devices, seed=11)
+    pipeline = SensorPipeline()
+    packets = []
+    for tick in range(ticks):
+        batch = [pipeline.process(r).packet for r in fleet.step()]
+        if tick >= ticks - keep_ticks:
+            packets.extend(batch)
+    return packets
+
+
+def to_model(packet) -> LivePacket:
+    doc = packet.to_dict()
+    doc["reading"] = packet.reading.to_dict()
+    return LivePacket(**doc)
+
+
+def non_finite(packets: list) -> list:
+    """Copies with NaN/±inf in the unconstrained reading fields and the outputs."""
+    out = []
+    for k, value in enumerate((math.nan, math.inf, -math.inf)):
+        for packet in packets[k::max(1, len(packets) // 30)][:10]:
+            packet = copy.deepcopy(packet)
+            r = packet.reading
+            r.gps_lat, r.gps_lng, r.edge_base_tds = value, value, value
+            packet.inference.bod_predicted = packet.inference.cod_predicted = value
+            out.append(packet)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Packet / history serialization")
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=200, help="ticks simulated (devices calibrate in ~60)")
+    parser.add_argument("--keep-ticks", type=int, default=5, help="ticks of packets encoded")
+    parser.add_argument("--history-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    packets = collect(args.devices, args.ticks, args.keep_ticks)
+    models = [to_model(p) for p in packets]
+    library = "orjson" if orjson is not None else "pydantic-core"
+    print(f"📦 {len(packets):,} packets from {args.devices:,} devices (JSON library: {library})\n")
+
+    # Warm the templates on one tick, then check every packet byte for byte
+    templated = PacketEncoder()
+    for p in packets[:args.devices]:
+        templated.encode(p)
+    mismatches = sum(templated.encode(p) != m.model_dump_json() for p, m in zip(packets, models))
+    odd = non_finite(packets)
+    odd_mismatches = sum(
+        templated.encode(p) != m.model_dump_json() or p.to_json() != m.model_dump_json()
+        for p, m in zip(odd, map(to_model, odd))
+    )
+
+    results = {
+        "LivePacket.model_dump_json": _us_per_item(LivePacket.model_dump_json, models),
+        "Packet.to_json": _us_per_item(lambda p: p.to_json(), packets),
+        "PacketEncoder.encode": _us_per_item(templated.encode, packets),
+    }
+    base = results["LivePacket.model_dump_json"]
+    print("WebSocket packet (µs per packet)")
+    for name, us in results.items():
+        print(f"  {name:<28} {us:>7}   ×{base / us:.2f}")
+    print(f"  byte mismatches vs model_dump_json: {mismatches}")
+    print(f"  NaN/inf packets: {len(odd)}, mismatches (template or to_json): {odd_mismatches}")
+    print(f"  template stats: {templated.stats()}")
+
+    rows = [
+        {
+            "device_id": p.reading.device_id, "timestamp": p.reading.timestamp.isoformat(),
+            "ph": p.reading.ph, "tds": p.reading.tds, "turbidity": p.reading.turbidity,
+            "bod": p.inference.bod_predicted, "cod": p.inference.cod_predicted,
+            "valve_decision": p.valve_decision, "anomaly": p.inference.anomaly_flag,
+        }
+        for p in packets[:args.history_rows]
+    ]
+    default_ms = _us_per_item(lambda r: json.dumps(jsonable_encoder(r)).encode(), [rows]) / 1000
+    fast_ms = _us_per_item(dumps, [rows]) / 1000
+    print(f"\n/api/history ({len(rows)} rows, ms per response)")
+    print(f"  {'FastAPI default':<28} {default_ms:>7.2f}")
+    print(f"  {'dumps()':<28} {fast_ms:>7.2f}   ×{default_ms / fast_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+HarvesSink – Loopback client simulator for the network ingest gateway.
+Starts a NetworkGateway on localhost and connects N simulated edge devices
+(TCP and/or UDP) that send the Arduino JSON contract — one packet per line,
+or line-delimited batches — then reports delivered readings/s, drops and
+backpressure behaviour.
+
+Run against a live server instead with --target host (DATA_SOURCE=gateway).
+
+Usage:  python -m benchmarks.gateway_load [--tcp 200] [--udp 50] [--seconds 10] [--batch 20]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.sources.gateway import NetworkGateway
+
+
+def _packet(device_id: str, rng: random.Random) -> dict:
+    return {
+        "device_id": device_id,
+        "ph": round(rng.gauss(13.8, 0.1), 2),       # raw (inverted probe) ≈ pH 7.2
+        "tds": round(rng.gauss(180, 8)),
+        "turb": round(rng.gauss(1800, 40)),
+        "valve": 1, "state": 2, "progress": 100, "base_tds": 180, "nudge": 1, "conf": 0,
+    }
+
+
+def _payload(device_id: str, rng: random.Random, batch: int) -> bytes:
+    if batch <= 1:
+        return json.dumps(_packet(device_id, rng)).encode() + b"\n"
+    return json.dumps([_packet(device_id, rng) for _ in range(batch)]).encode() + b"\n"
+
+
+async def tcp_device(host: str, port: int, device_id: str, rate_hz: float, batch: int, stop: float, sent: list, rejected: list):
+    rng = random.Random(device_id)
+    reader, writer = await asyncio.open_connection(host, port)
+    count = 0
+    try:
+        writer.write(json.dumps({"device_id": device_id}).encode() + b"\n")   # hello
+        while time.monotonic() < stop:
+            writer.write(_payload(device_id, rng, batch))
+            await writer.drain()                # honours gateway backpressure
+            count += max(1, batch)
+            await asyncio.sleep(1 / rate_hz if rate_hz > 0 else 0)
+    except ConnectionError:
+        rejected.append(device_id)              # over the gateway's connection limit
+    finally:
+        writer.close()
+        sent.append(count)
+
+
+async def udp_device(host: str, port: int, device_id: str, rate_hz: float, batch: int, stop: float, sent: list):
+    rng = random.Random(device_id)
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+    count = 0
+    while time.monotonic() < stop:
+        transport.sendto(_payload(device_id, rng, min(batch, 10)))   # keep datagrams under the MTU
+        count += max(1, min(batch, 10))
+        await asyncio.sleep(1 / rate_hz if rate_hz > 0 else 0)
+    transport.close()
+    sent.append(count)
+
+
+async def run(args) -> dict:
+    gateway = None
+    host = args.target
+    tcp_port, udp_port = args.tcp_port, args.udp_port
+    if host is None:
+        host = "127.0.0.1"
+        gateway = NetworkGateway(host=host, tcp_port=0, udp_port=0)
+        await gateway.connect()
+        tcp_port, udp_port = gateway.tcp_port, gateway.udp_port
+
+    stop = time.monotonic() + args.seconds
+    sent: list[int] = []
+    rejected: list[str] = []
+    clients = [
+        tcp_device(host, tcp_port, f"NET-T{i + 1:04d}", args.rate, args.batch, stop, sent, rejected)
+        for i in range(args.tcp)
+    ] + [
+        udp_device(host, udp_port, f"NET-U{i + 1:04d}", args.rate, args.batch, stop, sent) for i in range(args.udp)
+    ]
+
+    received = 0
+    devices = set()
+
+    async def consume():
+        nonlocal received
+        while True:
+            batch = await gateway.read_batch()
+            received += len(batch)
+            devices.update(r.device_id for r in batch)
+            if args.slow_ms:
+                await asyncio.sleep(args.slow_ms / 1000)   # simulate a slow pipeline → backpressure
+
+    consumer = asyncio.create_task(consume()) if gateway else None
+    t0 = time.perf_counter()
+    await asyncio.gather(*clients)
+    await asyncio.sleep(0.5)   # let in-flight data land
+    elapsed = time.perf_counter() - t0
+    if consumer:
+        consumer.cancel()
+
+    # "sent" counts what the kernel accepted; with a slow consumer the rest
+    # is still in socket buffers when the clients stop (backpressure at work)
+    result = {"sent": sum(sent), "sent_per_s": round(sum(sent) / elapsed), "clients_rejected": len(rejected)}
+    if gateway:
+        result.update(
+            received=received,
+            received_per_s=round(received / elapsed),
+            devices_seen=len(devices),
+            **gateway.stats(),
+        )
+        await gateway.disconnect()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Network gateway loopback load test")
+    parser.add_argument("--tcp", type=int, default=200, help="TCP devices")
+    parser.add_argument("--udp", type=int, default=50, help="UDP devices")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rate", type=float, default=10.0, help="sends per device per second (0 = flat out)")
+    parser.add_argument("--batch", type=int, default=1, help="packets per line (JSON array when > 1)")
+    parser.add_argument("--slow-ms", type=float, default=0.0, help="consumer delay per batch")
+    parser.add_argument("--target", help="send to a running gateway on this host instead")
+    parser.add_argument("--tcp-port", type=int, default=7070)
+    parser.add_argument("--udp-port", type=int, default=7071)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    for key, value in result.items():
+        print(f"  {key:<18} {value}")
+
+
+if __name__ == "__main__":
+    main()
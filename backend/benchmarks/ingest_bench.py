@@ -0,0 +1,134 @@
+"""
+HarvesSink – Bulk ingest throughput.
+Builds an NDJSON backfill (N devices × hours of buffered readings, with a
+few stuck and contaminated sinks), then times each stage of the batch
+path on its own — parse, validate, pipeline, store — and the full
+POST /api/ingest round-trip through the ASGI app.
+
+Target: 100k readings/s on a laptop.
+
+Usage:  python -m benchmarks.ingest_bench [--readings 200000] [--devices 100] [--target http://host:8000]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="harvessink-ingest-"))
+os.environ["DATA_SOURCE"] = "simulation"     # the in-process app must not open serial ports
+
+
+def build_body(readings: int, devices: int, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    per_device = max(1, readings // devices)
+    lines = []
+    for k in range(per_device):
+        ts = (start + timedelta(seconds=2 * k)).isoformat()
+        for d in range(devices):
+            stuck = d % 17 == 0
+            dirty = d % 23 == 0 and k > per_device // 2
+            lines.append(json.dumps({
+                "device_id": f"BF-{d:04d}",
+                "timestamp": ts,
+                "ph": 7.2 if stuck else round(rng.gauss(6.1 if dirty else 7.2, 0.2), 2),
+                "tds": 180.0 if stuck else round(rng.gauss(900 if dirty else 180, 15), 1),
+                "turbidity": round(abs(rng.gauss(40 if dirty else 2, 0.8)), 2),
+                "gps_lat": 12.97 + d * 1e-4,
+                "gps_lng": 77.59 + d * 1e-4,
+                "edge_valve": 1,
+            }))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _rate(n: int, seconds: float) -> str:
+    return f"{n / seconds:>12,.0f} readings/s  ({seconds * 1000:,.0f} ms)"
+
+
+def run_stages(body: bytes, batch_size: int) -> dict:
+    from app.ingest import split_records, validate
+    from app.pipeline import SensorPipeline
+    from app.database import save_readings, MAX_READINGS
+
+    pipeline = SensorPipeline()
+    pipeline.engine.load_model()
+    lines = body.split(b"\n")
+    chunks = [b"\n".join(lines[i:i + batch_size]) for i in range(0, len(lines), batch_size)]
+    n = sum(1 for line in lines if line)
+
+    timings = dict.fromkeys(("parse", "validate", "pipeline", "store"), 0.0)
+    rows = []
+    offset = 0
+    for chunk in chunks:
+        t = time.perf_counter()
+        records = split_records(chunk)
+        timings["parse"] += time.perf_counter() - t
+        t = time.perf_counter()
+        batch = validate(records, offset=offset)
+        timings["validate"] += time.perf_counter() - t
+        offset += len(records)
+        t = time.perf_counter()
+        rows += pipeline.process_batch(batch, keep_last=MAX_READINGS).rows
+        timings["pipeline"] += time.perf_counter() - t
+    t = time.perf_counter()
+    save_readings(rows)
+    timings["store"] = time.perf_counter() - t
+    timings["total"] = sum(timings.values())
+    return {"readings": n, **timings}
+
+
+def run_endpoint(body: bytes, target: str = None) -> dict:
+    if target:
+        import urllib.request
+        req = urllib.request.Request(
+            target.rstrip("/") + "/api/ingest", data=body, headers={"Content-Type": "application/x-ndjson"},
+        )
+        t = time.perf_counter()
+        with urllib.request.urlopen(req) as resp:
+            result = json.loads(resp.read())
+        return {**result, "round_trip_s": time.perf_counter() - t}
+
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        t = time.perf_counter()
+        resp = client.post("/api/ingest", content=body, headers={"Content-Type": "application/x-ndjson"})
+        elapsed = time.perf_counter() - t
+    resp.raise_for_status()
+    return {**resp.json(), "round_trip_s": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ingest throughput")
+    parser.add_argument("--readings", type=int, default=200_000)
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=20_000)
+    parser.add_argument("--target", help="POST to a running server instead of the in-process app")
+    parser.add_argument("--skip-endpoint", action="store_true")
+    args = parser.parse_args()
+
+    body = build_body(args.readings, args.devices)
+    print(f"📦 {args.readings:,} readings, {args.devices} devices, {len(body) / 1e6:.1f} MB NDJSON\n")
+
+    if not args.target:
+        stages = run_stages(body, args.batch_size)
+        n = stages.pop("readings")
+        print("Stages")
+        for key, seconds in stages.items():
+            print(f"  {key:<10} {_rate(n, seconds)}")
+
+    if not args.skip_endpoint:
+        result = run_endpoint(body, args.target)
+        print("\nPOST /api/ingest")
+        print(f"  {'round trip':<10} {_rate(result['accepted'] + result['rejected'], result['round_trip_s'])}")
+        for key in ("accepted", "rejected", "devices", "decisions", "anomalies", "kill_switch", "readings_per_s"):
+            print(f"  {key:<10} {result[key]}")
+
+
+if __name__ == "__main__":
+    main()
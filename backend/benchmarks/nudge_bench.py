@@ -0,0 +1,80 @@
+"""
+HarvesSink – Nudge serving under dashboard polling.
+D dashboards poll /api/nudge for the same M devices every round while the
+readings drift a little. Compares one backend call per request (the old
+generate_nudge behaviour) with NudgeService (bucket cache + single-flight),
+both on the local stand-in backend with simulated LLM latency.
+
+Usage:  python -m benchmarks.nudge_bench [--devices 200] [--dashboards 5] [--rounds 10] [--latency-ms 300]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from app.ai.llm_nudge import LocalBackend, NudgeService, classify_activity
+from app.records import Reading
+
+
+def drift(readings: list[Reading], rng: random.Random) -> list[Reading]:
+    return [
+        Reading(device_id=r.device_id, ph=r.ph + rng.gauss(0, 0.03),
+                tds=max(0.0, r.tds + rng.gauss(0, 5)), turbidity=max(0.0, r.turbidity + rng.gauss(0, 0.2)))
+        for r in readings
+    ]
+
+
+async def timed(coro, latencies: list[float]):
+    started = time.perf_counter()
+    await coro
+    latencies.append(time.perf_counter() - started)
+
+
+async def run(mode: str, args) -> dict:
+    rng = random.Random(3)
+    readings = [
+        Reading(device_id=f"HVS-{i:04d}", ph=rng.uniform(6.5, 8.0), tds=rng.uniform(150, 500), turbidity=rng.uniform(0.5, 12))
+        for i in range(args.devices)
+    ]
+    backend = LocalBackend(args.latency_ms)
+    service = NudgeService(backend)
+    latencies: list[float] = []
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        readings = drift(readings, rng)
+        if mode == "direct":
+            calls = [backend.generate(r, classify_activity(r)) for r in readings for _ in range(args.dashboards)]
+        else:
+            calls = [service.get(r) for r in readings for _ in range(args.dashboards)]
+        await asyncio.gather(*(timed(c, latencies) for c in calls))
+        await asyncio.sleep(args.interval_ms / 1000)
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "backend_calls": backend.calls,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "wall_s": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nudge serving under dashboard polling")
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--dashboards", type=int, default=5, help="clients polling each device")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--interval-ms", type=float, default=100, help="pause between polling rounds")
+    parser.add_argument("--latency-ms", type=float, default=300, help="simulated LLM latency")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'requests':>9} {'LLM calls':>10} {'p50 ms':>8} {'p99 ms':>8} {'wall s':>7}")
+    for mode in ("direct", "service"):
+        r = asyncio.run(run(mode, args))
+        print(f"{mode:<8} {r['requests']:>9,} {r['backend_calls']:>10,} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['wall_s']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
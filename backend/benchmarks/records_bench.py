@@ -0,0 +1,115 @@
+"""
+HarvesSink – Validated models vs internal records on the per-reading path.
+Builds what one reading costs on the live stream — the reading, its
+inference result and the WebSocket packet, serialized once — with the
+pydantic schemas (validated) and with the slotted records in
+app/records.py, and reports CPU time and bytes held per reading.
+
+Usage:  python -m benchmarks.records_bench [--readings 20000]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.records import Reading, Inference, Packet
+from app.schemas import SensorReading, InferenceResult, LivePacket
+from app.ai.anomaly import AnomalyVerdict
+
+
+def _fields(n: int) -> list[dict]:
+    rng = random.Random(3)
+    now = datetime.utcnow()
+    return [
+        {
+            "device_id": f"HVS-{i % 500:03d}", "timestamp": now,
+            "ph": round(rng.gauss(7.2, 0.2), 2), "tds": round(rng.gauss(180, 10), 1),
+            "turbidity": round(abs(rng.gauss(2, 1)), 2), "gps_lat": 12.97, "gps_lng": 77.59,
+            "valve_position": 1, "device_mode": "active", "edge_state": 2, "edge_progress": 100,
+            "edge_base_tds": 180.0, "edge_nudge": True, "edge_valve": 1, "edge_confidence": 0,
+        }
+        for i in range(n)
+    ]
+
+
+def build_validated(fields: dict, verdict: AnomalyVerdict) -> LivePacket:
+    reading = SensorReading(**fields)
+    inference = InferenceResult(bod_predicted=4.1, cod_predicted=9.02)
+    return LivePacket(
+        reading=reading, inference=inference, valve_decision="harvest", calibration_progress=100.0,
+        liters_saved=12.5, money_saved=6.25, lake_impact_score=0.13, anomaly_tiers=verdict.to_dict(),
+    )
+
+
+def build_records(fields: dict, verdict: AnomalyVerdict) -> Packet:
+    reading = Reading(**fields)
+    inference = Inference(bod_predicted=4.1, cod_predicted=9.02)
+    return Packet(
+        reading=reading, inference=inference, valve_decision="harvest", calibration_progress=100.0,
+        liters_saved=12.5, money_saved=6.25, lake_impact_score=0.13, verdict=verdict,
+    )
+
+
+def measure(build, encode, rows: list[dict], verdict: AnomalyVerdict) -> dict:
+    start = time.perf_counter()
+    for fields in rows:
+        build(fields, verdict)
+    build_us = (time.perf_counter() - start) / len(rows) * 1e6
+    packets = [build(fields, verdict) for fields in rows]
+    start = time.perf_counter()
+    for packet in packets:
+        encode(packet)
+    encode_us = (time.perf_counter() - start) / len(rows) * 1e6
+
+    # Bytes held per reading by its reading/inference/packet objects
+    sample = rows[:2000]
+    tracemalloc.start()
+    kept = [build(fields, verdict) for fields in sample]
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return {
+        "build_us": round(build_us, 2),
+        "encode_us": round(encode_us, 2),
+        "us_per_reading": round(build_us + encode_us, 2),
+        "bytes_per_reading": round(held / len(sample)),
+    }
+
+
+def object_sizes() -> dict:
+    import sys
+    fields = _fields(1)[0]
+    model = SensorReading(**fields)
+    record = Reading(**fields)
+    return {
+        "SensorReading": sys.getsizeof(model) + sys.getsizeof(model.__dict__),
+        "Reading": sys.getsizeof(record),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validated models vs internal records")
+    parser.add_argument("--readings", type=int, default=20000)
+    args = parser.parse_args()
+
+    rows = _fields(args.readings)
+    verdict = AnomalyVerdict()
+    assert build_validated(rows[0], verdict).model_dump_json() == build_records(rows[0], verdict).to_json(), \
+        "records must serialize identically"
+
+    before = measure(build_validated, LivePacket.model_dump_json, rows, verdict)
+    after = measure(build_records, Packet.to_json, rows, verdict)
+    print(f"Per reading: reading + inference + packet, then JSON ({args.readings:,} readings)\n")
+    print(f"  {'':<22} {'build µs':>9} {'JSON µs':>8} {'total µs':>9} {'bytes held':>11}")
+    for name, r in (("pydantic (validated)", before), ("records", after)):
+        print(f"  {name:<22} {r['build_us']:>9} {r['encode_us']:>8} {r['us_per_reading']:>9} {r['bytes_per_reading']:>11}")
+    print(f"\n  CPU   −{1 - after['us_per_reading'] / before['us_per_reading']:.0%}")
+    print(f"  bytes −{1 - after['bytes_per_reading'] / before['bytes_per_reading']:.0%}")
+    sizes = object_sizes()
+    print(f"\n  object size: SensorReading {sizes['SensorReading']} B, Reading {sizes['Reading']} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+HarvesSink – Sharded pipeline throughput and rebalancing cost.
+Runs the same fleet batches through the in-process SensorPipeline and
+through ShardPool with N pipeline processes (packets encoded either way),
+then shows how many devices change shard when one is added: consistent
+hashing vs. hash(device) % N.
+
+Speed-up needs free cores — with N shards on fewer than N+1 cores the
+pipe round-trips only add overhead.
+
+Usage:  python -m benchmarks.shard_bench [--devices 5000] [--ticks 20] [--shards 2 4]
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import tempfile
+import time
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="harvessink-shards-")   # never touch the real store
+
+from app.calibration import CalibrationEngine
+from app.encoder import encode_packet
+from app.impact import ImpactLedger
+from app.pipeline import SensorPipeline
+from app.shards import HashRing, ShardPool, _point
+from app.sources.fleet import FleetSimulator
+
+
+async def fleet_batches(devices: int, ticks: int) -> list:
+    source = FleetSimulator(num_devices=devices, seed=11)
+    await source.connect()
+    batches = []
+    while len(batches) < ticks:
+        batches.append(await source.read_batch())
+    return batches
+
+
+def run_local(batches: list) -> float:
+    pipeline = SensorPipeline()
+    pipeline.engine.load_model()
+    started = time.perf_counter()
+    for batch in batches:
+        for reading in batch:
+            encode_packet(pipeline.process(reading).packet)
+    return time.perf_counter() - started
+
+
+async def run_sharded(batches: list, shards: int) -> float:
+    pool = ShardPool(shards)
+    await pool.start(CalibrationEngine(), ImpactLedger())
+    try:
+        started = time.perf_counter()
+        for batch in batches:
+            await pool.process(batch, False, True)
+        return time.perf_counter() - started
+    finally:
+        pool.stop()
+
+
+def moved(ids: list[str], before: int, after: int, vnodes: int) -> tuple[float, float]:
+    """Share of devices that change shard going before → after: (hash ring, modulo)."""
+    ring_a, ring_b = HashRing(before, vnodes), HashRing(after, vnodes)
+    ring = sum(ring_a.owner(d) != ring_b.owner(d) for d in ids)
+    modulo = sum(_point(d) % before != _point(d) % after for d in ids)
+    return ring / len(ids), modulo / len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded pipeline throughput and rebalancing cost")
+    parser.add_argument("--devices", type=int, default=5000)
+    parser.add_argument("--ticks", type=int, default=20, help="fleet ticks (one reading per device each)")
+    parser.add_argument("--shards", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--vnodes", type=int, default=128)
+    args = parser.parse_args()
+
+    batches = asyncio.run(fleet_batches(args.devices, args.ticks))
+    readings = sum(len(b) for b in batches)
+    print(f"{readings:,} readings from {args.devices:,} devices, {os.cpu_count()} CPU(s)\n")
+
+    print(f"{'pipeline':<12} {'seconds':>8} {'readings/s':>11}")
+    elapsed = run_local(copy.deepcopy(batches))
+    print(f"{'in-process':<12} {elapsed:>8.2f} {readings / elapsed:>11,.0f}")
+    for n in args.shards:
+        elapsed = asyncio.run(run_sharded(copy.deepcopy(batches), n))
+        print(f"{f'{n} shards':<12} {elapsed:>8.2f} {readings / elapsed:>11,.0f}")
+
+    ids = [f"HVS-{i:06d}" for i in range(100_000)]
+    print(f"\n{'resize':<8} {'ring moves':>11} {'modulo moves':>13} {'ideal':>7}")
+    for n in args.shards:
+        ring, modulo = moved(ids, n, n + 1, args.vnodes)
+        print(f"{f'{n}→{n + 1}':<8} {ring:>11.1%} {modulo:>13.1%} {1 / (n + 1):>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
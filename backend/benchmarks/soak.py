@@ -0,0 +1,80 @@
+"""
+HarvesSink – Fast-clock soak run.
+Drives a simulated source through the full SensorPipeline on the virtual
+clock (CLOCK_MODE=fast), so days or months of sink activity — calibration,
+scenario changes, impact accumulation — run in minutes.
+
+Usage:  python -m benchmarks.soak [--days 30] [--source fleet --nodes 100]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ["CLOCK_MODE"] = "fast"
+
+from app.config import settings
+from app.clock import clock
+from app.pipeline import SensorPipeline
+from app.sources.fleet import FleetSimulator
+from app.sources.simulator import MockSTM32, SCENARIOS
+
+
+async def run(source_name: str, days: float, nodes: int, scenario_every_h: float) -> dict:
+    source = FleetSimulator(num_devices=nodes, seed=42) if source_name == "fleet" else MockSTM32()
+    pipeline = SensorPipeline()
+    await source.connect()
+
+    # Cycle household activities on the simulated clock
+    async def activities():
+        names = list(SCENARIOS)
+        i = 0
+        while True:
+            await clock.sleep(scenario_every_h * 3600)
+            i += 1
+            source.set_scenario(names[i % 2])   # alternate clean ↔ dishwashing
+
+    switcher = asyncio.create_task(activities()) if scenario_every_h > 0 else None
+    horizon = days * 86400
+    readings = 0
+    decisions = {"harvest": 0, "caution": 0, "drain": 0}
+    t0 = time.perf_counter()
+    while clock.elapsed() < horizon:
+        for reading in await source.read_batch():
+            result = pipeline.process(reading)
+            decisions[result.decision] += 1
+            readings += 1
+    wall = time.perf_counter() - t0
+    if switcher:
+        switcher.cancel()
+
+    return {
+        "simulated_days": days,
+        "sim_start": clock.start.isoformat(),
+        "sim_end": clock.now().isoformat(),
+        "wall_s": round(wall, 2),
+        "speedup": round(clock.elapsed() / wall),
+        "readings": readings,
+        "readings_per_s": round(readings / wall),
+        "decisions": decisions,
+        "liters_saved": round(pipeline.impact.fleet_totals()["liters_saved"], 1),
+        "calibrated_devices": sum(1 for b in pipeline.calibration._baselines.values() if b.is_complete),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast-clock soak run")
+    parser.add_argument("--days", type=float, default=1.0)
+    parser.add_argument("--source", choices=("simulation", "fleet"), default="simulation")
+    parser.add_argument("--nodes", type=int, default=settings.sim_num_nodes)
+    parser.add_argument("--scenario-every-h", type=float, default=3.0, help="hours between activity changes (0 = off)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.source, args.days, args.nodes, args.scenario_every_h))
+    for key, value in result.items():
+        print(f"  {key:<20} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+HarvesSink – Cold-start time to first packet.
+Starts a fresh interpreter per run that imports app.main, starts the app
+(TestClient, simulation source, empty data dir) and waits for the first
+/ws/live packet, then reports the startup milestones from /api/status and
+which heavy libraries were loaded by then. Also lists the slowest imports
+under app.main (python -X importtime).
+
+With a model in the registry, "model_loaded" usually lands after
+"first_packet" — the first readings are served by the formula fallback.
+
+Usage:  python -m benchmarks.startup_bench [--runs 5] [--top 12]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+
+with TestClient(app) as client:
+    with client.websocket_connect("/ws/live") as ws:
+        while "topic" in json.loads(ws.receive_text()):
+            pass
+    status = client.get("/api/status").json()
+    print("STARTUP", json.dumps(status["startup"]))
+"""
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    env["DATA_DIR"] = tempfile.mkdtemp(prefix="harvessink-startup-")   # never touch the real store
+    env["DATA_SOURCE"] = "simulation"
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def cold_start() -> tuple[float, dict]:
+    """(wall seconds from process spawn to the first packet, the app's startup report)."""
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=child_env(),
+                         capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - started
+    report = next(line for line in out.splitlines() if line.startswith("STARTUP "))
+    return wall, json.loads(report[len("STARTUP "):])
+
+
+def slowest_imports(top: int) -> list[tuple[int, str]]:
+    """(cumulative µs, module) of the slowest imports up to two levels below app.main."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BACKEND_DIR,
+                         env=child_env(), capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            # depth = indentation (two spaces per level) of the module name
+            depth = (len(name) - len(name.lstrip())) // 2
+            if depth <= 2:
+                rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time to first packet")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="slowest imports to list")
+    args = parser.parse_args()
+
+    runs = [cold_start() for _ in range(args.runs)]
+    walls = [wall for wall, _ in runs]
+    milestones = {}
+    for _, report in runs:
+        for name, seconds in report["seconds"].items():
+            milestones.setdefault(name, []).append(seconds)
+
+    print(f"{args.runs} cold starts, {os.cpu_count()} CPU(s)\n")
+    print(f"{'milestone':<16} {'median s':>9} {'max s':>7}")
+    print(f"{'process total':<16} {statistics.median(walls):>9.3f} {max(walls):>7.3f}   (wall: spawn → exit, incl. interpreter start and shutdown)")
+    for name, values in sorted(milestones.items(), key=lambda kv: statistics.median(kv[1])):
+        print(f"{name:<16} {statistics.median(values):>9.3f} {max(values):>7.3f}")
+    loaded = sorted({m for _, report in runs for m in report["heavy_modules_loaded"]})
+    print(f"\nheavy modules loaded by the first packet: {', '.join(loaded) or 'none'}")
+
+    print(f"\n{'slowest imports (cumulative)':<40} {'ms':>7}")
+    for micros, name in slowest_imports(args.top):
+        print(f"{name:<40} {micros / 1000:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+HarvesSink – End-to-end benchmark suite.
+Micro-benchmarks the per-reading components, measures pipeline memory per
+device, then starts the API (fleet simulator source) in a subprocess with
+local WebSocket clients to measure readings/sec and sensor→client latency.
+Writes a JSON report and can fail on regressions against a saved baseline.
+
+Usage:
+  python -m benchmarks.suite --output report.json
+  python -m benchmarks.suite --baseline baseline.json --tolerance 0.15
+  python -m benchmarks.suite --skip-e2e --save-baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmarks never touch the real JSON store
+_TMP_DATA = tempfile.mkdtemp(prefix="harvessink-bench-")
+os.environ.setdefault("DATA_DIR", _TMP_DATA)
+os.environ.setdefault("DATA_SOURCE", "simulation")
+
+
+# ── Helpers ─────────────────────────────────────────────────
+def _time_per_call(fn: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """Median µs per call over `repeat` runs of `number` calls."""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter_ns() - t0) / number / 1000)
+    return round(statistics.median(runs), 3)
+
+
+def _reading(i: int = 0, ph: float = 7.2, tds: float = 180.0, turbidity: float = 1.2):
+    from app.records import Reading
+    return Reading(device_id=f"HVS-{i + 1:03d}", ph=ph, tds=tds, turbidity=turbidity)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[k]
+
+
+# ── Micro-benchmarks ────────────────────────────────────────
+def run_micro(number: int) -> dict:
+    from app.ai.inference import InferenceEngine
+    from app.ai.anomaly import QuadGuardEngine
+    from app.calibration import CalibrationEngine, ValveController
+    from app.records import Packet
+    from app import database
+
+    reading = _reading()
+    engine = InferenceEngine()
+    engine.load_model()
+    quad_guard = QuadGuardEngine()
+    valve = ValveController()
+    calibration = CalibrationEngine()
+    for _ in range(60):
+        calibration.feed_sample(_reading(tds=180.0 + _ % 7))
+    baseline = calibration.get_baseline(reading.device_id)
+    inference = engine.predict(reading)
+    verdict = quad_guard.evaluate(reading, baseline)
+    packet = Packet(
+        reading=reading, inference=inference, valve_decision="harvest",
+        calibration_progress=100, verdict=verdict,
+    )
+    row = {
+        "device_id": reading.device_id, "timestamp": reading.timestamp.isoformat(),
+        "ph": reading.ph, "tds": reading.tds, "turbidity": reading.turbidity,
+        "bod": inference.bod_predicted, "cod": inference.cod_predicted,
+        "valve_decision": "harvest", "anomaly": False,
+    }
+
+    return {
+        "inference_predict_us": _time_per_call(lambda: engine.predict(reading), number),
+        "quadguard_evaluate_us": _time_per_call(lambda: quad_guard.evaluate(reading, baseline), number),
+        "valve_decide_us": _time_per_call(lambda: valve.decide(reading, baseline), number),
+        "save_reading_us": _time_per_call(lambda: database.save_reading(row), max(10, number // 50), repeat=3),
+        "packet_json_us": _time_per_call(packet.to_json, number),
+    }
+
+
+# ── Memory per device ───────────────────────────────────────
+def run_memory(devices: int, readings_per_device: int = 70) -> dict:
+    """Steady-state pipeline + municipal state per device (after calibration and full guard buffers)."""
+    from app.pipeline import SensorPipeline
+    from app.municipal import MunicipalAggregator
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    pipeline = SensorPipeline()
+    municipal = MunicipalAggregator()
+    for _ in range(readings_per_device):
+        for i in range(devices):
+            result = pipeline.process(_reading(i, tds=180.0 + (i + _) % 9))
+            municipal.update(result.reading, result.inference, result.decision)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return {
+        "devices": devices,
+        "bytes_per_device": round(allocated / devices),
+    }
+
+
+# ── End-to-end: API subprocess + WebSocket clients ──────────
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _client(url: str, duration: float, latencies: list[float], counts: list[int]):
+    import websockets
+    received = 0
+    async with websockets.connect(url, max_size=None) as ws:
+        deadline = time.monotonic() + duration
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                text = await asyncio.wait_for(ws.recv(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            now = datetime.utcnow()
+            message = json.loads(text)
+            if "topic" in message:
+                continue
+            sent = datetime.fromisoformat(message["reading"]["timestamp"])
+            latencies.append((now - sent).total_seconds() * 1000)
+            received += 1
+    counts.append(received)
+
+
+def run_e2e(devices: int, clients: int, duration: float, interval_ms: int, warmup: float) -> dict:
+    import httpx
+
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATA_SOURCE="fleet",
+        SIM_NUM_NODES=str(devices),
+        SIM_INTERVAL_MS=str(interval_ms),
+        DATA_DIR=tempfile.mkdtemp(prefix="harvessink-e2e-"),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        for _ in range(200):
+            try:
+                if httpx.get(base + "/", timeout=0.5).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        else:
+            raise RuntimeError("API did not start")
+        time.sleep(warmup)
+
+        latencies: list[float] = []
+        counts: list[int] = []
+
+        async def _all():
+            await asyncio.gather(*(
+                _client(f"ws://127.0.0.1:{port}/ws/live", duration, latencies, counts) for _ in range(clients)
+            ))
+
+        asyncio.run(_all())
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    per_client = statistics.mean(counts) if counts else 0
+    return {
+        "devices": devices,
+        "clients": clients,
+        "duration_s": duration,
+        "readings_per_s": round(per_client / duration, 1),
+        "latency_ms_p50": round(_percentile(latencies, 50), 2),
+        "latency_ms_p99": round(_percentile(latencies, 99), 2),
+    }
+
+
+# ── Report / baseline comparison ────────────────────────────
+def _lower_is_better(metric: str) -> Optional[bool]:
+    if metric.endswith("_per_s"):
+        return False
+    if metric.endswith("_us") or "_ms" in metric or metric.startswith("bytes"):
+        return True
+    return None  # informational (counts, settings)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Human-readable regressions of `report` vs `baseline` beyond the tolerance."""
+    regressions = []
+    for section, metrics in report.items():
+        if section == "meta" or section not in baseline:
+            continue
+        for metric, value in metrics.items():
+            old = baseline[section].get(metric)
+            lower = _lower_is_better(metric)
+            if lower is None or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            if (lower and change > tolerance) or (not lower and change < -tolerance):
+                regressions.append(f"{section}.{metric}: {old} → {value} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HarvesSink benchmark suite")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="compare against a saved report; exit 1 on regressions")
+    parser.add_argument("--save-baseline", help="also write the report as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown (default 10%%)")
+    parser.add_argument("--number", type=int, default=2000, help="calls per micro-benchmark run")
+    parser.add_argument("--memory-devices", type=int, default=500)
+    parser.add_argument("--devices", type=int, default=1000, help="fleet size for the e2e run")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--interval-ms", type=int, default=500)
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds before clients connect")
+    parser.add_argument("--skip-e2e", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+    }
+    print("⏱️  Micro-benchmarks...")
+    report["micro"] = run_micro(args.number)
+    print("🧮 Memory per device...")
+    report["memory"] = run_memory(args.memory_devices)
+    if not args.skip_e2e:
+        print(f"🌐 End-to-end: {args.devices} devices, {args.clients} clients, {args.duration:g}s...")
+        report["e2e"] = run_e2e(args.devices, args.clients, args.duration, args.interval_ms, args.warmup)
+
+    for section, metrics in report.items():
+        if section == "meta":
+            continue
+        print(f"   [{section}]")
+        for metric, value in metrics.items():
+            print(f"     {metric:<28} {value}")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"   Report saved → {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) vs {args.baseline}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
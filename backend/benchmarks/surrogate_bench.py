@@ -0,0 +1,93 @@
+"""
+HarvesSink – Soft-sensor latency: tree ensemble vs lookup-grid surrogate.
+Times the engine's one-row (live stream) and batch paths with and without
+the surrogate on the same readings, and reports the surrogate's error
+against the model.
+
+Usage:  python -m benchmarks.surrogate_bench [--version v3] [--readings 5000]
+"""
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+
+from app.ai import registry
+from app.ai.inference import MODEL_PATH, InferenceEngine
+from app.ai.surrogate import GridSurrogate, error_report, load_for
+from app.records import Reading
+
+MODEL_ROW_SAMPLE = 200      # one-row model calls are milliseconds each
+
+
+def readings(n: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return rng.normal(7.2, 0.6, n).clip(0, 14), np.abs(rng.normal(3, 8, n))
+
+
+def per_row_us(engine: InferenceEngine, batch: list[Reading]) -> float:
+    engine.predict(batch[0])
+    started = time.perf_counter()
+    for reading in batch:
+        engine.predict(reading)
+    return (time.perf_counter() - started) / len(batch) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soft-sensor latency: ensemble vs lookup-grid surrogate")
+    parser.add_argument("--version", help="registry version (default: active, else the bundled V2 model)")
+    parser.add_argument("--readings", type=int, default=5000)
+    args = parser.parse_args()
+
+    path = registry.artifact_path(args.version) if args.version else (registry.active_path() or MODEL_PATH)
+    if not os.path.exists(path):
+        raise SystemExit(f"No model at {path} — train one with python -m app.ai.training")
+    model = joblib.load(path)
+    surrogate = load_for(path)
+    if surrogate is None:
+        print("No stored surrogate for this model — building one in memory...")
+        started = time.perf_counter()
+        surrogate = GridSurrogate.build(model)
+        print(f"   built in {time.perf_counter() - started:.1f}s")
+
+    ph, turbidity = readings(args.readings)
+    rows = [Reading(ph=float(p), turbidity=float(t)) for p, t in zip(ph, turbidity)]
+    tds = np.zeros(len(rows))
+    engine = InferenceEngine()
+
+    engine.swap(model, "model")
+    model_row = per_row_us(engine, rows[:MODEL_ROW_SAMPLE])
+    started = time.perf_counter()
+    engine.predict_batch(ph, tds, turbidity)
+    model_batch = (time.perf_counter() - started) / len(rows) * 1e6
+
+    engine.swap(model, "surrogate", surrogate)
+    hits = [r for r in rows if surrogate.lookup(r.ph, r.turbidity) is not None]
+    surrogate.hits = surrogate.misses = 0
+    mixed_row = per_row_us(engine, rows[:MODEL_ROW_SAMPLE])
+    hit_row = per_row_us(engine, hits) if hits else float("nan")
+    started = time.perf_counter()
+    engine.predict_batch(ph, tds, turbidity)
+    surrogate_batch = (time.perf_counter() - started) / len(rows) * 1e6
+
+    print(f"\nModel {path}")
+    print(f"Grid {surrogate.ph_points} × {surrogate.turbidity_points}, tolerance {surrogate.tolerance} mg/L,"
+          f" {surrogate.coverage():.1%} of cells served without the model")
+    print(f"Readings from the grid: {len(hits) / len(rows):.1%} of {len(rows):,}\n")
+    print(f"{'path':<28} {'µs/row':>10}")
+    print(f"{'one-row, model':<28} {model_row:>10,.1f}")
+    print(f"{'one-row, surrogate (mixed)':<28} {mixed_row:>10,.1f}")
+    print(f"{'one-row, surrogate (hit)':<28} {hit_row:>10,.2f}")
+    print(f"{'batch, model':<28} {model_batch:>10,.2f}")
+    print(f"{'batch, surrogate':<28} {surrogate_batch:>10,.2f}")
+
+    print("\nError vs model (mg/L, fallback rows are exact):")
+    for name, r in error_report(surrogate, model).items():
+        print(f"   {name:<5} max BOD {r['bod_max_error']:<6} COD {r['cod_max_error']:<6}"
+              f" p99 BOD {r['bod_p99_error']:<6} COD {r['cod_p99_error']:<6} hit rate {r['hit_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,7 @@ import { postApi } from "@/lib/api";
 import { useState } from "react";
 
 export default function HouseholdDashboard() {
-  const { latest, history, connected } = useLiveStream();
+  const { latest, history, connected, nudges } = useLiveStream();
   const [calibrating, setCalibrating] = useState(false);
 
   const reading = latest?.reading;
@@ -198,7 +198,7 @@ export default function HouseholdDashboard() {
       <TimeSeriesChart history={history} />
 
       {/* ── Sustainability nudge ──────────────────────── */}
-      <NudgeCard reading={reading} />
+      <NudgeCard reading={reading} pushed={reading ? nudges[reading.device_id] : undefined} />
     </div>
   );
 }
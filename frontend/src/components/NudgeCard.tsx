@@ -7,11 +7,17 @@ import { Lightbulb } from "lucide-react";
 
 interface NudgeCardProps {
   reading?: SensorReading;
+  /** Latest nudge pushed over /ws/live for this device */
+  pushed?: SustainabilityNudge;
 }
 
-export default function NudgeCard({ reading }: NudgeCardProps) {
+export default function NudgeCard({ reading, pushed }: NudgeCardProps) {
   const [nudge, setNudge] = useState<SustainabilityNudge | null>(null);
 
+  useEffect(() => {
+    if (pushed) setNudge(pushed);
+  }, [pushed]);
+
   useEffect(() => {
     if (!reading) return;
 
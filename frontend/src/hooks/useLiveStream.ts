@@ -1,19 +1,21 @@
 "use client";
 
 import { useEffect, useRef, useState, useCallback } from "react";
-import type { LivePacket } from "@/lib/types";
+import type { LivePacket, SustainabilityNudge } from "@/lib/types";
 
 const WS_URL = process.env.NEXT_PUBLIC_WS_URL || "ws://localhost:8000/ws/live";
 const MAX_HISTORY = 120; // ~60s at 500ms interval
 
 /**
  * WebSocket hook that connects to the backend live stream.
- * Returns the latest packet and a rolling history for charts.
+ * Returns the latest packet, a rolling history for charts, and the latest
+ * nudge pushed per device (the "nudge" topic).
  */
 export function useLiveStream() {
   const [latest, setLatest] = useState<LivePacket | null>(null);
   const [history, setHistory] = useState<LivePacket[]>([]);
   const [connected, setConnected] = useState(false);
+  const [nudges, setNudges] = useState<Record<string, SustainabilityNudge>>({});
   const wsRef = useRef<WebSocket | null>(null);
   const reconnectTimeout = useRef<NodeJS.Timeout>();
 
@@ -27,7 +29,13 @@ export function useLiveStream() {
 
     ws.onmessage = (event) => {
       try {
-        const packet: LivePacket = JSON.parse(event.data);
+        const message = JSON.parse(event.data);
+        if (message.topic === "nudge") {
+          setNudges((prev) => ({ ...prev, [message.device_id]: message.nudge }));
+          return;
+        }
+        if ("topic" in message) return; // other side-channel topics (e.g. crisis events)
+        const packet: LivePacket = message;
         setLatest(packet);
         setHistory((prev) => {
           const next = [...prev, packet];
@@ -55,5 +63,5 @@ export function useLiveStream() {
     };
   }, [connect]);
 
-  return { latest, history, connected };
+  return { latest, history, connected, nudges };
 }